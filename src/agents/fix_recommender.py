@@ -1,15 +1,17 @@
 from dataclasses import dataclass
 from typing import List
+from ..instrumentation import traced
 from ..llm_client import generate_text
 
-@dataclass
+@dataclass(slots=True)
 class FixResult:
     quick_fixes: List[str]
     long_term_fixes: List[str]
     raw_text: str | None = None
 
 
-def run(log_type: str, primary_root_cause: str, symptoms: List[str]) -> FixResult:
+@traced("agent.fix_recommender")
+def run(log_type: str, primary_root_cause: str, symptoms: List[str], use_cache: bool = True) -> FixResult:
     symptom_text = "\n".join(f"- {s}" for s in symptoms) if symptoms else "None listed."
 
     prompt = f"""
@@ -33,7 +35,7 @@ Long-term prevention:
 - <short concrete action>
 """
 
-    text = generate_text(prompt)
+    text = generate_text(prompt, use_cache=use_cache)
 
     quick: List[str] = []
     long_term: List[str] = []
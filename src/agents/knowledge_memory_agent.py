@@ -1,15 +1,39 @@
 # src/agents/knowledge_memory_agent.py
 
-from typing import Optional
-from ..memory.incident_store import Incident, add_incident, find_similar_incident as _find_similar
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Sequence, Tuple
+from ..instrumentation import traced
+from ..memory.incident_store import (
+    Incident,
+    add_incident,
+    find_by_fingerprint as _find_by_fingerprint,
+    find_similar_incident as _find_similar,
+    load_result,
+    save_result,
+    search_similar_incidents,
+)
+from .fix_recommender import FixResult
+from .root_cause_analyst import RootCauseResult
 
+# Analyses are kept for reuse only when the model was at least this sure
+MIN_REUSE_CONFIDENCE = 0.6
 
+
+@dataclass(slots=True)
+class ReusedAnalysis:
+    signature: str
+    root_cause: RootCauseResult
+    fixes: FixResult
+
+
+@traced("agent.knowledge_memory.store")
 def store_incident(
     log_type: str,
     primary_root_cause: str,
     example_error: str,
     quick_fix: str,
     long_term_fix: str,
+    fingerprints: Sequence[str] = (),
 ) -> None:
     incident = Incident(
         log_type=log_type,
@@ -18,12 +42,57 @@ def store_incident(
         quick_fix=quick_fix,
         long_term_fix=long_term_fix,
     )
-    add_incident(incident)
+    add_incident(incident, fingerprints)
+
 
+@traced("agent.knowledge_memory.find_by_fingerprint")
+def find_by_fingerprint(fingerprint: str, log_type: Optional[str] = None) -> List[Incident]:
+    return _find_by_fingerprint(fingerprint, log_type)
 
+
+@traced("agent.knowledge_memory.find_similar")
 def find_similar(
     log_type: str,
     primary_root_cause: str,
 ) -> Optional[Incident]:
     return _find_similar(log_type, primary_root_cause)
 
+
+@traced("agent.knowledge_memory.find_similar_top_k")
+def find_similar_top_k(
+    log_type: str,
+    primary_root_cause: str,
+    k: int = 5,
+    example_error: str = "",
+) -> List[Tuple[Incident, float]]:
+    return search_similar_incidents(log_type, primary_root_cause, k, example_error)
+
+
+@traced("agent.knowledge_memory.find_reusable")
+def find_reusable(signature: str) -> Optional[ReusedAnalysis]:
+    """The stored analysis of an earlier incident with this exact signature."""
+    if not signature:
+        return None
+    stored = load_result(signature)
+    if stored is None:
+        return None
+    return ReusedAnalysis(
+        signature=signature,
+        root_cause=RootCauseResult(**stored["root_cause"]),
+        fixes=FixResult(**stored["fixes"]),
+    )
+
+
+@traced("agent.knowledge_memory.store_analysis")
+def store_analysis(
+    signature: str,
+    log_type: str,
+    root_cause: RootCauseResult,
+    fixes: FixResult,
+) -> bool:
+    """Keep a confident analysis for reuse by signature; returns whether it was kept."""
+    confidence = root_cause.confidence
+    if not signature or confidence is None or confidence < MIN_REUSE_CONFIDENCE:
+        return False
+    save_result(signature, log_type, {"root_cause": asdict(root_cause), "fixes": asdict(fixes)})
+    return True
@@ -1,27 +1,53 @@
 from dataclasses import dataclass
 from typing import Dict, Any
+from ..instrumentation import traced
 from ..llm_client import generate_text
+from ..tools.log_classifier import classify
+from ..tools.prompt_builder import PROMPT_BUDGETS, compress_log
 
-@dataclass
+# Local classifications at or above this confidence skip the LLM call
+LOCAL_CONFIDENCE_THRESHOLD = 0.6
+
+@dataclass(slots=True)
 class LogTypeResult:
     log_type: str
     severity_summary: Dict[str, int] | None = None
     notes: str | None = None
+    confidence: float | None = None
 
 
-def run(log_text: str) -> LogTypeResult:
+@traced("agent.log_type_detector")
+def run(log_text: str, token_budget: int | None = None, use_cache: bool = True) -> LogTypeResult:
     """
-    Ask Gemini to:
+    Classify locally first (signature rules + exact severity counts).
+    Only when that is not confident enough, ask Gemini to:
       - guess log type
       - rough severity distribution
+    Exact local severity counts win over the model's estimates.
+    The log is compressed to token_budget (default from PROMPT_BUDGETS)
+    before it goes into the prompt. use_cache=False bypasses the response
+    cache (a fresh answer is still stored).
     """
+    local = classify(log_text)
+    if local.confidence >= LOCAL_CONFIDENCE_THRESHOLD:
+        signals = ", ".join(f"{t}={score:g}" for t, score in local.scores.items() if score)
+        return LogTypeResult(
+            log_type=local.log_type,
+            severity_summary=local.severity_counts or None,
+            notes=f"Classified locally (signature scores: {signals})",
+            confidence=local.confidence,
+        )
+
+    budget = token_budget or PROMPT_BUDGETS["log_type_detector"]
+    logs = compress_log(log_text, budget).text
+
     prompt = f"""
 You are a log classification assistant.
 
 Classify the following logs and estimate severity counts.
 
 <logs>
-{log_text}
+{logs}
 </logs>
 
 Respond in this format exactly:
@@ -34,7 +60,7 @@ Severities:
 Notes: <1 short line>
 """
 
-    text = generate_text(prompt)
+    text = generate_text(prompt, use_cache=use_cache)
 
     # very light parsing (no need to be perfect)
     log_type = "unknown"
@@ -69,7 +95,8 @@ Notes: <1 short line>
 
     return LogTypeResult(
         log_type=log_type,
-        severity_summary=severities or None,
+        severity_summary=local.severity_counts or severities or None,
         notes=text,
+        confidence=local.confidence,
     )
 
@@ -1,9 +1,12 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Sequence
+from ..instrumentation import traced
 from ..llm_client import generate_text
+from ..tools.prompt_builder import PROMPT_BUDGETS, compress_lines, compress_sections
+from ..tools.stack_traces import TraceGroup
 from .segmenter_cluster import LogSegment
 
-@dataclass
+@dataclass(slots=True)
 class RootCauseResult:
     primary_root_cause: str
     symptoms: List[str]
@@ -11,27 +14,49 @@ class RootCauseResult:
     raw_analysis: str | None = None
 
 
+@traced("agent.root_cause_analyst")
 def run(
     log_type: str,
     segments: List[LogSegment],
     error_samples: List[str],
+    token_budget: int | None = None,
+    stack_traces: Sequence[TraceGroup] = (),
+    use_cache: bool = True,
 ) -> RootCauseResult:
 
-    # Build a concise context without ANY backslashes inside {}
-    segment_snippets = []
-    for seg in segments:
-        snippet = "\n".join(seg.sample_lines[:15])
-        segment_snippets.append(f"[Segment {seg.id} - {seg.summary}]\n{snippet}")
-
-    error_block = "\n".join(error_samples)
+    # Segments, error samples and stack traces share one token budget;
+    # within it lines are deduplicated, stack traces collapsed and errors
+    # kept first. Each distinct trace goes in once, with its count.
+    budget = token_budget or PROMPT_BUDGETS["root_cause_analyst"]
+    error_share = budget // 4 if error_samples else 0
+    trace_share = budget // 4 if stack_traces else 0
+    segment_text = compress_sections(
+        [(f"[Segment {seg.id} - {seg.summary}]", seg.sample_lines) for seg in segments],
+        budget - error_share - trace_share,
+    )
+    error_block = compress_lines(error_samples, error_share).text
+    trace_block = ""
+    if stack_traces:
+        trace_text = compress_sections(
+            [
+                (
+                    f"[Stack trace {g.fingerprint} - {g.count}x, lines {g.trace.first_line}-{g.last_line}]",
+                    g.trace.lines,
+                )
+                for g in stack_traces
+            ],
+            trace_share,
+        )
+        trace_block = f"Here is each distinct stack trace once, with how often it occurred:\n{trace_text}\n\n"
 
     prompt = (
         "You are an expert incident analyst.\n\n"
         f"Log type: {log_type}\n\n"
         "Here are key log segments:\n"
-        f"{chr(10).join(segment_snippets)}\n\n"
+        f"{segment_text}\n\n"
         "Here are some representative error lines:\n"
         f"{error_block}\n\n"
+        f"{trace_block}"
         "From this, identify:\n\n"
         "1. Primary root cause: <1–3 sentences>\n"
         "2. Key symptoms: <bullet list>\n"
@@ -44,7 +69,7 @@ def run(
         "Confidence: ...\n"
     )
 
-    text = generate_text(prompt)
+    text = generate_text(prompt, use_cache=use_cache)
 
     primary_root_cause = ""
     symptoms: List[str] = []
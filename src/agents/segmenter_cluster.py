@@ -1,68 +1,544 @@
-from dataclasses import dataclass
-from typing import List
-from ..tools.log_search_tool import search_log, LogMatch
+import itertools
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
 
-@dataclass
+from ..instrumentation import traced
+from ..tools.burst_detector import (
+    BurstTracker, ErrorBurst, burst_window, group_bursts, line_seconds, merge_spans, top_bursts,
+)
+from ..tools.line_index import MappedLog
+from ..tools.log_merger import TimedLine
+from ..tools.log_parser import (
+    LEVEL_CODES, NO_TIMESTAMP, PROBE_BYTES, LogParser, PlainParser,
+    detect_buffer_format, detect_format, minute_label,
+)
+from ..tools.log_search_tool import (
+    ERROR_KEYWORDS, KeywordHit, hit_line, match_keyword, scan_keywords, split_lines,
+)
+from ..tools.parallel_scan import scan_file
+from ..tools.severity_counter import SeverityCounter
+from ..tools.stack_traces import TraceCatalog, TraceGroup, scan_traces
+from ..tools.template_miner import TemplateMiner
+from ..tools.timestamps import HEAD_CHARS, SAMPLE_LINES, TimestampExtractor
+
+HEAD_LINES = 30
+TAIL_LINES = 30
+ERROR_CONTEXT = 15
+MAX_ERROR_SAMPLES = 10
+MAX_TEMPLATE_SEGMENTS = 8
+MAX_BURSTS = 3
+MAX_BURST_LINES = 60
+MAX_STACK_TRACES = 10
+
+# Fields of JSON / logfmt records that carry a stack trace
+TRACE_FIELDS = ("stack_trace", "stack", "exc_info", "traceback", "exception", "error")
+
+@dataclass(slots=True)
 class LogSegment:
     id: str
     summary: str
     sample_lines: List[str]
+    start_line: int | None = None   # 1-based line number of sample_lines[0]
 
-@dataclass
+@dataclass(slots=True)
 class SegmentResult:
     segments: List[LogSegment]
     error_samples: List[str]
+    lines_total: int = 0
+    error_lines_total: int = 0
+    # Exact per-level line counts over the whole log, and per minute
+    severity_counts: Dict[str, int] = field(default_factory=dict)
+    severity_per_minute: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # Mined line templates, error and rare ones first; sample_lines are
+    # examples, not a contiguous window, so start_line is left unset
+    templates: List[LogSegment] = field(default_factory=list)
+    # One copy of each distinct stack trace (by fingerprint), most frequent
+    # first, and the number of traces in the whole log
+    stack_traces: List[TraceGroup] = field(default_factory=list)
+    stack_traces_total: int = 0
+    # Every error template of the log, sorted: part of its incident signature
+    error_templates: List[str] = field(default_factory=list)
+    # Fingerprint of every distinct stack trace, sorted: also part of it
+    trace_fingerprints: List[str] = field(default_factory=list)
 
 
-def run(log_text: str) -> SegmentResult:
-    lines = log_text.splitlines()
+def template_segments(miner: TemplateMiner, top_n: int = MAX_TEMPLATE_SEGMENTS) -> List[LogSegment]:
+    return [
+        LogSegment(
+            id=f"template_{tpl.id}",
+            summary=(
+                f"{tpl.count}x, lines {tpl.first_line}-{tpl.last_line}: {tpl.template}"
+                if tpl.count > 1 else f"once, line {tpl.first_line}: {tpl.template}"
+            ),
+            sample_lines=list(tpl.examples),
+        )
+        for tpl in miner.ranked(top_n)
+    ]
 
-    # Use our tool to find error-like lines
-    error_matches: List[LogMatch] = []
-    for keyword in ["error", "exception", "failed"]:
-        error_matches.extend(search_log(log_text, keyword, context_lines=1))
 
-    # Deduplicate by line number
-    seen = set()
-    error_lines = []
-    for m in error_matches:
-        if m.line_number not in seen:
-            seen.add(m.line_number)
-            error_lines.append(m.line)
+def error_templates(miner: TemplateMiner) -> List[str]:
+    return sorted({tpl.template for tpl in miner.templates if tpl.is_error()})
 
-    segments: List[LogSegment] = []
 
-    if lines:
+def _burst_segments(
+    bursts: Sequence[ErrorBurst],
+    total: int,
+    lines_for: Callable[[int, int], List[str]],
+) -> List[LogSegment]:
+    """
+    One segment per window around the densest error bursts, in line order;
+    windows that overlap are merged. lines_for(start, end) returns the
+    1-based inclusive line range.
+    """
+    top = top_bursts(bursts, MAX_BURSTS)
+    spans = [burst_window(b, ERROR_CONTEXT, MAX_BURST_LINES, total) for b in top]
+    segments: List[LogSegment] = []
+    i = 0
+    for start, end in merge_spans(spans):
+        members = []
+        while i < len(top) and spans[i][0] <= end:
+            members.append(top[i])
+            i += 1
+        hits = sum(b.hits for b in members)
         segments.append(LogSegment(
-            id="start",
-            summary="Beginning of log",
-            sample_lines=lines[:30]
+            id=f"error_burst_{len(segments) + 1}",
+            summary=(
+                f"Error burst: {hits} error line{'s' if hits != 1 else ''}"
+                f" in lines {members[0].first_line}-{members[-1].last_line}"
+            ),
+            sample_lines=lines_for(start, end),
+            start_line=start,
         ))
+    return segments
 
-    if error_lines:
-        # region around first error using its line_number
-        first_error_idx = next(
-            (i for i, ln in enumerate(lines) if ln == error_lines[0]),
-            0
-        )
-        start = max(0, first_error_idx - 15)
-        end = min(len(lines), first_error_idx + 15)
+
+def _segment_result(
+    total: int,
+    head: List[str],
+    tail: List[str],
+    bursts: List[LogSegment],
+    error_samples: List[str],
+    error_lines_total: int,
+    severities: SeverityCounter,
+    miner: TemplateMiner,
+    traces: TraceCatalog,
+) -> SegmentResult:
+    """
+    The SegmentResult every segmenting path ends in: the start segment,
+    the burst segments, the end segment (when the log is longer than its
+    tail), and the whole-log counts, templates and traces.
+    """
+    segments: List[LogSegment] = []
+    if total:
         segments.append(LogSegment(
-            id="error_region",
-            summary="Region around first error",
-            sample_lines=lines[start:end]
+            id="start",
+            summary="Beginning of log",
+            sample_lines=head,
+            start_line=1,
         ))
-
-    if len(lines) > 30:
+    segments.extend(bursts)
+    if total > TAIL_LINES:
         segments.append(LogSegment(
             id="end",
             summary="End of log",
-            sample_lines=lines[-30:]
+            sample_lines=tail,
+            start_line=total - TAIL_LINES + 1,
         ))
 
     return SegmentResult(
         segments=segments,
-        error_samples=error_lines[:10],
+        error_samples=error_samples,
+        lines_total=total,
+        error_lines_total=error_lines_total,
+        severity_counts=severities.counts(),
+        severity_per_minute=severities.per_minute(),
+        templates=template_segments(miner),
+        stack_traces=traces.ranked(MAX_STACK_TRACES),
+        stack_traces_total=traces.traces_total,
+        trace_fingerprints=sorted(traces.groups),
+        error_templates=error_templates(miner),
     )
 
 
+@traced("agent.segmenter.run")
+def run(log_text: str) -> SegmentResult:
+    lines = split_lines(log_text)
+
+    # JSON, logfmt and syslog logs are segmented from their parsed records
+    parser = detect_format(log_text)
+    if parser.structured:
+        return SegmentAccumulator(parser).feed_all(lines).result()
+
+    # One pass over the text for every error keyword; hits come back in
+    # line order, one per line, so no dedup is needed
+    error_hits: List[KeywordHit] = scan_keywords(log_text, ERROR_KEYWORDS)
+
+    bursts: List[LogSegment] = []
+    if error_hits:
+        timestamps = TimestampExtractor.detect(lines[:SAMPLE_LINES])
+        bursts = _burst_segments(
+            group_bursts(
+                (h.line_number, line_seconds(hit_line(log_text, h), timestamps)) for h in error_hits
+            ),
+            len(lines),
+            lambda a, b: lines[a - 1:b],
+        )
+
+    severities = SeverityCounter()
+    severities.feed_text(log_text)
+
+    return _segment_result(
+        len(lines),
+        lines[:HEAD_LINES],
+        lines[-TAIL_LINES:],
+        bursts,
+        [hit_line(log_text, h) for h in error_hits[:MAX_ERROR_SAMPLES]],
+        len(error_hits),
+        severities,
+        TemplateMiner().add_all(lines),
+        scan_traces(log_text),
+    )
+
+
+def _feed_record_traces(traces: TraceCatalog, line_number: int, texts: Iterable[Optional[str]]) -> None:
+    # Traces are in the message or in a field of their own, as embedded
+    # newlines; every line of the record gets the record's line number
+    for text in texts:
+        if text and "\n" in text:
+            for line in text.splitlines():
+                traces.feed(line, line_number)
+            traces.finish()
+
+
+@traced("agent.segmenter.run_mapped")
+def run_mapped(log: MappedLog, workers: int = 1) -> SegmentResult:
+    """
+    Segment a memory-mapped log using its line index. Only the head, tail,
+    error lines and burst windows are decoded for the segments. With
+    workers > 1 (or None for every core) the whole-file scans (keyword
+    hits, severities, templates) are split across processes; the result
+    is the same. Structured logs are segmented from their records in one
+    pass, like run() does.
+    """
+    parser = detect_buffer_format(log.buffer)
+    if parser.structured:
+        return SegmentAccumulator(parser).feed_all(log.iter_lines()).result()
+
+    if workers == 1:
+        error_hits = log.scan_keywords(ERROR_KEYWORDS)
+        severities = SeverityCounter()
+        severities.feed_buffer(log.buffer)
+        miner = TemplateMiner().add_all(log.iter_lines())
+    else:
+        scan = scan_file(log.path, ERROR_KEYWORDS, workers)
+        error_hits, severities, miner = scan.hits, scan.severities, scan.templates
+    total = len(log)
+
+    bursts: List[LogSegment] = []
+    if error_hits:
+        timestamps = log.timestamps()
+        bursts = _burst_segments(
+            group_bursts(
+                (h.line_number, line_seconds(log.line(h.line_number - 1), timestamps)) for h in error_hits
+            ),
+            total,
+            lambda a, b: log.lines(a - 1, b),
+        )
+
+    return _segment_result(
+        total,
+        log.head(HEAD_LINES),
+        log.tail(TAIL_LINES),
+        bursts,
+        [log.line(h.line_number - 1) for h in error_hits[:MAX_ERROR_SAMPLES]],
+        len(error_hits),
+        severities,
+        miner,
+        scan_traces(log.buffer),
+    )
+
+
+def _keep_densest(
+    kept: List[Tuple[ErrorBurst, int, List[str]]],
+    capture: Tuple[ErrorBurst, int, List[str]],
+) -> None:
+    kept.append(capture)
+    kept.sort(key=lambda c: (-c[0].density, c[0].first_line))
+    del kept[MAX_BURSTS:]
+
+
+class SegmentAccumulator:
+    """
+    Incremental segmenter: feed it lines one at a time and it keeps only
+    bounded state (head window, tail ring buffer, windows of the densest
+    error bursts so far, capped error samples, the severity histogram and
+    the template miner).
+    Produces the same segments as run() without ever holding the whole log.
+
+    For repeated reports on a growing log, new_window() marks the lines
+    seen so far as reported; result(window_only=True) then shows only the
+    bursts that started, and the error lines that came, after that mark.
+
+    With a structured parser (see log_parser.detect_format) lines are
+    handled as records: levels and errors come from the level field (records
+    without one are errors when their message holds an error keyword),
+    templates from the level and message, and stack traces from multi-line
+    messages and TRACE_FIELDS.
+    """
+
+    def __init__(self, parser: Optional[LogParser] = None) -> None:
+        self.parser = parser if parser is not None and parser.structured else None
+        self._fallback = PlainParser()
+        self.lines_total = 0
+        self.error_lines_total = 0
+        self.bursts_total = 0   # bursts seen so far, including the open one
+        self.head: List[str] = []
+        self.tail: Deque[str] = deque(maxlen=TAIL_LINES)
+        self.error_samples: List[str] = []
+        self._recent: Deque[str] = deque(maxlen=ERROR_CONTEXT)
+        # Burst windows as (burst, start_line, lines): the open burst, closed
+        # ones still collecting trailing context, and the densest finished ones
+        self._bursts = BurstTracker()
+        self._capture: Optional[Tuple[ErrorBurst, int, List[str]]] = None
+        self._closing: List[Tuple[ErrorBurst, int, List[str]]] = []
+        self._best: List[Tuple[ErrorBurst, int, List[str]]] = []
+        # Lines up to _window_start are reported; the densest bursts and
+        # first error samples after it
+        self._window_start = 0
+        self._window_best: List[Tuple[ErrorBurst, int, List[str]]] = []
+        self._window_samples: List[str] = []
+        self.severities = SeverityCounter()
+        self._source_severities: Dict[str, SeverityCounter] = {}
+        self.templates = TemplateMiner()
+        self.traces = TraceCatalog()
+        self._source_traces: Dict[str, TraceCatalog] = {}
+        # Timestamp format, detected like run() does from the first
+        # SAMPLE_LINES lines; until that many are seen, from those so far
+        self._timestamp_sample: List[str] = []
+        self._timestamps: Optional[TimestampExtractor] = None
+        self._timestamps_from = 0   # sample size _timestamps was detected on
+
+    def _line_seconds(self, line: str) -> Optional[float]:
+        if self._timestamps is None or self._timestamps_from < len(self._timestamp_sample):
+            self._timestamps = TimestampExtractor.detect(self._timestamp_sample)
+            self._timestamps_from = len(self._timestamp_sample)
+        return line_seconds(line, self._timestamps)
+
+    def feed(self, line: str, source: Optional[str] = None, seconds: Optional[float] = None) -> None:
+        """
+        With source (lines of a merged multi-log timeline) the line is shown
+        as "[source] line" in segments and samples, severities are counted
+        per source (each has its own format), and seconds, when given, is
+        the line's time in place of the one read from it.
+        """
+        shown = line if source is None else f"[{source}] {line}"
+        self.lines_total += 1
+        if self.lines_total <= SAMPLE_LINES:
+            self._timestamp_sample.append(line[:HEAD_CHARS])
+        if len(self.head) < HEAD_LINES:
+            self.head.append(shown)
+        self.tail.append(shown)
+        n = self.lines_total
+
+        if self.parser is not None:
+            is_error, record_seconds = self._feed_record(line, n)
+            if seconds is None:
+                seconds = record_seconds
+        else:
+            is_error = self._feed_line(line, n, source)
+            if is_error and seconds is None:
+                seconds = self._line_seconds(line)
+
+        if is_error:
+            self.error_lines_total += 1
+            if len(self.error_samples) < MAX_ERROR_SAMPLES:
+                self.error_samples.append(shown)
+            if len(self._window_samples) < MAX_ERROR_SAMPLES:
+                self._window_samples.append(shown)
+            if self._bursts.add(n, seconds) is not None:
+                self._closing.append(self._capture)
+                self._capture = None
+            if self._capture is None:
+                self.bursts_total += 1
+                # _recent holds the ERROR_CONTEXT lines before this one
+                self._capture = (self._bursts.current, n - len(self._recent), list(self._recent))
+        elif self._bursts.is_closed_at(n):
+            self._bursts.finish()
+            self._closing.append(self._capture)
+            self._capture = None
+
+        if self._capture is not None and len(self._capture[2]) < MAX_BURST_LINES:
+            self._capture[2].append(shown)
+
+        still_closing = []
+        for capture in self._closing:
+            burst, start, lines = capture
+            end = min(burst.last_line + ERROR_CONTEXT, start + MAX_BURST_LINES - 1)
+            if start + len(lines) <= end:
+                lines.append(shown)
+            if start + len(lines) <= end:
+                still_closing.append(capture)
+            else:
+                self._keep_if_dense(capture)
+        self._closing = still_closing
+
+        self._recent.append(shown)
+
+    def _feed_line(self, line: str, n: int, source: Optional[str]) -> bool:
+        if source is None:
+            self.severities.feed(line)
+        else:
+            counter = self._source_severities.get(source)
+            if counter is None:
+                counter = self._source_severities[source] = SeverityCounter()
+            counter.feed(line)
+        self.templates.add(line)
+
+        if source is None:
+            self.traces.feed(line, n)
+        else:
+            # Another source's lines can interleave with a trace
+            traces = self._source_traces.get(source)
+            if traces is None:
+                traces = self._source_traces[source] = TraceCatalog()
+            traces.feed(line, n)
+        return match_keyword(line, ERROR_KEYWORDS) is not None
+
+    def _feed_record(self, line: str, n: int) -> Tuple[bool, Optional[float]]:
+        """Whether the record is an error, and its time in seconds."""
+        ts, level, message, _, extra = self.parser.parse(line) or self._fallback.parse(line)
+        if level is not None:
+            self.severities.add(level, minute_label(ts) if ts != NO_TIMESTAMP else "")
+            # The level keeps error records in templates of their own
+            self.templates.add(f"{level} {message}")
+        else:
+            self.templates.add(message)
+        _feed_record_traces(self.traces, n, (message, *(extra.get(name) for name in TRACE_FIELDS)))
+        if level is not None:
+            is_error = LEVEL_CODES[level] >= LEVEL_CODES["ERROR"]
+        else:
+            is_error = match_keyword(message, ERROR_KEYWORDS) is not None
+        return is_error, None if ts == NO_TIMESTAMP else ts / 1e9
+
+    def _keep_if_dense(self, capture: Tuple[ErrorBurst, int, List[str]]) -> None:
+        _keep_densest(self._best, capture)
+        if capture[0].first_line > self._window_start:
+            _keep_densest(self._window_best, capture)
+
+    def new_window(self) -> None:
+        """Start a new reporting window after the last line fed."""
+        self._window_start = self.lines_total
+        self._window_best = []
+        self._window_samples = []
+
+    def _burst_segments(self, window_only: bool = False) -> List[LogSegment]:
+        captures = (self._window_best if window_only else self._best) + self._closing
+        if self._capture is not None:
+            captures.append(self._capture)
+        if window_only:
+            captures = [c for c in captures if c[0].first_line > self._window_start]
+        by_line: Dict[int, str] = {}
+        for _, start, lines in captures:
+            for offset, text in enumerate(lines):
+                by_line[start + offset] = text
+        return _burst_segments(
+            [c[0] for c in captures],
+            self.lines_total,
+            lambda a, b: [by_line[i] for i in range(a, b + 1)],
+        )
+
+    def feed_all(self, lines: Iterable[str]) -> "SegmentAccumulator":
+        for line in lines:
+            self.feed(line)
+        return self
+
+    def _all_severities(self) -> SeverityCounter:
+        if not self._source_severities:
+            return self.severities
+        combined = SeverityCounter()
+        combined.merge(self.severities)
+        for counter in self._source_severities.values():
+            combined.merge(counter)
+        return combined
+
+    def _all_traces(self) -> TraceCatalog:
+        # A trace still open (the log may end in one) counts, but stays open
+        # for the lines that follow
+        combined = TraceCatalog()
+        for catalog in (self.traces, *self._source_traces.values()):
+            combined.merge(catalog)
+            pending = catalog.open_trace()
+            if pending is not None:
+                combined.add(pending)
+        return combined
+
+    def result(self, window_only: bool = False) -> SegmentResult:
+        """
+        Segments for everything fed so far. With window_only, burst windows
+        and error samples come from the current window only (see
+        new_window); counts, templates and traces still cover the whole log.
+        """
+        return _segment_result(
+            self.lines_total,
+            list(self.head),
+            list(self.tail),
+            self._burst_segments(window_only) if self.error_lines_total else [],
+            list(self._window_samples if window_only else self.error_samples),
+            self.error_lines_total,
+            self._all_severities(),
+            self.templates,
+            self._all_traces(),
+        )
+
+
+@traced("agent.segmenter.run_stream")
+def run_stream(lines: Iterable[str]) -> SegmentResult:
+    """
+    Segment a log given as an iterable of lines (e.g. iter_log_lines),
+    in constant memory. The format is detected from the first PROBE_BYTES,
+    as run() does.
+    """
+    lines = iter(lines)
+    head: List[str] = []
+    size = 0
+    for line in lines:
+        head.append(line)
+        size += len(line) + 1
+        if size > PROBE_BYTES:
+            break
+    parser = detect_format("".join(line + "\n" for line in head))
+    return SegmentAccumulator(parser).feed_all(itertools.chain(head, lines)).result()
+
+
+@traced("agent.segmenter.run_merged")
+def run_merged(records: Iterable[TimedLine]) -> SegmentResult:
+    """
+    Segment a merged multi-source timeline (see log_merger) in one pass,
+    so an error burst that spreads across services is one burst, shown
+    with the source of every line.
+    """
+    acc = SegmentAccumulator()
+    for record in records:
+        seconds = None if record.timestamp == NO_TIMESTAMP else record.timestamp / 1e9
+        acc.feed(record.line, record.source, seconds)
+    return acc.result()
+
+
+def excerpt(result: SegmentResult) -> str:
+    """
+    Join the segment windows back into one text in line order, dropping
+    lines that appear in more than one overlapping segment.
+    """
+    ordered = sorted(
+        (s for s in result.segments if s.start_line is not None),
+        key=lambda s: s.start_line,
+    )
+    out: List[str] = []
+    next_line = 1
+    for seg in ordered:
+        for offset, line in enumerate(seg.sample_lines):
+            if seg.start_line + offset >= next_line:
+                out.append(line)
+        next_line = max(next_line, seg.start_line + len(seg.sample_lines))
+    return "\n".join(out)
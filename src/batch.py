@@ -0,0 +1,175 @@
+# src/batch.py
+"""
+Analyse a directory (or glob) of log files and write one JSON line per file.
+
+Local stages (mapping, scanning, segmenting) run in a process pool; the
+LLM stages for each file run through a bounded pool of concurrent agent
+pipelines, whose requests all share the LLM client's event loop and
+connection pool (see llm_client.generate_batch). Each output line holds
+the file's full AnalysisReport. The output file doubles as the
+checkpoint: files already in it with the same size and mtime are skipped
+on the next run. Run with:
+
+    python -m src.batch "logs/**/*.log" -o triage.jsonl
+"""
+
+import argparse
+import glob
+import json
+import pathlib
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, List, Set, Tuple
+
+from tqdm import tqdm
+
+from .agents.segmenter_cluster import SegmentResult
+from .llm_client import DEFAULT_CONCURRENCY
+from .pipeline import run_analysis, segment_log_file
+
+DEFAULT_PATTERN = "**/*.log"
+
+# Segmented files allowed to wait for an LLM slot; keeps memory bounded
+# when the local stages outrun the model
+QUEUE_FACTOR = 4
+
+
+def find_logs(target: str, pattern: str = DEFAULT_PATTERN) -> List[pathlib.Path]:
+    path = pathlib.Path(target)
+    if path.is_dir():
+        found = path.glob(pattern)
+    else:
+        found = (pathlib.Path(p) for p in glob.glob(target, recursive=True))
+    return sorted(p.resolve() for p in found if p.is_file())
+
+
+def _signature(path: pathlib.Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_checkpoint(output: pathlib.Path) -> Set[Tuple[str, int, int]]:
+    """(path, size, mtime_ns) of every file already analysed successfully."""
+    done: Set[Tuple[str, int, int]] = set()
+    if not output.exists():
+        return done
+    with output.open(encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue   # a line cut short by an interrupted run
+            if record.get("status") == "ok":
+                done.add((record["path"], record["size"], record["mtime_ns"]))
+    return done
+
+
+def segment_file(path: str) -> SegmentResult:
+    """Local stages for one file; runs in a worker process."""
+    return segment_log_file(path)
+
+
+def analyze_segments(path: str, seg_result: SegmentResult) -> Dict:
+    """LLM stages for one already-segmented file; runs in a worker thread."""
+    return run_analysis(path, lambda: seg_result).to_dict()
+
+
+def run_batch(
+    paths: List[pathlib.Path],
+    output: pathlib.Path,
+    workers: int | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    resume: bool = True,
+) -> Dict[str, int]:
+    done = load_checkpoint(output) if resume else set()
+    todo = []
+    for path in paths:
+        size, mtime_ns = _signature(path)
+        if (str(path), size, mtime_ns) not in done:
+            todo.append((path, size, mtime_ns))
+    counts = {"ok": 0, "error": 0, "skipped": len(paths) - len(todo), "reused": 0}
+    mode = "a" if resume else "w"
+    with output.open(mode, encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers) as local_pool, \
+            ThreadPoolExecutor(max_workers=concurrency) as llm_pool, \
+            tqdm(total=len(todo), unit=" file") as progress:
+
+        def write(meta, status: str, body: Dict) -> None:
+            path, size, mtime_ns = meta
+            record = {"path": str(path), "size": size, "mtime_ns": mtime_ns, "status": status, **body}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()   # every finished file is a checkpoint
+            counts[status] += 1
+            # Known incidents answered from memory without LLM calls
+            counts["reused"] += bool(body.get("report", {}).get("reused"))
+            progress.update(1)
+
+        pending_local: Dict[Future, Tuple] = {}
+        pending_llm: Dict[Future, Tuple] = {}
+        queue = list(reversed(todo))
+        max_in_flight = max(1, concurrency * QUEUE_FACTOR)
+
+        while queue or pending_local or pending_llm:
+            # Only segment ahead of the LLM stages by a bounded amount
+            while queue and len(pending_local) + len(pending_llm) < max_in_flight:
+                meta = queue.pop()
+                pending_local[local_pool.submit(segment_file, str(meta[0]))] = meta
+
+            finished, _ = wait(list(pending_local) + list(pending_llm), return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future in pending_local:
+                    meta = pending_local.pop(future)
+                    try:
+                        seg_result = future.result()
+                    except Exception as e:
+                        write(meta, "error", {"stage": "local", "error": repr(e)})
+                        continue
+                    pending_llm[llm_pool.submit(analyze_segments, str(meta[0]), seg_result)] = meta
+                else:
+                    meta = pending_llm.pop(future)
+                    try:
+                        write(meta, "ok", {"report": future.result()})
+                    except Exception as e:
+                        write(meta, "error", {
+                            "stage": "llm",
+                            "error": repr(e),
+                            "traceback": traceback.format_exc(limit=3),
+                        })
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("target", help="directory of logs, or a glob such as 'ci/**/*.log'")
+    parser.add_argument("-o", "--output", default="logpilot_batch.jsonl", help="JSONL results / checkpoint file")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help="file pattern when target is a directory")
+    parser.add_argument("--workers", type=int, default=None, help="processes for local stages (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="files in the LLM stages at once")
+    parser.add_argument("--restart", action="store_true", help="ignore and overwrite an existing output file")
+    args = parser.parse_args(argv)
+
+    paths = find_logs(args.target, args.pattern)
+    if not paths:
+        print(f"No log files match {args.target!r}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    counts = run_batch(
+        paths,
+        pathlib.Path(args.output),
+        workers=args.workers,
+        concurrency=args.concurrency,
+        resume=not args.restart,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{counts['ok']} analysed ({counts['reused']} reused from memory), {counts['error']} failed,"
+        f" {counts['skipped']} already done in {elapsed:.1f}s -> {args.output}"
+    )
+    return 0 if counts["error"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+# src/instrumentation.py
+
+import functools
+import json
+import pathlib
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+SERVICE_NAME = "logpilot"
+
+# Finished spans kept for export; aggregates below cover every span
+MAX_SPANS = 10_000
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_ns: int = 0          # wall clock, for export
+    end_ns: int = 0
+    duration: float = 0.0     # seconds, from the monotonic clock
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+@dataclass(slots=True)
+class SpanStats:
+    count: int = 0
+    seconds: float = 0.0
+    errors: int = 0
+    # Sums of numeric attributes (True counts as 1), e.g. tokens, cache hits
+    totals: Dict[str, float] = field(default_factory=dict)
+
+
+_lock = threading.Lock()
+_spans: Deque[Span] = deque(maxlen=MAX_SPANS)
+_stats: Dict[str, SpanStats] = {}
+_local = threading.local()
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def _stack() -> List[Span]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def current_span() -> Optional[Span]:
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def _finish(s: Span) -> None:
+    with _lock:
+        _spans.append(s)
+        stats = _stats.get(s.name)
+        if stats is None:
+            stats = _stats[s.name] = SpanStats()
+        stats.count += 1
+        stats.seconds += s.duration
+        stats.errors += s.error is not None
+        for key, value in s.attributes.items():
+            if isinstance(value, (int, float)):
+                stats.totals[key] = stats.totals.get(key, 0.0) + value
+
+
+@contextmanager
+def span(
+    name: str,
+    parent: Optional[Span] = None,
+    attach: bool = True,
+    **attributes: Any,
+) -> Iterator[Span]:
+    """
+    Time a block as a span. The parent defaults to the innermost attached
+    span of this thread; pass parent explicitly across threads. Coroutines
+    sharing a thread should use attach=False so they do not nest in each
+    other.
+    """
+    if parent is None and attach:
+        parent = current_span()
+    s = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else _new_id(128),
+        span_id=_new_id(64),
+        parent_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes=dict(attributes),
+    )
+    start = time.perf_counter()
+    if attach:
+        _stack().append(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = repr(e)
+        raise
+    finally:
+        if attach:
+            _stack().pop()
+        s.duration = time.perf_counter() - start
+        s.end_ns = s.start_ns + int(s.duration * 1e9)
+        _finish(s)
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator form of span()."""
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def finished_spans() -> List[Span]:
+    with _lock:
+        return list(_spans)
+
+
+def stats() -> Dict[str, SpanStats]:
+    with _lock:
+        return {
+            name: SpanStats(s.count, s.seconds, s.errors, dict(s.totals))
+            for name, s in _stats.items()
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _spans.clear()
+        _stats.clear()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    """Aggregates in the Prometheus text exposition format."""
+    snapshot = stats()
+    lines = [
+        "# HELP logpilot_span_seconds Wall time spent in instrumented spans.",
+        "# TYPE logpilot_span_seconds summary",
+    ]
+    for name, s in sorted(snapshot.items()):
+        lines.append(f'logpilot_span_seconds_count{{span="{_label(name)}"}} {s.count}')
+        lines.append(f'logpilot_span_seconds_sum{{span="{_label(name)}"}} {s.seconds:.6f}')
+    lines += [
+        "# HELP logpilot_span_errors_total Spans that ended with an exception.",
+        "# TYPE logpilot_span_errors_total counter",
+    ]
+    for name, s in sorted(snapshot.items()):
+        lines.append(f'logpilot_span_errors_total{{span="{_label(name)}"}} {s.errors}')
+    lines += [
+        "# HELP logpilot_span_attribute_total Sum of a numeric span attribute (tokens, characters, retries, cache hits).",
+        "# TYPE logpilot_span_attribute_total counter",
+    ]
+    for name, s in sorted(snapshot.items()):
+        for key, total in sorted(s.totals.items()):
+            lines.append(
+                f'logpilot_span_attribute_total{{span="{_label(name)}",attribute="{_label(key)}"}} {total:g}'
+            )
+    return "\n".join(lines) + "\n"
+
+
+def _otel_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otel_json(spans: Optional[List[Span]] = None) -> Dict[str, Any]:
+    """Spans in the OpenTelemetry OTLP/JSON trace layout."""
+    out = []
+    for s in finished_spans() if spans is None else spans:
+        item = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,   # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [{"key": k, "value": _otel_value(v)} for k, v in s.attributes.items()],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            item["parentSpanId"] = s.parent_id
+        out.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": out}],
+        }]
+    }
+
+
+def write_metrics(path: str) -> None:
+    """OTel JSON for a .json path, Prometheus text otherwise."""
+    target = pathlib.Path(path)
+    if target.suffix == ".json":
+        target.write_text(json.dumps(otel_json()), encoding="utf-8")
+    else:
+        target.write_text(prometheus_text(), encoding="utf-8")
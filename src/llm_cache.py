@@ -0,0 +1,177 @@
+# src/llm_cache.py
+
+import hashlib
+import pathlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+BASE_DIR = pathlib.Path(__file__).resolve().parent
+CACHE_PATH = BASE_DIR / "llm_cache.sqlite3"
+
+# Defaults: a week of answers, a few thousand prompts on disk
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_ENTRIES = 5000
+
+
+def cache_key(model: str, prompt: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    memory_hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of LLM responses, keyed by (model, prompt digest).
+    A small in-memory LRU sits in front of an SQLite table so repeated
+    prompts are answered without an API call, across process restarts too.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path | str = CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        max_disk_entries: int = DEFAULT_DISK_ENTRIES,
+    ) -> None:
+        self.path = pathlib.Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.stats = CacheStats()
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Under WAL a commit no longer waits for fsync; a crash can lose
+        # only the last few answers, which are simply fetched again
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " response TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        self._conn.commit()
+
+    def _is_fresh(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds <= 0 or now - created_at < self.ttl_seconds
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        key = cache_key(model, prompt)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._is_fresh(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.stats.hits += 1
+                    self.stats.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT created_at, response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            created_at, response = row
+            if not self._is_fresh(created_at, now):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.expired += 1
+                self.stats.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self._remember(key, created_at, response)
+            self.stats.hits += 1
+            return response
+
+    def put(self, model: str, prompt: str, response: str) -> None:
+        key = cache_key(model, prompt)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, created_at, last_used, response)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, model, now, now, response),
+            )
+            self._prune(now)
+            self._conn.commit()
+            self._remember(key, now, response)
+
+    def _remember(self, key: str, created_at: float, response: str) -> None:
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self, now: float) -> None:
+        # Drop expired rows, then the least recently used beyond the size cap
+        if self.ttl_seconds > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            self.stats.evictions += overflow
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    if _cache is not None:
+        return _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
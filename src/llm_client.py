@@ -1,13 +1,89 @@
+import asyncio
 import os
+import random
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator, List, Optional, Sequence
 from google import genai
 import streamlit as st   # 👈 add this
 
+from .instrumentation import Span, current_span, span
+from .llm_cache import get_cache
+from .tools.prompt_builder import estimate_tokens
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+# Retry policy for rate limits and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 30.0
+
+# Default number of in-flight requests for the batch API
+DEFAULT_CONCURRENCY = 8
+
+# (prompt, model) -> text; replaces Gemini, e.g. with a stub or a local fake server
+AsyncBackend = Callable[[str, str], Awaitable[str]]
+
 # Single client reused everywhere
 _client = None
+# Agents may run concurrently (see scheduler.py); only one thread builds the client
+_client_lock = threading.Lock()
+_async_backend: Optional[AsyncBackend] = None
+
+# Event loop thread every request runs on, started on first use
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+
+@dataclass(slots=True)
+class TokenUsage:
+    calls: int = 0
+    cached_calls: int = 0
+    prompt_tokens: int = 0     # estimated, see prompt_builder.estimate_tokens
+    response_tokens: int = 0
+
+
+# Usage collector for the current thread, set by track_usage()
+_usage = threading.local()
+
+
+@contextmanager
+def track_usage() -> Iterator[TokenUsage]:
+    """
+    Count the LLM calls this thread makes inside the block, and their
+    prompt/response sizes. Blocks nest; the inner one takes the counts.
+    """
+    usage = TokenUsage()
+    previous = getattr(_usage, "current", None)
+    _usage.current = usage
+    try:
+        yield usage
+    finally:
+        _usage.current = previous
+
+
+def _record_usage(prompt: str, text: str, cached: bool, usage: Optional[TokenUsage] = None) -> None:
+    # usage is passed in when the call runs on another thread than its caller
+    if usage is None:
+        usage = getattr(_usage, "current", None)
+    if usage is None:
+        return
+    usage.calls += 1
+    usage.cached_calls += cached
+    usage.prompt_tokens += estimate_tokens(prompt)
+    usage.response_tokens += estimate_tokens(text)
+
 
 def get_client():
     global _client
-    if _client is None:
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is not None:
+            return _client
         # 1) Try Streamlit secrets (Streamlit Cloud)
         api_key = st.secrets.get("GOOGLE_API_KEY")
 
@@ -19,17 +95,20 @@ def get_client():
             raise RuntimeError("GOOGLE_API_KEY is not set (check Streamlit secrets).")
 
         _client = genai.Client(api_key=api_key)
-    return _client
+        return _client
 
 
-def generate_text(prompt: str, model: str = "gemini-2.0-flash") -> str:
-    client = get_client()
+def set_async_backend(backend: Optional[AsyncBackend]) -> None:
+    """
+    Route every LLM call (generate_text included) through another backend,
+    such as a stub coroutine or a client for a local fake model server.
+    Pass None to go back to Gemini.
+    """
+    global _async_backend
+    _async_backend = backend
 
-    response = client.models.generate_content(
-        model=model,
-        contents=prompt,
-    )
 
+def _response_text(response) -> str:
     # Safely extract text from candidates
     texts = []
     if getattr(response, "candidates", None):
@@ -44,3 +123,165 @@ def generate_text(prompt: str, model: str = "gemini-2.0-flash") -> str:
         return "\n".join(texts)
 
     return str(response)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return status in RETRYABLE_STATUS
+
+
+def _backoff(attempt: int) -> float:
+    # "Full jitter": spreads retries from many callers over the whole window
+    return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def generate_text(prompt: str, model: str = DEFAULT_MODEL, use_cache: bool = True) -> str:
+    """
+    Answer a prompt with Gemini: a one-prompt generate_batch, so every
+    agent's request goes through the shared async client. Identical
+    (model, prompt) pairs are served from the response cache unless
+    use_cache is False; fresh answers are always written back to it.
+    """
+    return generate_batch([prompt], model, use_cache=use_cache)[0]
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_thread
+    if _loop is not None:
+        return _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=loop.run_forever, name="llm-client", daemon=True)
+            _loop_thread.start()
+            _loop = loop
+        return _loop
+
+
+async def _agenerate_uncached(prompt: str, model: str) -> str:
+    if _async_backend is not None:
+        return await _async_backend(prompt, model)
+
+    # client.aio shares the client's connection pool across all calls
+    response = await get_client().aio.models.generate_content(
+        model=model,
+        contents=prompt,
+    )
+    return _response_text(response)
+
+
+async def _agenerate(
+    prompt: str,
+    model: str,
+    use_cache: bool,
+    semaphore: Optional[asyncio.Semaphore],
+    parent: Optional[Span],
+    usage: Optional[TokenUsage],
+) -> str:
+    # Detached: concurrent coroutines share the loop thread's span stack
+    with span("llm.generate_text", parent=parent, attach=False, model=model) as s:
+        s.set(prompt_chars=len(prompt), prompt_tokens=estimate_tokens(prompt))
+        # The cache does blocking SQLite I/O; keep it off the loop thread
+        cache = await asyncio.to_thread(get_cache)
+        if use_cache:
+            cached = await asyncio.to_thread(cache.get, model, prompt)
+            if cached is not None:
+                s.set(response_chars=len(cached), response_tokens=estimate_tokens(cached), cache_hit=True)
+                _record_usage(prompt, cached, cached=True, usage=usage)
+                return cached
+
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                if semaphore is not None:
+                    async with semaphore:
+                        text = await _agenerate_uncached(prompt, model)
+                else:
+                    text = await _agenerate_uncached(prompt, model)
+                break
+            except Exception as e:
+                if attempt == MAX_RETRIES or not _is_retryable(e):
+                    raise
+                s.set(retries=attempt + 1)
+                await asyncio.sleep(_backoff(attempt))
+
+        await asyncio.to_thread(cache.put, model, prompt, text)
+        s.set(response_chars=len(text), response_tokens=estimate_tokens(text), cache_hit=False)
+        _record_usage(prompt, text, cached=False, usage=usage)
+        return text
+
+
+async def agenerate_text(
+    prompt: str,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> str:
+    """
+    Async generate_text. Retries 429/5xx with jittered exponential backoff.
+    If a semaphore is given, only the request itself holds it, so sleeping
+    retries do not block other prompts.
+    """
+    return await _agenerate(prompt, model, use_cache, semaphore, current_span(), getattr(_usage, "current", None))
+
+
+async def _agenerate_batch(
+    prompts: Sequence[str],
+    model: str,
+    max_concurrency: int,
+    use_cache: bool,
+    return_exceptions: bool,
+    parent: Optional[Span],
+    usage: Optional[TokenUsage],
+) -> List[str | BaseException]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+    return await asyncio.gather(
+        *(_agenerate(p, model, use_cache, semaphore, parent, usage) for p in prompts),
+        return_exceptions=return_exceptions,
+    )
+
+
+async def agenerate_batch(
+    prompts: Sequence[str],
+    model: str = DEFAULT_MODEL,
+    max_concurrency: int = DEFAULT_CONCURRENCY,
+    use_cache: bool = True,
+    return_exceptions: bool = False,
+) -> List[str | BaseException]:
+    """
+    Answer many prompts concurrently with at most max_concurrency requests
+    in flight. Results are returned in prompt order. With
+    return_exceptions=True a failed prompt yields its exception instead of
+    cancelling the batch.
+    """
+    return await _agenerate_batch(
+        prompts, model, max_concurrency, use_cache, return_exceptions,
+        current_span(), getattr(_usage, "current", None),
+    )
+
+
+def generate_batch(
+    prompts: Sequence[str],
+    model: str = DEFAULT_MODEL,
+    max_concurrency: int = DEFAULT_CONCURRENCY,
+    use_cache: bool = True,
+    return_exceptions: bool = False,
+) -> List[str | BaseException]:
+    """
+    Blocking agenerate_batch for synchronous callers. It runs on one
+    event loop thread shared by every caller, so agents on many threads
+    (DAG stages, batch pipelines) reuse one connection pool instead of
+    each blocking on its own round trips. Spans and token usage are
+    attributed to the calling thread. Coroutines should await
+    agenerate_batch instead.
+    """
+    loop = _event_loop()
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError("generate_batch called on the LLM event loop; await agenerate_batch instead")
+    future = asyncio.run_coroutine_threadsafe(
+        _agenerate_batch(
+            prompts, model, max_concurrency, use_cache, return_exceptions,
+            current_span(), getattr(_usage, "current", None),
+        ),
+        loop,
+    )
+    return future.result()
@@ -1,17 +1,23 @@
 import pathlib
-import os
-from google import genai
+
+from .llm_client import generate_text
+from .tools.prompt_builder import PROMPT_BUDGETS, compress_log
 
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
 
-def analyze_logs_with_llm(log_text: str):
+def analyze_logs_with_llm(log_text: str, token_budget: int | None = None):
+    # Repeats, stack frames and timestamps are squeezed out so the prompt
+    # stays within budget however large the log is
+    budget = token_budget or PROMPT_BUDGETS["logpilot_mvp"]
+    logs = compress_log(log_text, budget).text
+
     prompt = f"""
 You are an expert DevOps and software engineer.
 
 Here are logs:
 
 <logs>
-{log_text}
+{logs}
 </logs>
 
 Provide response in this format:
@@ -23,36 +29,8 @@ Provide response in this format:
 5. Suggested long-term prevention:
 """
 
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY is not set")
-
-    client = genai.Client(api_key=api_key)
-
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt,
-    )
-
-    # 🔽 Safely extract text from candidates
-    try:
-        texts = []
-        if getattr(response, "candidates", None):
-            for cand in response.candidates:
-                content = getattr(cand, "content", None)
-                if content and getattr(content, "parts", None):
-                    for part in content.parts:
-                        t = getattr(part, "text", None)
-                        if t:
-                            texts.append(t)
-        if texts:
-            return "\n".join(texts)
-
-        # Fallback: string representation
-        return str(response)
-
-    except Exception as e:
-        return f"[Failed to parse response text: {e}]\nRaw response:\n{response}"
+    # Shared client: one connection pool, response cache and retry policy
+    return generate_text(prompt)
 
 def read_log_file(rel_path: str):
     path = BASE_DIR / rel_path
@@ -1,12 +1,54 @@
+import heapq
 import json
+import math
 import pathlib
-from dataclasses import dataclass, asdict
-from typing import List, Optional
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .similarity import VectorIndex, embed, embedder_name, tokenize, top_k, uses_token_candidates
 
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
-MEMORY_PATH = BASE_DIR / "incident_memory.json"
+MEMORY_PATH = BASE_DIR / "incident_memory.sqlite3"
+# Incidents from the original JSON store are imported on first use
+LEGACY_JSON_PATH = BASE_DIR / "incident_memory.json"
+
+# Minimum cosine similarity for find_similar_incident to report a match
+MIN_SIMILARITY = 0.15
+
+# Most incidents the writer thread commits in one transaction
+MAX_GROUP_COMMIT = 256
+
+# Upper bound on incidents re-scored with vectors per lookup; candidates
+# are pre-ranked by how many words they share with the query
+MAX_CANDIDATES = 256
+
+# Candidate selection reads the postings of only the rarest query words,
+# newest first and at most MAX_POSTINGS each, so its cost stays flat as
+# the store grows; common words add little to the ranking anyway
+MAX_QUERY_TOKENS = 16
+MAX_POSTINGS = 256
 
-@dataclass
+# Stored analyses older than this are not reused (a fresh one replaces them)
+RESULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+@dataclass(slots=True)
+class ReuseStats:
+    lookups: int = 0
+    hits: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+@dataclass(slots=True)
 class Incident:
     log_type: str
     primary_root_cause: str
@@ -15,25 +57,461 @@ class Incident:
     long_term_fix: str
 
 
-def _load_all() -> List[Incident]:
-    if not MEMORY_PATH.exists():
-        return []
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY,
+    log_type TEXT NOT NULL,
+    log_type_key TEXT NOT NULL,
+    primary_root_cause TEXT NOT NULL,
+    example_error TEXT NOT NULL,
+    quick_fix TEXT NOT NULL,
+    long_term_fix TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS incident_tokens (
+    log_type_key TEXT NOT NULL,
+    token TEXT NOT NULL,
+    incident_id INTEGER NOT NULL,
+    PRIMARY KEY (log_type_key, token, incident_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS token_df (
+    token TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS incident_fingerprints (
+    fingerprint TEXT NOT NULL,
+    incident_id INTEGER NOT NULL,
+    PRIMARY KEY (fingerprint, incident_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS incident_results (
+    signature TEXT PRIMARY KEY,
+    log_type TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS result_reuse_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    lookups INTEGER NOT NULL,
+    hits INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS incident_vectors (
+    embedder TEXT NOT NULL,
+    incident_id INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (embedder, incident_id)
+);
+CREATE INDEX IF NOT EXISTS incidents_by_type ON incidents (log_type_key, id);
+"""
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+_index: Optional[VectorIndex] = None
+_indexed_upto: Dict[str, int] = {}   # log type -> highest incident id loaded into _index
+
+
+# Values per "IN (...)" list: stays well under SQLite's bound-parameter limit
+_SQL_CHUNK = 500
+
+
+def _chunks(items: Sequence) -> Iterator[Sequence]:
+    for i in range(0, len(items), _SQL_CHUNK):
+        yield items[i:i + _SQL_CHUNK]
+
+
+def _placeholders(chunk: Sequence) -> str:
+    return ",".join("?" * len(chunk))
+
+
+def _tokens(text: str) -> Set[str]:
+    return set(tokenize(text))
+
+
+def _incident_text(incident: Incident) -> str:
+    return f"{incident.primary_root_cause}\n{incident.example_error}"
+
+
+def _open(check_same_thread: bool = True) -> sqlite3.Connection:
+    # WAL lets readers run alongside the single writer; the timeout makes
+    # writers from other processes wait for the lock instead of failing
+    conn = sqlite3.connect(str(MEMORY_PATH), check_same_thread=check_same_thread, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        conn = _open(check_same_thread=False)
+        conn.executescript(_SCHEMA)
+        _import_legacy_json(conn)
+        _conn = conn
+    return _conn
+
+
+def _insert(conn: sqlite3.Connection, incident: Incident, fingerprints: Sequence[str] = ()) -> None:
+    log_type_key = incident.log_type.lower()
+    cur = conn.execute(
+        "INSERT INTO incidents (log_type, log_type_key, primary_root_cause,"
+        " example_error, quick_fix, long_term_fix) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            incident.log_type,
+            log_type_key,
+            incident.primary_root_cause,
+            incident.example_error,
+            incident.quick_fix,
+            incident.long_term_fix,
+        ),
+    )
+    tokens = _tokens(_incident_text(incident))
+    conn.executemany(
+        "INSERT INTO incident_tokens (log_type_key, token, incident_id) VALUES (?, ?, ?)",
+        [(log_type_key, tok, cur.lastrowid) for tok in tokens],
+    )
+    conn.executemany(
+        "INSERT INTO token_df (token, df) VALUES (?, 1)"
+        " ON CONFLICT (token) DO UPDATE SET df = df + 1",
+        [(tok,) for tok in tokens],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO incident_fingerprints (fingerprint, incident_id) VALUES (?, ?)",
+        [(fp, cur.lastrowid) for fp in fingerprints],
+    )
+    # Embedded on the way in, so lookups never have to embed the store
+    _embed_rows(conn, [(cur.lastrowid, incident.primary_root_cause, incident.example_error)])
+
+
+def _import_legacy_json(conn: sqlite3.Connection) -> None:
+    if not LEGACY_JSON_PATH.exists():
+        return
+    try:
+        raw = json.loads(LEGACY_JSON_PATH.read_text(encoding="utf-8"))
+        incidents = [Incident(**item) for item in raw]
+    except Exception:
+        return
+    # Check-and-import under the write lock, so when several processes
+    # start at once exactly one of them imports
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        raw = json.loads(MEMORY_PATH.read_text(encoding="utf-8"))
-        return [Incident(**item) for item in raw]
+        (count,) = conn.execute("SELECT COUNT(*) FROM incidents").fetchone()
+        if not count:
+            for incident in incidents:
+                _insert(conn, incident)
+        conn.commit()
     except Exception:
+        conn.rollback()
+        raise
+
+
+class _GroupCommitWriter:
+    """
+    Single writer thread per process. Callers enqueue incidents and wait on
+    a future; the thread drains everything queued so far and commits it in
+    one transaction. Under load many inserts share one commit (and one
+    fsync); when idle a lone insert is committed straight away.
+    Writers in other processes are serialised by SQLite's lock.
+    """
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Tuple[Incident, Sequence[str], Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, incident: Incident, fingerprints: Sequence[str] = ()) -> Future:
+        future: Future = Future()
+        self._queue.put((incident, tuple(fingerprints), future))
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="incident-writer", daemon=True
+                    )
+                    self._thread.start()
+        return future
+
+    def _run(self) -> None:
+        conn = _open()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < MAX_GROUP_COMMIT:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for incident, fingerprints, _ in batch:
+                    _insert(conn, incident, fingerprints)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                for _, _, future in batch:
+                    future.set_exception(e)
+            else:
+                for _, _, future in batch:
+                    future.set_result(None)
+
+
+_writer = _GroupCommitWriter()
+
+
+def _row_to_incident(row) -> Incident:
+    return Incident(
+        log_type=row[0],
+        primary_root_cause=row[1],
+        example_error=row[2],
+        quick_fix=row[3],
+        long_term_fix=row[4],
+    )
+
+
+def add_incident(incident: Incident, fingerprints: Sequence[str] = ()) -> None:
+    """
+    Store an incident, keyed by the stack-trace fingerprints it was seen
+    with, if any. Returns once it is committed; concurrent callers in this
+    process are batched into group commits by the writer thread.
+    """
+    with _lock:
+        _connect()   # schema and legacy import happen before the first write
+    _writer.submit(incident, fingerprints).result()
+
+
+def all_incidents() -> List[Incident]:
+    with _lock:
+        rows = _connect().execute(
+            "SELECT log_type, primary_root_cause, example_error, quick_fix, long_term_fix"
+            " FROM incidents ORDER BY id"
+        ).fetchall()
+    return [_row_to_incident(r) for r in rows]
+
+
+def find_by_fingerprint(fingerprint: str, log_type: Optional[str] = None) -> List[Incident]:
+    """
+    Past incidents that showed this exact stack trace, newest first. A
+    keyed lookup on the fingerprint table: no scan, no similarity scoring.
+    """
+    query = (
+        "SELECT i.log_type, i.primary_root_cause, i.example_error, i.quick_fix, i.long_term_fix"
+        " FROM incident_fingerprints AS f JOIN incidents AS i ON i.id = f.incident_id"
+        " WHERE f.fingerprint = ?"
+    )
+    params: Tuple = (fingerprint,)
+    if log_type is not None:
+        query += " AND i.log_type_key = ?"
+        params += (log_type.lower(),)
+    with _lock:
+        rows = _connect().execute(query + " ORDER BY i.id DESC", params).fetchall()
+    return [_row_to_incident(r) for r in rows]
+
+
+def save_result(signature: str, log_type: str, result: Dict) -> None:
+    """Store (or replace) the full analysis for a signature, as JSON."""
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO incident_results (signature, log_type, result, created_at, hits)"
+                " VALUES (?, ?, ?, ?, 0)",
+                (signature, log_type, json.dumps(result, ensure_ascii=False), time.time()),
+            )
+
+
+def load_result(signature: str) -> Optional[Dict]:
+    """
+    The stored analysis for a signature if there is a fresh one. Every
+    call counts as a lookup in the persistent reuse statistics.
+    """
+    with _lock:
+        conn = _connect()
+        row = conn.execute(
+            "SELECT result, created_at FROM incident_results WHERE signature = ?", (signature,)
+        ).fetchone()
+        hit = row is not None and time.time() - row[1] < RESULT_MAX_AGE_SECONDS
+        with conn:
+            conn.execute(
+                "INSERT INTO result_reuse_stats (id, lookups, hits) VALUES (1, 1, ?)"
+                " ON CONFLICT (id) DO UPDATE SET lookups = lookups + 1, hits = hits + excluded.hits",
+                (int(hit),),
+            )
+            if hit:
+                conn.execute("UPDATE incident_results SET hits = hits + 1 WHERE signature = ?", (signature,))
+    return json.loads(row[0]) if hit else None
+
+
+def reuse_stats() -> ReuseStats:
+    """Lookups and hits of load_result across every run on this store."""
+    with _lock:
+        row = _connect().execute("SELECT lookups, hits FROM result_reuse_stats WHERE id = 1").fetchone()
+    return ReuseStats(*row) if row else ReuseStats()
+
+
+def _token_df(conn: sqlite3.Connection, tokens: Sequence[str]) -> Dict[str, int]:
+    df: Dict[str, int] = {}
+    for chunk in _chunks(tokens):
+        df.update(conn.execute(
+            f"SELECT token, df FROM token_df WHERE token IN ({_placeholders(chunk)})",
+            chunk,
+        ).fetchall())
+    return df
+
+
+def _idf_for(conn: sqlite3.Connection, texts: Iterable[str]) -> Callable[[str], float]:
+    tokens = set()
+    for text in texts:
+        tokens.update(tokenize(text))
+    df = _token_df(conn, list(tokens))
+    # MAX(id) is an index lookup, COUNT(*) would scan the table
+    (n_docs,) = conn.execute("SELECT COALESCE(MAX(id), 0) FROM incidents").fetchone()
+    return lambda tok: math.log((1 + n_docs) / (1 + df.get(tok, 0))) + 1.0
+
+
+def _embed_rows(
+    conn: sqlite3.Connection, rows: Sequence[Tuple[int, str, str]]
+) -> Dict[int, np.ndarray]:
+    """
+    Embed (id, root cause, example error) rows with the current embedder
+    and store their vectors; the caller owns the transaction.
+    """
+    texts = [f"{root_cause}\n{example}" for _, root_cause, example in rows]
+    vectors = embed(texts, _idf_for(conn, texts))
+    name = embedder_name()
+    conn.executemany(
+        "INSERT OR REPLACE INTO incident_vectors (embedder, incident_id, vector) VALUES (?, ?, ?)",
+        [(name, r[0], vec.astype(np.float32).tobytes()) for r, vec in zip(rows, vectors)],
+    )
+    return {r[0]: vec for r, vec in zip(rows, vectors)}
+
+
+def _stored_vectors(
+    conn: sqlite3.Connection, rows: Sequence[Tuple[int, str, str, Optional[bytes]]]
+) -> List[np.ndarray]:
+    # Rows stored before vectors were, or under another embedder, lack one
+    missing = [r[:3] for r in rows if r[3] is None]
+    fresh: Dict[int, np.ndarray] = {}
+    if missing:
+        with conn:
+            fresh = _embed_rows(conn, missing)
+    return [
+        fresh[r[0]] if r[3] is None else np.frombuffer(r[3], dtype=np.float32)
+        for r in rows
+    ]
+
+
+def _candidate_vectors(conn: sqlite3.Connection, ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    name = embedder_name()
+    blobs: Dict[int, bytes] = {}
+    for chunk in _chunks(ids):
+        blobs.update(conn.execute(
+            "SELECT incident_id, vector FROM incident_vectors"
+            f" WHERE embedder = ? AND incident_id IN ({_placeholders(chunk)})",
+            (name, *chunk),
+        ))
+    rows = [(i, "", "", blobs[i]) for i in ids if i in blobs]
+    # Texts are only read for the few incidents that still need embedding
+    missing = [i for i in ids if i not in blobs]
+    for chunk in _chunks(missing):
+        rows.extend(r + (None,) for r in conn.execute(
+            "SELECT id, primary_root_cause, example_error FROM incidents"
+            f" WHERE id IN ({_placeholders(chunk)})",
+            chunk,
+        ))
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+    return np.array([r[0] for r in rows], dtype=np.int64), np.stack(_stored_vectors(conn, rows))
+
+
+def _vector_index(conn: sqlite3.Connection, log_type_key: str) -> VectorIndex:
+    """
+    Bring one log type's partition of the in-memory index up to date:
+    all of its stored vectors on first use, only new incidents afterwards
+    (including rows written by other processes).
+    """
+    global _index, _indexed_upto
+    name = embedder_name()
+    if _index is None or _index.embedder != name:
+        _index, _indexed_upto = VectorIndex(embedder=name), {}
+
+    rows = conn.execute(
+        "SELECT i.id, i.primary_root_cause, i.example_error, v.vector"
+        " FROM incidents AS i LEFT JOIN incident_vectors AS v"
+        " ON v.incident_id = i.id AND v.embedder = ?"
+        " WHERE i.log_type_key = ? AND i.id > ? ORDER BY i.id",
+        (name, log_type_key, _indexed_upto.get(log_type_key, 0)),
+    ).fetchall()
+    for row, vec in zip(rows, _stored_vectors(conn, rows)):
+        _index.add(log_type_key, row[0], vec)
+    if rows:
+        _indexed_upto[log_type_key] = rows[-1][0]
+    return _index
+
+
+def _token_candidates(conn: sqlite3.Connection, log_type_key: str, words: List[str]) -> List[int]:
+    """
+    Incidents sharing the most words with the query, oldest first on ties.
+    Words in no incident are dropped and the rest ranked rarest first; each
+    posting read is a bounded range scan of the (log_type_key, token) key.
+    """
+    df = _token_df(conn, words)
+    rarest = heapq.nsmallest(
+        MAX_QUERY_TOKENS, (w for w in words if df.get(w)), key=lambda w: (df[w], w)
+    )
+    if not rarest:
         return []
+    # One statement: bounded posting reads, counted and ranked inside SQLite
+    postings = " UNION ALL ".join(
+        ["SELECT * FROM (SELECT incident_id FROM incident_tokens"
+         " WHERE log_type_key = ? AND token = ? ORDER BY incident_id DESC LIMIT ?)"] * len(rarest)
+    )
+    params = [p for word in rarest for p in (log_type_key, word, MAX_POSTINGS)]
+    return [incident_id for (incident_id,) in conn.execute(
+        f"SELECT incident_id FROM ({postings}) GROUP BY incident_id"
+        " ORDER BY COUNT(*) DESC, incident_id LIMIT ?",
+        (*params, MAX_CANDIDATES),
+    )]
 
 
-def _save_all(incidents: List[Incident]) -> None:
-    data = [asdict(i) for i in incidents]
-    MEMORY_PATH.write_text(json.dumps(data, indent=2), encoding="utf-8")
+def search_similar_incidents(
+    log_type: str,
+    primary_root_cause: str,
+    k: int = 5,
+    example_error: str = "",
+) -> List[Tuple[Incident, float]]:
+    """
+    Top-k past incidents of the same log type, most similar first, with
+    their cosine similarity. Root cause and example error are embedded as
+    vectors (hashed TF-IDF by default) when stored and scored with one
+    matrix-vector product. With the default embedder only incidents sharing
+    words with the query, found via the inverted token index, are scored;
+    other embedders scan the log type's partition of the in-memory index.
+    """
+    text = f"{primary_root_cause}\n{example_error}"
+    log_type_key = log_type.lower()
 
+    with _lock:
+        conn = _connect()
+        query = embed([text], _idf_for(conn, [text]))[0]
+        if uses_token_candidates():
+            words = list(_tokens(text))
+            if not words:
+                return []
+            candidates = _token_candidates(conn, log_type_key, words)
+            hits = top_k(*_candidate_vectors(conn, candidates), query, k)
+        else:
+            hits = _vector_index(conn, log_type_key).search(log_type_key, query, k)
+        if not hits:
+            return []
+        ids = [incident_id for incident_id, _ in hits]
+        rows = []
+        for chunk in _chunks(ids):
+            rows.extend(conn.execute(
+                "SELECT id, log_type, primary_root_cause, example_error, quick_fix, long_term_fix"
+                f" FROM incidents WHERE id IN ({_placeholders(chunk)})",
+                chunk,
+            ))
 
-def add_incident(incident: Incident) -> None:
-    incidents = _load_all()
-    incidents.append(incident)
-    _save_all(incidents)
+    by_id = {r[0]: _row_to_incident(r[1:]) for r in rows}
+    return [(by_id[i], score) for i, score in hits if i in by_id]
 
 
 def find_similar_incident(
@@ -41,23 +519,9 @@ def find_similar_incident(
     primary_root_cause: str,
 ) -> Optional[Incident]:
     """
-    Very simple similarity: same log type + overlapping words in root cause.
+    Best past incident of the same log type, if it is similar enough.
     """
-    incidents = _load_all()
-    root_words = set(primary_root_cause.lower().split())
-    best_match = None
-    best_overlap = 0
-
-    for inc in incidents:
-        if inc.log_type.lower() != log_type.lower():
-            continue
-        inc_words = set(inc.primary_root_cause.lower().split())
-        overlap = len(root_words & inc_words)
-        if overlap > best_overlap:
-            best_overlap = overlap
-            best_match = inc
-
-    if best_overlap >= 3:
-        return best_match
+    hits = search_similar_incidents(log_type, primary_root_cause, k=1)
+    if hits and hits[0][1] >= MIN_SIMILARITY:
+        return hits[0][0]
     return None
-
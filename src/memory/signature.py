@@ -0,0 +1,37 @@
+# src/memory/signature.py
+
+import hashlib
+import re
+from typing import Iterable
+
+# Tokens still holding a digit after template mining (pod and host names,
+# "worker-1", hashes) differ between recurrences of the same incident
+_VARIABLE_TOKEN_RE = re.compile(r"\S*\d\S*")
+
+
+def normalize_template(template: str) -> str:
+    return _VARIABLE_TOKEN_RE.sub("<*>", template)
+
+
+def incident_signature(
+    log_type: str,
+    error_templates: Iterable[str],
+    fingerprints: Iterable[str],
+) -> str:
+    """
+    Identity of a failure for exact-match reuse: the log type, the set of
+    error templates and the set of stack-trace fingerprints, hashed. Order
+    and counts are left out, so a longer or shorter run of the same failure
+    has the same signature. Empty when the log has neither errors nor
+    traces, since then there is nothing to recognise it by.
+    """
+    templates = sorted({normalize_template(t) for t in error_templates})
+    traces = sorted(set(fingerprints))
+    if not templates and not traces:
+        return ""
+    digest = hashlib.sha256()
+    digest.update(log_type.lower().encode("utf-8"))
+    for part in (templates, traces):
+        digest.update(b"\0")
+        digest.update("\n".join(part).encode("utf-8"))
+    return digest.hexdigest()
@@ -0,0 +1,154 @@
+# src/memory/similarity.py
+
+import math
+import re
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Width of the dense vectors the default embedder produces
+DIM = 256
+
+# Words too common to say anything about a root cause
+STOPWORDS = frozenset(
+    "a an and are as at be been but by due for from has have in is it its "
+    "of on or that the this to was were which while with".split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# texts -> (len(texts), dim) float32 array of L2-normalised rows
+Embedder = Callable[[Sequence[str]], np.ndarray]
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+@lru_cache(maxsize=1 << 16)
+def _bucket(feature: str) -> Tuple[int, float]:
+    # Stable hash (unlike hash()), so vectors mean the same thing across
+    # processes; one bit picks the sign so collisions cancel out on average
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % DIM, (1.0 if h & 0x80000000 else -1.0)
+
+
+def hashed_tfidf(text: str, idf: Callable[[str], float]) -> np.ndarray:
+    """
+    Sublinear TF-IDF over unigrams and bigrams, folded into DIM dimensions
+    with the signed hashing trick. Works offline, no model needed.
+    """
+    tokens = tokenize(text)
+    vec = np.zeros(DIM, dtype=np.float32)
+
+    for token, tf in Counter(tokens).items():
+        idx, sign = _bucket(token)
+        vec[idx] += sign * (1.0 + math.log(tf)) * idf(token)
+    for (a, b), tf in Counter(zip(tokens, tokens[1:])).items():
+        idx, sign = _bucket(f"{a} {b}")
+        vec[idx] += sign * (1.0 + math.log(tf)) * 0.5 * (idf(a) + idf(b))
+
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+class _Partition:
+    """Growable contiguous matrix of vectors plus their (sorted) ids."""
+
+    def __init__(self, dim: int) -> None:
+        self.size = 0
+        self.ids = np.zeros(16, dtype=np.int64)
+        self.matrix = np.zeros((16, dim), dtype=np.float32)
+
+    def add(self, incident_id: int, vec: np.ndarray) -> None:
+        if self.size == len(self.ids):
+            # Doubling keeps appends amortised O(1)
+            self.ids = np.resize(self.ids, 2 * len(self.ids))
+            grown = np.zeros((2 * len(self.matrix), self.matrix.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.matrix[:self.size]
+            self.matrix = grown
+        self.ids[self.size] = incident_id
+        self.matrix[self.size] = vec
+        self.size += 1
+
+
+def top_k(ids: np.ndarray, matrix: np.ndarray, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """The k rows of matrix scoring highest against query, as (id, score)."""
+    if len(ids) == 0 or k <= 0:
+        return []
+    scores = matrix @ query
+    if len(scores) > k:
+        # Keep every row tied with the k-th score, so the tie-break below
+        # (not argpartition) decides which of them make the cut
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        top = np.flatnonzero(scores >= kth)
+    else:
+        top = np.arange(len(scores))
+    # Highest score first; ties go to the oldest incident
+    top = sorted(top, key=lambda i: (-scores[i], ids[i]))[:k]
+    return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+class VectorIndex:
+    """
+    In-memory vector index partitioned by key (the log type).
+    Search is a single matrix-vector product over the partition followed
+    by a top-k selection.
+    """
+
+    def __init__(self, embedder: str = "") -> None:
+        self.embedder = embedder   # name of the embedder the vectors came from
+        self._parts: Dict[str, _Partition] = {}
+
+    def __len__(self) -> int:
+        return sum(p.size for p in self._parts.values())
+
+    def add(self, key: str, incident_id: int, vec: np.ndarray) -> None:
+        part = self._parts.get(key)
+        if part is None:
+            part = self._parts[key] = _Partition(len(vec))
+        # ids are appended in increasing order, so each partition stays sorted
+        part.add(incident_id, vec)
+
+    def search(self, key: str, query: np.ndarray, k: int = 5) -> List[Tuple[int, float]]:
+        part = self._parts.get(key)
+        if part is None:
+            return []
+        return top_k(part.ids[:part.size], part.matrix[:part.size], query, k)
+
+
+_embedder: Optional[Embedder] = None
+_embedder_name = "hashed-tfidf"
+
+
+def set_embedder(embedder: Optional[Embedder], name: str = "custom") -> None:
+    """
+    Plug in an embedding model (e.g. a local sentence encoder). Vectors are
+    stored per embedder name, so switching re-embeds incidents as lookups
+    reach them.
+    Pass None to go back to the built-in hashed TF-IDF.
+    """
+    global _embedder, _embedder_name
+    _embedder = embedder
+    _embedder_name = name if embedder is not None else "hashed-tfidf"
+
+
+def embedder_name() -> str:
+    return _embedder_name
+
+
+def uses_token_candidates() -> bool:
+    # Hashed TF-IDF only scores above noise when words are shared, so the
+    # inverted index can pick candidates; a semantic embedder cannot rely on that
+    return _embedder is None
+
+
+def embed(texts: Sequence[str], idf: Callable[[str], float]) -> np.ndarray:
+    if _embedder is not None:
+        return np.asarray(_embedder(texts), dtype=np.float32)
+    if not texts:
+        return np.zeros((0, DIM), dtype=np.float32)
+    return np.stack([hashed_tfidf(t, idf) for t in texts])
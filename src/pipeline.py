@@ -1,86 +1,45 @@
+import argparse
+import cProfile
 import pathlib
+from typing import Any, Callable, Dict, Iterable, List
 
 from .agents.log_type_detector import run as detect_log_type
-from .agents.segmenter_cluster import run as segment_logs
+from .agents.segmenter_cluster import (
+    SegmentResult,
+    excerpt,
+    run as segment_log_text,
+    run_mapped as segment_log_mapped,
+    run_merged as segment_log_merged,
+    run_stream as segment_log_stream,
+)
 from .agents.root_cause_analyst import run as analyze_root_cause
 from .agents.fix_recommender import run as recommend_fixes
-from .agents.knowledge_memory_agent import store_incident, find_similar
-from .tools.file_read_tool import read_log_file
+from .agents.knowledge_memory_agent import find_reusable, find_similar, store_analysis, store_incident
+from .instrumentation import Span, span, write_metrics
+from .llm_client import TokenUsage, track_usage
+from .memory.incident_store import reuse_stats
+from .memory.signature import incident_signature
+from .report import AnalysisReport, render_text
+from .scheduler import Stage, run_dag
+from .tools.file_read_tool import is_compressed, iter_log_lines, iter_rotated_lines
+from .tools.line_index import open_mapped_log
+from .tools.log_merger import iter_timed_lines, merge_log_files, source_labels, time_window
+from .tools.log_search_tool import ERROR_KEYWORDS, iter_keyword_hits, match_keyword
+from .tools.timestamps import NO_TIMESTAMP, iso_to_ns
 
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
 
-def analyze_log_file(rel_path: str):
-    full_path = BASE_DIR / rel_path
-    print(f"\n=== Analyzing: {full_path} ===")
-    trace = []
-    metrics = {
-        "lines_total": 0,
-        "error_samples_count": 0,
-        "segments_count": 0,
-    }
-    # read log file
-    log_text = read_log_file(rel_path)
-    metrics["lines_total"] = len(log_text.splitlines())
-
-    # 1) detect log type
-    lt_result = detect_log_type(log_text)
-    print(f"\n[1] Log type detected: {lt_result.log_type}")
-    if lt_result.severity_summary:
-        print(f"    Severities: {lt_result.severity_summary}")
-    trace.append("LogTypeDetector: completed")
-
-    # 2) segment logs & extract errors
-    seg_result = segment_logs(log_text)
-    print(f"\n[2] Segments found: {[s.id for s in seg_result.segments]}")
-    print(f"    Error samples: {len(seg_result.error_samples)} lines")
-    metrics["segments_count"] = len(seg_result.segments)
-    metrics["error_samples_count"] = len(seg_result.error_samples)
-    trace.append("SegmenterCluster: completed")
-
-    # 3) root cause analysis
-    rc_result = analyze_root_cause(
-        log_type=lt_result.log_type,
-        segments=seg_result.segments,
-        error_samples=seg_result.error_samples,
-    )
-    print(f"\n[3] Primary root cause: {rc_result.primary_root_cause}")
-    if rc_result.symptoms:
-        print("    Symptoms:")
-        for s in rc_result.symptoms:
-            print(f"    - {s}")
-    if rc_result.confidence is not None:
-        print(f"    Confidence: {rc_result.confidence}")
-    # 3.5) Memory lookup: has this happened before?
-    similar = find_similar(
-        log_type=lt_result.log_type,
-        primary_root_cause=rc_result.primary_root_cause,
-    )
-    if similar:
-        print("\n[3.5] Similar past incident found in memory:")
-        print(f"     Past root cause: {similar.primary_root_cause}")
-        print(f"     Past quick fix: {similar.quick_fix}")
-        print(f"     Past long-term fix: {similar.long_term_fix}")
-    else:
-        print("\n[3.5] No similar past incident found in memory.")
-    trace.append("RootCauseAnalyst: completed")
-
-    # 4) fix recommendations
-    fix_result = recommend_fixes(
-        log_type=lt_result.log_type,
-        primary_root_cause=rc_result.primary_root_cause,
-        symptoms=rc_result.symptoms,
+def _signature(lt_result, seg_result: SegmentResult) -> str:
+    return incident_signature(
+        lt_result.log_type,
+        seg_result.error_templates,
+        seg_result.trace_fingerprints,
     )
-    print("\n[4] Suggested quick fixes:")
-    for q in fix_result.quick_fixes:
-        print(f"   - {q}")
 
-    print("\n[5] Suggested long-term prevention:")
-    for item in fix_result.long_term_fixes:
-        print(f"   - {item}")
-    
-    trace.append("FixRecommender: completed")
 
-    # 5.5) Store this incident in memory for future use
+def _store(lt_result, seg_result, signature, rc_result, fix_result, _similar, reused) -> None:
+    if reused is not None:
+        return   # already in memory; storing it again would only duplicate it
     example_error = seg_result.error_samples[0] if seg_result.error_samples else ""
     first_quick = fix_result.quick_fixes[0] if fix_result.quick_fixes else ""
     first_long = fix_result.long_term_fixes[0] if fix_result.long_term_fixes else ""
@@ -91,21 +50,393 @@ def analyze_log_file(rel_path: str):
         example_error=example_error,
         quick_fix=first_quick,
         long_term_fix=first_long,
+        fingerprints=seg_result.trace_fingerprints,
     )
-    trace.append("KnowledgeMemoryAgent: stored_incident")
-    print("\n[6] Trace:")
-    for step in trace:
-        print(f"   - {step}")
+    store_analysis(signature, lt_result.log_type, rc_result, fix_result)
+
+
+def _detect_log_type_from_excerpt(seg_result: SegmentResult, use_cache: bool = True):
+    lt_result = detect_log_type(excerpt(seg_result), use_cache=use_cache)
+    # The excerpt only holds a few windows; the segmenter counted every line
+    if seg_result.severity_counts:
+        lt_result.severity_summary = seg_result.severity_counts
+    return lt_result
+
+
+def build_agent_stages(
+    segment: Callable[[], SegmentResult],
+    log_type_text: str | None = None,
+    refresh: bool = False,
+) -> List[Stage]:
+    """
+    The agent graph shared by the CLI and the Streamlit app.
+    Log type detection runs on log_type_text when it is given, in parallel
+    with segmentation; otherwise it waits for the segment excerpt.
+    The log's signature (log type, error templates, stack fingerprints) is
+    looked up in memory first; on a hit the stored root cause and fixes
+    are returned and no further LLM call is made. With refresh the lookup
+    and the response cache are skipped, and the stored analysis replaced.
+    Otherwise the memory lookup overlaps with fix recommendation, and the
+    incident is stored only after the lookup so it never matches itself.
+    """
+    if log_type_text is not None:
+        log_type_stage = Stage("log_type", lambda: detect_log_type(log_type_text, use_cache=not refresh))
+    else:
+        log_type_stage = Stage(
+            "log_type",
+            lambda seg: _detect_log_type_from_excerpt(seg, use_cache=not refresh),
+            deps=("segments",),
+        )
+
+    return [
+        Stage("segments", segment),
+        log_type_stage,
+        Stage("signature", _signature, deps=("log_type", "segments")),
+        Stage(
+            "reused",
+            lambda signature: None if refresh else find_reusable(signature),
+            deps=("signature",),
+        ),
+        Stage(
+            "root_cause",
+            lambda lt, seg, reused: reused.root_cause if reused is not None else analyze_root_cause(
+                log_type=lt.log_type,
+                # Windows for context, mined templates for the shape of the whole log
+                segments=seg.segments + seg.templates,
+                error_samples=seg.error_samples,
+                stack_traces=seg.stack_traces,
+                use_cache=not refresh,
+            ),
+            deps=("log_type", "segments", "reused"),
+        ),
+        Stage(
+            "fixes",
+            lambda lt, rc, reused: reused.fixes if reused is not None else recommend_fixes(
+                log_type=lt.log_type,
+                primary_root_cause=rc.primary_root_cause,
+                symptoms=rc.symptoms,
+                use_cache=not refresh,
+            ),
+            deps=("log_type", "root_cause", "reused"),
+        ),
+        Stage(
+            "similar",
+            lambda lt, rc, reused: None if reused is not None else find_similar(
+                log_type=lt.log_type,
+                primary_root_cause=rc.primary_root_cause,
+            ),
+            deps=("log_type", "root_cause", "reused"),
+        ),
+        Stage(
+            "store",
+            _store,
+            deps=("log_type", "segments", "signature", "root_cause", "fixes", "similar", "reused"),
+        ),
+    ]
+
+
+def _tracked(stage: Stage, usage: Dict[str, TokenUsage], parent: Span) -> Callable[..., Any]:
+    # Stages run on pool threads, so the analysis span is passed in explicitly
+    def run(*deps):
+        with span(f"stage.{stage.name}", parent=parent), track_usage() as stage_usage:
+            usage[stage.name] = stage_usage
+            return stage.fn(*deps)
+    return run
+
+
+def run_analysis(
+    source: str,
+    segment: Callable[[], SegmentResult],
+    log_type_text: str | None = None,
+    refresh: bool = False,
+) -> AnalysisReport:
+    """
+    Run the agent graph once and collect everything it produced, with
+    per-stage timings and LLM token usage, into an AnalysisReport.
+    """
+    stages = build_agent_stages(segment, log_type_text, refresh)
+    usage: Dict[str, TokenUsage] = {}
+    with span("analysis", source=source) as root:
+        dag = run_dag([Stage(s.name, _tracked(s, usage, root), s.deps) for s in stages])
+
+    seg_result = dag.results["segments"]
+    token_usage = {s.name: usage[s.name] for s in stages if s.name in usage}
+    metrics: Dict[str, Any] = {
+        "lines_total": seg_result.lines_total,
+        "error_samples_count": len(seg_result.error_samples),
+        "segments_count": len(seg_result.segments),
+        "error_lines_total": seg_result.error_lines_total,
+        "stack_traces_total": seg_result.stack_traces_total,
+        "stack_traces_distinct": len(seg_result.stack_traces),
+    }
+    for level, count in seg_result.severity_counts.items():
+        metrics[f"severity_{level.lower()}"] = count
+    metrics["llm_calls"] = sum(u.calls for u in token_usage.values())
+    metrics["llm_cached_calls"] = sum(u.cached_calls for u in token_usage.values())
+    metrics["prompt_tokens"] = sum(u.prompt_tokens for u in token_usage.values())
+    metrics["response_tokens"] = sum(u.response_tokens for u in token_usage.values())
+    reused = dag.results["reused"]
+    stats = reuse_stats()
+    metrics["result_reused"] = int(reused is not None)
+    metrics["reuse_lookups"] = stats.lookups
+    metrics["reuse_hit_rate"] = round(stats.hit_rate, 3)
+
+    if reused is not None:
+        trace = [
+            "LogTypeDetector: completed",
+            "SegmenterCluster: completed",
+            f"KnowledgeMemoryAgent: reused stored analysis ({reused.signature[:12]})",
+        ]
+    else:
+        trace = [
+            "LogTypeDetector: completed",
+            "SegmenterCluster: completed",
+            "RootCauseAnalyst: completed",
+            "FixRecommender: completed",
+            "KnowledgeMemoryAgent: stored_incident",
+        ]
+
+    return AnalysisReport(
+        source=source,
+        log_type=dag.results["log_type"],
+        segments=seg_result,
+        root_cause=dag.results["root_cause"],
+        fixes=dag.results["fixes"],
+        similar=dag.results["similar"],
+        timings=dag.timings,
+        critical_path=dag.critical_path,
+        wall_time=dag.wall_time,
+        token_usage=token_usage,
+        trace=trace,
+        metrics=metrics,
+        signature=dag.results["signature"],
+        reused=reused is not None,
+    )
+
 
-    print("\n[7] Metrics:")
-    for k, v in metrics.items():
-        print(f"   {k}: {v}")
+def analyze_text(log_text: str, source: str = "<text>", refresh: bool = False) -> AnalysisReport:
+    """
+    Analyse log text already in memory (the Streamlit path). Log type
+    detection sees the full text and runs alongside segmentation.
+    """
+    return run_analysis(source, lambda: segment_log_text(log_text), log_type_text=log_text, refresh=refresh)
 
-def main():
-    # change this path to test other logs
-    analyze_log_file("examples/java_error.log")
+
+def analyze_lines(lines: Iterable[str], source: str, refresh: bool = False) -> AnalysisReport:
+    """
+    Analyse a log given as a line iterator (e.g. a decompressing stream) in
+    bounded memory; log type detection sees the segment excerpt.
+    """
+    return run_analysis(source, lambda: segment_log_stream(lines), refresh=refresh)
+
+
+def _segment_mapped(path: pathlib.Path, workers: int | None) -> SegmentResult:
+    return segment_log_mapped(open_mapped_log(path), workers=workers)
+
+
+def _segment_window(
+    path: pathlib.Path,
+    since_ns: int | None,
+    until_ns: int | None,
+    minutes_before_error: float | None,
+) -> SegmentResult:
+    """
+    Segment only the lines in a time window, found by binary search on the
+    file's sparse time index; the rest of the file is never decoded.
+    minutes_before_error picks the window ending at the first error line.
+    """
+    log = open_mapped_log(path)
+    index = log.time_index()
+    if minutes_before_error is not None:
+        hit = next(iter_keyword_hits(log.buffer, ERROR_KEYWORDS), None)
+        first_error = index.time_at(hit.start) if hit else None
+        if first_error is not None:
+            since_ns = first_error - int(minutes_before_error * 60e9)
+            until_ns = first_error + 1
+    return segment_log_stream(index.iter_window(since_ns, until_ns))
+
+
+def _segment_stream_window(
+    read_lines: Callable[[], Iterable[str]],
+    since_ns: int | None,
+    until_ns: int | None,
+    minutes_before_error: float | None,
+) -> SegmentResult:
+    """
+    _segment_window for input without random access (compressed or
+    rotated logs): lines are dated as they stream past, as log_merger
+    does, and kept while inside the window. minutes_before_error takes a
+    first pass, up to the first error line, to place the window.
+    """
+    if minutes_before_error is not None:
+        first_error = next(
+            (
+                record.timestamp for record in iter_timed_lines(read_lines(), "")
+                if record.timestamp != NO_TIMESTAMP and match_keyword(record.line, ERROR_KEYWORDS) is not None
+            ),
+            None,
+        )
+        if first_error is not None:
+            since_ns = first_error - int(minutes_before_error * 60e9)
+            until_ns = first_error + 1
+    window = time_window(iter_timed_lines(read_lines(), ""), since_ns, until_ns)
+    return segment_log_stream(record.line for record in window)
+
+
+def segment_log_file(
+    rel_path: str,
+    rotated: bool = False,
+    workers: int | None = 1,
+    since_ns: int | None = None,
+    until_ns: int | None = None,
+    minutes_before_error: float | None = None,
+) -> SegmentResult:
+    """Local stages of analyze_log_file: pick a reader for the file and segment it."""
+    path = BASE_DIR / rel_path
+    windowed = since_ns is not None or until_ns is not None or minutes_before_error is not None
+    if not rotated and not is_compressed(path):
+        if windowed:
+            return _segment_window(path, since_ns, until_ns, minutes_before_error)
+        return _segment_mapped(path, workers)
+    read_lines = lambda: (iter_rotated_lines if rotated else iter_log_lines)(rel_path)
+    if windowed:
+        return _segment_stream_window(read_lines, since_ns, until_ns, minutes_before_error)
+    return segment_log_stream(read_lines())
+
+
+def analyze_log_file(
+    rel_path: str,
+    verbose: bool = True,
+    profile_path: str | None = None,
+    rotated: bool = False,
+    workers: int = 1,
+    since_ns: int | None = None,
+    until_ns: int | None = None,
+    minutes_before_error: float | None = None,
+    refresh: bool = False,
+) -> AnalysisReport:
+    """
+    Compressed files (.gz/.bz2/.zst) are decompressed as they are read.
+    With rotated, the rotated siblings (app.log.1, app.log.2.gz, ...) are
+    read first, oldest first, as one log.
+    A plain file is memory-mapped; its line index is kept between
+    analyses until the file changes. With workers other than 1 (None:
+    every core) it is scanned in parallel chunks.
+    since_ns/until_ns (ns since the epoch) or minutes_before_error limit
+    the log to a time window; line numbers are then counted from the
+    start of the window. A plain file finds the window by binary search;
+    compressed and rotated input is read from the start to the window's end.
+    With profile_path, the local stages (reading and segmenting) run first
+    on this thread under cProfile and the stats are written there; view
+    them with snakeviz, or turn them into a flame graph with flameprof.
+    """
+    # segments, error samples and line counts are collected with bounded
+    # memory, whatever the file size; the log type is detected from the
+    # bounded excerpt (head, error bursts, tail)
+    path = BASE_DIR / rel_path
+    segment = lambda: segment_log_file(rel_path, rotated, workers, since_ns, until_ns, minutes_before_error)
+    if profile_path:
+        profiler = cProfile.Profile()
+        seg_result = profiler.runcall(segment)
+        profiler.dump_stats(profile_path)
+        segment = lambda: seg_result
+        if verbose:
+            print(f"Profile of local stages written to {profile_path}")
+
+    report = run_analysis(str(path), segment, refresh=refresh)
+    if verbose:
+        print(render_text(report))
+    return report
+
+
+def analyze_log_files(
+    rel_paths: List[str],
+    verbose: bool = True,
+    since_ns: int | None = None,
+    until_ns: int | None = None,
+    refresh: bool = False,
+) -> AnalysisReport:
+    """
+    Correlate several logs of one incident (e.g. scheduler, pod and app):
+    they are merged into one time-ordered timeline, each line tagged with
+    its source, and analysed once, so a failure cascading across services
+    is segmented and explained as a single incident.
+    """
+    paths = [BASE_DIR / p for p in rel_paths]
+    segment = lambda: segment_log_merged(merge_log_files(rel_paths, since_ns, until_ns))
+    report = run_analysis(" + ".join(source_labels(paths)), segment, refresh=refresh)
+    if verbose:
+        print(render_text(report))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyse a log file, or correlate several; for many independent logs use src.batch.",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["examples/java_error.log"],
+        help="one log, or several to merge into one timeline by timestamp",
+    )
+    parser.add_argument("--rotated", action="store_true", help="include rotated siblings (path.1, path.2.gz, ...)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes for the local scans of a large plain log (0: every core)",
+    )
+    parser.add_argument("--since", metavar="TIME", help="only lines at or after this ISO-8601 time (UTC if no zone)")
+    parser.add_argument("--until", metavar="TIME", help="only lines before this ISO-8601 time")
+    parser.add_argument(
+        "--before-first-error",
+        metavar="MINUTES",
+        type=float,
+        help="only the MINUTES before the first error line (and that line)",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="run the full LLM analysis even if a stored one matches, and replace it",
+    )
+    parser.add_argument("--profile", metavar="FILE", help="write a cProfile of the local stages to FILE")
+    parser.add_argument(
+        "--metrics-out",
+        metavar="FILE",
+        help="write span metrics: OpenTelemetry JSON for *.json, Prometheus text otherwise",
+    )
+    args = parser.parse_args(argv)
+
+    bounds = {}
+    for name in ("since", "until"):
+        text = getattr(args, name)
+        if text is not None:
+            bounds[name] = iso_to_ns(text)
+            if bounds[name] == NO_TIMESTAMP:
+                parser.error(f"--{name}: not an ISO-8601 time: {text!r}")
+
+    if len(args.paths) > 1:
+        if args.rotated or args.workers != 1 or args.before_first_error is not None or args.profile:
+            parser.error("--rotated, --workers, --before-first-error and --profile take a single log")
+        analyze_log_files(
+            args.paths, since_ns=bounds.get("since"), until_ns=bounds.get("until"), refresh=args.refresh,
+        )
+    else:
+        analyze_log_file(
+            args.paths[0],
+            profile_path=args.profile,
+            rotated=args.rotated,
+            workers=args.workers or None,
+            since_ns=bounds.get("since"),
+            until_ns=bounds.get("until"),
+            minutes_before_error=args.before_first_error,
+            refresh=args.refresh,
+        )
+    if args.metrics_out:
+        write_metrics(args.metrics_out)
+        print(f"\nMetrics written to {args.metrics_out}")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,150 @@
+# src/report.py
+
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .agents.fix_recommender import FixResult
+from .agents.log_type_detector import LogTypeResult
+from .agents.root_cause_analyst import RootCauseResult
+from .agents.segmenter_cluster import LogSegment, SegmentResult
+from .llm_client import TokenUsage
+from .memory.incident_store import Incident
+from .scheduler import StageTiming
+from .tools.stack_traces import StackTrace, TraceGroup
+
+try:
+    import msgpack
+except ImportError:   # optional; JSON works without it
+    msgpack = None
+
+
+@dataclass(slots=True)
+class AnalysisReport:
+    """
+    Everything one analysis produced: every stage result, per-stage
+    timings and LLM token usage. The CLI and the Streamlit app both render
+    from this, and it round-trips through JSON/msgpack so reports can be
+    cached, diffed and exported without re-running the agents.
+    """
+    source: str
+    log_type: LogTypeResult
+    segments: SegmentResult
+    root_cause: RootCauseResult
+    fixes: FixResult
+    similar: Optional[Incident] = None
+    timings: Dict[str, StageTiming] = field(default_factory=dict)
+    critical_path: List[str] = field(default_factory=list)
+    wall_time: float = 0.0
+    token_usage: Dict[str, TokenUsage] = field(default_factory=dict)
+    trace: List[str] = field(default_factory=list)
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    # Incident signature, and whether root cause and fixes were reused
+    # from an earlier analysis with the same signature
+    signature: str = ""
+    reused: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AnalysisReport":
+        seg = dict(data["segments"])
+        seg["segments"] = [LogSegment(**s) for s in seg["segments"]]
+        seg["templates"] = [LogSegment(**s) for s in seg.get("templates", [])]
+        seg["stack_traces"] = [
+            TraceGroup(**{**g, "trace": StackTrace(**g["trace"])}) for g in seg.get("stack_traces", [])
+        ]
+        similar = data.get("similar")
+        return cls(
+            source=data["source"],
+            log_type=LogTypeResult(**data["log_type"]),
+            segments=SegmentResult(**seg),
+            root_cause=RootCauseResult(**data["root_cause"]),
+            fixes=FixResult(**data["fixes"]),
+            similar=Incident(**similar) if similar else None,
+            timings={k: StageTiming(**v) for k, v in data.get("timings", {}).items()},
+            critical_path=list(data.get("critical_path", [])),
+            wall_time=data.get("wall_time", 0.0),
+            token_usage={k: TokenUsage(**v) for k, v in data.get("token_usage", {}).items()},
+            trace=list(data.get("trace", [])),
+            metrics=dict(data.get("metrics", {})),
+            signature=data.get("signature", ""),
+            reused=data.get("reused", False),
+        )
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        separators = None if indent else (",", ":")
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent, separators=separators)
+
+    @classmethod
+    def from_json(cls, text: str) -> "AnalysisReport":
+        return cls.from_dict(json.loads(text))
+
+    def to_msgpack(self) -> bytes:
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed (pip install msgpack)")
+        return msgpack.packb(self.to_dict(), use_bin_type=True)
+
+    @classmethod
+    def from_msgpack(cls, data: bytes) -> "AnalysisReport":
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed (pip install msgpack)")
+        return cls.from_dict(msgpack.unpackb(data, raw=False, strict_map_key=False))
+
+
+def render_text(report: AnalysisReport) -> str:
+    """The CLI's plain-text incident report."""
+    lt, seg, rc, fixes, similar = (
+        report.log_type, report.segments, report.root_cause, report.fixes, report.similar,
+    )
+    out = [f"\n=== Analyzing: {report.source} ==="]
+
+    out.append(f"\n[1] Log type detected: {lt.log_type}")
+    if lt.severity_summary:
+        out.append(f"    Severities: {lt.severity_summary}")
+
+    out.append(f"\n[2] Segments found: {[s.id for s in seg.segments]}")
+    out.append(f"    Error samples: {len(seg.error_samples)} lines")
+    if seg.stack_traces:
+        out.append(f"    Stack traces: {seg.stack_traces_total} ({len(seg.stack_traces)} distinct shown)")
+        for g in seg.stack_traces:
+            name = g.trace.exception or g.trace.message[:80]
+            out.append(f"    - {g.fingerprint} {g.count}x {g.trace.language}: {name}")
+
+    out.append(f"\n[3] Primary root cause: {rc.primary_root_cause}")
+    if rc.symptoms:
+        out.append("    Symptoms:")
+        out.extend(f"    - {s}" for s in rc.symptoms)
+    if rc.confidence is not None:
+        out.append(f"    Confidence: {rc.confidence}")
+    if report.reused:
+        out.append(f"\n[3.5] Known incident (signature {report.signature[:12]}): stored analysis reused.")
+    elif similar:
+        out.append("\n[3.5] Similar past incident found in memory:")
+        out.append(f"     Past root cause: {similar.primary_root_cause}")
+        out.append(f"     Past quick fix: {similar.quick_fix}")
+        out.append(f"     Past long-term fix: {similar.long_term_fix}")
+    else:
+        out.append("\n[3.5] No similar past incident found in memory.")
+
+    out.append("\n[4] Suggested quick fixes:")
+    out.extend(f"   - {q}" for q in fixes.quick_fixes)
+    out.append("\n[5] Suggested long-term prevention:")
+    out.extend(f"   - {item}" for item in fixes.long_term_fixes)
+
+    out.append("\n[6] Trace:")
+    out.extend(f"   - {step}" for step in report.trace)
+
+    out.append("\n[7] Metrics:")
+    out.extend(f"   {k}: {v}" for k, v in report.metrics.items())
+
+    out.append("\n[8] Stage timings:")
+    for name, timing in report.timings.items():
+        line = f"   {name}: {timing.start:.2f}s -> {timing.end:.2f}s ({timing.duration:.2f}s)"
+        usage = report.token_usage.get(name)
+        if usage and usage.calls:
+            line += f", {usage.calls} LLM call(s), ~{usage.prompt_tokens}+{usage.response_tokens} tokens"
+        out.append(line)
+    out.append(f"   critical path: {' -> '.join(report.critical_path)} ({report.wall_time:.2f}s wall)")
+    return "\n".join(out)
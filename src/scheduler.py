@@ -0,0 +1,122 @@
+# src/scheduler.py
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[..., Any]
+    # fn is called with the results of these stages, in this order
+    deps: Tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
+class StageTiming:
+    name: str
+    start: float   # seconds since the DAG started
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class DagResult:
+    results: Dict[str, Any]
+    timings: Dict[str, StageTiming]
+    critical_path: List[str] = field(default_factory=list)
+    wall_time: float = 0.0
+
+
+def _check_graph(stages: Sequence[Stage]) -> None:
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stage names: {names}")
+
+    known = set(names)
+    for s in stages:
+        missing = [d for d in s.deps if d not in known]
+        if missing:
+            raise ValueError(f"Stage '{s.name}' depends on unknown stages: {missing}")
+
+    # Kahn's algorithm: anything left over is part of a cycle
+    remaining = {s.name: set(s.deps) for s in stages}
+    ready = [n for n, deps in remaining.items() if not deps]
+    while ready:
+        done = ready.pop()
+        del remaining[done]
+        for n, deps in remaining.items():
+            deps.discard(done)
+            if not deps and n not in ready:
+                ready.append(n)
+    if remaining:
+        raise ValueError(f"Stage graph has a cycle among: {sorted(remaining)}")
+
+
+def _critical_path(stages: Sequence[Stage], timings: Dict[str, StageTiming]) -> List[str]:
+    """
+    Walk back from the stage that finished last, each time following the
+    dependency that finished last: that chain bounds the wall-clock time.
+    """
+    if not timings:
+        return []
+    by_name = {s.name: s for s in stages}
+    current = max(timings.values(), key=lambda t: t.end).name
+    path = [current]
+    while by_name[current].deps:
+        current = max(by_name[current].deps, key=lambda d: timings[d].end)
+        path.append(current)
+    path.reverse()
+    return path
+
+
+def run_dag(stages: Sequence[Stage], max_workers: int = 4) -> DagResult:
+    """
+    Run stages on a thread pool, starting each one as soon as all of its
+    dependencies have finished. The first exception raised by a stage is
+    re-raised once running stages have stopped; stages not yet started
+    are skipped.
+    """
+    _check_graph(stages)
+
+    results: Dict[str, Any] = {}
+    timings: Dict[str, StageTiming] = {}
+    pending = list(stages)
+    running: Dict[Future, Stage] = {}
+    t0 = time.perf_counter()
+
+    def timed(stage: Stage, args: List[Any]) -> Any:
+        start = time.perf_counter() - t0
+        try:
+            return stage.fn(*args)
+        finally:
+            timings[stage.name] = StageTiming(stage.name, start, time.perf_counter() - t0)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for stage in [s for s in pending if all(d in results for d in s.deps)]:
+                pending.remove(stage)
+                args = [results[d] for d in stage.deps]
+                running[pool.submit(timed, stage, args)] = stage
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage = running.pop(fut)
+                exc = fut.exception()
+                if exc is not None:
+                    pending.clear()
+                    wait(running)
+                    raise exc
+                results[stage.name] = fut.result()
+
+    return DagResult(
+        results=results,
+        timings=timings,
+        critical_path=_critical_path(stages, timings),
+        wall_time=time.perf_counter() - t0,
+    )
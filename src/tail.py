@@ -0,0 +1,201 @@
+# src/tail.py
+"""
+Follow a growing log and analyse each new error burst as it appears.
+
+The file is polled like `tail -F` (rotation and truncation included) and
+every appended line is fed once into the incremental segmenter, which keeps
+the severity counters, template miner and burst windows up to date. The
+agents only run when a new error burst starts: once errors have been quiet
+for a few seconds (or the burst has gone on for max_wait), and never more
+often than min_interval. Run with:
+
+    python -m src.tail /var/log/pods/payments/app.log
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from .agents.segmenter_cluster import SegmentAccumulator, SegmentResult
+from .pipeline import run_analysis
+from .report import AnalysisReport, render_text
+from .tools.file_read_tool import DEFAULT_POLL_INTERVAL, LogFollower
+from .tools.log_parser import PROBE_BYTES, LogParser, detect_buffer_format
+
+# Error lines must stop for this long before a burst is analysed, so the
+# report sees the whole burst and its trailing context ...
+DEBOUNCE_SECONDS = 5.0
+# ... unless the burst keeps going (a crash loop), then analyse anyway
+MAX_WAIT_SECONDS = 30.0
+# At most one analysis per this many seconds; later bursts wait their turn
+MIN_INTERVAL_SECONDS = 60.0
+
+
+def _file_format(path: pathlib.Path) -> Optional[LogParser]:
+    # From the head of the file, even when following starts at its end
+    try:
+        with path.open("rb") as fh:
+            return detect_buffer_format(fh.read(PROBE_BYTES * 4 + 1))
+    except FileNotFoundError:
+        return None
+
+
+class TailSession:
+    """
+    Incremental state for one followed log, and the decision of when the
+    next analysis is due. Bursts already in the file when following starts
+    are counted but do not trigger an analysis.
+    """
+
+    def __init__(
+        self,
+        rel_path: str,
+        from_start: bool = True,
+        debounce: float = DEBOUNCE_SECONDS,
+        max_wait: float = MAX_WAIT_SECONDS,
+        min_interval: float = MIN_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.follower = LogFollower(rel_path, from_start=from_start)
+        self.segmenter = SegmentAccumulator(_file_format(self.follower.path))
+        self.source = str(self.follower.path)
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.min_interval = min_interval
+        self.clock = clock
+
+        self.segmenter.feed_all(self.follower.read_new())
+        self.segmenter.new_window()
+        self._analysed_bursts = self.segmenter.bursts_total
+        self._pending_since: Optional[float] = None
+        self._last_error_at: Optional[float] = None
+        self._last_analysis_at: Optional[float] = None
+
+    def poll(self) -> int:
+        """Feed whatever was appended since the last poll; returns the line count."""
+        lines = self.follower.read_new()
+        if not lines:
+            return 0
+        errors_before = self.segmenter.error_lines_total
+        self.segmenter.feed_all(lines)
+        now = self.clock()
+        if self.segmenter.error_lines_total > errors_before:
+            self._last_error_at = now
+        if self._pending_since is None and self.segmenter.bursts_total > self._analysed_bursts:
+            self._pending_since = now
+        return len(lines)
+
+    def due(self) -> bool:
+        if self._pending_since is None:
+            return False
+        now = self.clock()
+        if self._last_analysis_at is not None and now - self._last_analysis_at < self.min_interval:
+            return False
+        quiet = self._last_error_at is None or now - self._last_error_at >= self.debounce
+        return quiet or now - self._pending_since >= self.max_wait
+
+    def take(self) -> SegmentResult:
+        """
+        Snapshot the segments for an analysis and mark the new bursts as
+        handled. The report shows the bursts and error lines that came
+        since the previous one, not the densest of the whole log.
+        """
+        self._analysed_bursts = self.segmenter.bursts_total
+        self._pending_since = None
+        self._last_analysis_at = self.clock()
+        seg_result = self.segmenter.result(window_only=True)
+        self.segmenter.new_window()
+        return seg_result
+
+    def close(self) -> None:
+        self.follower.close()
+
+
+def follow(
+    session: TailSession,
+    on_report: Callable[[AnalysisReport], None],
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    max_reports: Optional[int] = None,
+) -> int:
+    """
+    Poll the session until interrupted (or max_reports analyses have been
+    reported). One analysis runs at a time, on a worker thread, so lines
+    keep being consumed while the agents work. A failed analysis is
+    logged to stderr and skipped. Returns the report count.
+    """
+    reports = 0
+    running: Optional[Future] = None
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        while max_reports is None or reports < max_reports:
+            appended = session.poll()
+
+            if running is not None and running.done():
+                try:
+                    on_report(running.result())
+                except Exception as e:
+                    # One failed analysis (API outage, bad output) must not
+                    # stop the daemon; the next burst gets a fresh attempt
+                    print(f"Analysis of {session.source} failed, report dropped: {e!r}", file=sys.stderr, flush=True)
+                else:
+                    reports += 1
+                running = None
+            if running is None and session.due():
+                seg_result = session.take()
+                running = pool.submit(run_analysis, session.source, lambda: seg_result)
+
+            if not appended:
+                time.sleep(poll_interval)
+    return reports
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="log file to follow")
+    parser.add_argument("-o", "--output", help="also append each report as a JSON line to this file")
+    parser.add_argument("--from-end", action="store_true", help="skip what is already in the file")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS, help="quiet seconds before analysing a burst")
+    parser.add_argument("--max-wait", type=float, default=MAX_WAIT_SECONDS, help="analyse a burst that has not gone quiet after this long")
+    parser.add_argument("--min-interval", type=float, default=MIN_INTERVAL_SECONDS, help="minimum seconds between analyses")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="seconds between checks of the file")
+    parser.add_argument("--max-reports", type=int, default=None, help="exit after this many reports")
+    args = parser.parse_args(argv)
+
+    session = TailSession(
+        args.path,
+        from_start=not args.from_end,
+        debounce=args.debounce,
+        max_wait=args.max_wait,
+        min_interval=args.min_interval,
+    )
+
+    def on_report(report: AnalysisReport) -> None:
+        print(render_text(report), flush=True)
+        if args.output:
+            with open(args.output, "a", encoding="utf-8") as out:
+                out.write(json.dumps({"time": time.time(), "report": report.to_dict()}, ensure_ascii=False) + "\n")
+
+    seg = session.segmenter
+    print(
+        f"Following {session.source}: {seg.lines_total} lines, {seg.bursts_total} error bursts so far",
+        flush=True,
+    )
+    try:
+        follow(session, on_report, poll_interval=args.poll_interval, max_reports=args.max_reports)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        session.close()
+        print(
+            f"Stopped after {seg.lines_total} lines, {seg.bursts_total} error bursts,"
+            f" {session.follower.rotations} rotation(s)",
+            file=sys.stderr,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# src/tools/burst_detector.py
+
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from .timestamps import TimestampExtractor
+
+# Hits further apart than this many lines, or seconds, start a new burst
+MAX_LINE_GAP = 15
+MAX_TIME_GAP = 60.0
+
+# Ranking smooths density with this many extra lines, so one isolated
+# error (1/16) does not outrank 40 errors in 60 lines (40/75)
+DENSITY_SMOOTHING = 15
+
+
+def line_seconds(line: str, timestamps: TimestampExtractor) -> Optional[float]:
+    """Seconds since the epoch of the line's timestamp, in the log's detected format, or None."""
+    ns = timestamps.extract(line)
+    return None if ns is None else ns / 1e9
+
+
+@dataclass
+class ErrorBurst:
+    first_line: int   # 1-based, first and last error line of the burst
+    last_line: int
+    hits: int
+    start_seconds: Optional[float] = None
+    end_seconds: Optional[float] = None
+
+    @property
+    def span(self) -> int:
+        return self.last_line - self.first_line + 1
+
+    @property
+    def density(self) -> float:
+        return self.hits / (self.span + DENSITY_SMOOTHING)
+
+
+class BurstTracker:
+    """
+    Groups error hits, fed in line order, into bursts in one pass: a hit
+    joins the open burst unless it is more than max_line_gap lines or
+    max_time_gap seconds after the previous hit. Hits without a timestamp
+    are grouped by line distance alone.
+    """
+
+    def __init__(self, max_line_gap: int = MAX_LINE_GAP, max_time_gap: float = MAX_TIME_GAP) -> None:
+        self.max_line_gap = max_line_gap
+        self.max_time_gap = max_time_gap
+        self.current: Optional[ErrorBurst] = None
+        self._last_seconds: Optional[float] = None
+
+    def add(self, line_number: int, seconds: Optional[float] = None) -> Optional[ErrorBurst]:
+        """Record a hit; returns the burst it closed, if any."""
+        closed = None
+        burst = self.current
+        if burst is not None and (
+            line_number - burst.last_line > self.max_line_gap
+            or (
+                seconds is not None
+                and self._last_seconds is not None
+                and seconds - self._last_seconds > self.max_time_gap
+            )
+        ):
+            closed, burst = burst, None
+
+        if burst is None:
+            burst = self.current = ErrorBurst(line_number, line_number, 0, seconds, seconds)
+        burst.last_line = line_number
+        burst.hits += 1
+        if seconds is not None:
+            if burst.start_seconds is None:
+                burst.start_seconds = seconds
+            burst.end_seconds = seconds
+            self._last_seconds = seconds
+        return closed
+
+    def is_closed_at(self, line_number: int) -> bool:
+        """True once line_number is past the point where the open burst could grow."""
+        return self.current is not None and line_number - self.current.last_line > self.max_line_gap
+
+    def finish(self) -> Optional[ErrorBurst]:
+        closed, self.current = self.current, None
+        return closed
+
+
+def group_bursts(
+    hits: Iterable[Tuple[int, Optional[float]]],
+    max_line_gap: int = MAX_LINE_GAP,
+    max_time_gap: float = MAX_TIME_GAP,
+) -> List[ErrorBurst]:
+    """Bursts for (line_number, seconds) hits given in line order."""
+    tracker = BurstTracker(max_line_gap, max_time_gap)
+    bursts: List[ErrorBurst] = []
+    for line_number, seconds in hits:
+        closed = tracker.add(line_number, seconds)
+        if closed is not None:
+            bursts.append(closed)
+    last = tracker.finish()
+    if last is not None:
+        bursts.append(last)
+    return bursts
+
+
+def top_bursts(bursts: Iterable[ErrorBurst], n: int) -> List[ErrorBurst]:
+    """The n densest bursts (earliest first on ties), returned in line order."""
+    ranked = sorted(bursts, key=lambda b: (-b.density, b.first_line))[:n]
+    return sorted(ranked, key=lambda b: b.first_line)
+
+
+def burst_window(burst: ErrorBurst, context: int, max_lines: int, total_lines: int) -> Tuple[int, int]:
+    """
+    1-based inclusive line span shown for a burst: context lines either
+    side, capped at max_lines from the start.
+    """
+    start = max(1, burst.first_line - context)
+    end = min(burst.last_line + context, start + max_lines - 1, total_lines)
+    return start, end
+
+
+def merge_spans(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping or touching spans given in start order; O(n)."""
+    merged: List[Tuple[int, int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
@@ -1,15 +1,266 @@
+import bz2
+import codecs
+import gzip
+import io
+import itertools
+import os
 import pathlib
+import re
+import time
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:   # optional; only needed for .zst logs
+    zstandard = None
 
 # __file__ → .../src/tools/file_read_tool.py
 # parents[2] → project root directory "logpilot"
 BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
 
+# 1 MiB reads keep memory flat while still amortising syscalls
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# How often a followed file is polled; one stat() per poll when idle
+DEFAULT_POLL_INTERVAL = 0.5
+
+# Compression is detected from the leading bytes, not the file name
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".zst")
+
+# Rotated siblings of app.log: app.log.1, app.log.2.gz (numbered, higher
+# is older) or app.log-20240101.gz (logrotate dateext)
+_ROTATED_SUFFIX_RE = re.compile(r"(?:\.(\d+)|-(\d{8,10}))(?:\.(?:gz|bz2|zst))?")
+
+
+def compression_of(head: bytes) -> Optional[str]:
+    """'gzip', 'bz2' or 'zstd' for a stream starting with head, else None."""
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def decompressing_reader(raw: BinaryIO) -> BinaryIO:
+    """
+    Wrap a seekable binary stream so reads return decompressed bytes;
+    plain streams are returned as they are. Decompression happens chunk by
+    chunk as the caller reads, never into a full copy. Closing the reader
+    closes raw.
+    """
+    start = raw.tell()
+    kind = compression_of(raw.read(4))
+    raw.seek(start)
+    if kind == "gzip":
+        reader = gzip.GzipFile(fileobj=raw, mode="rb")
+    elif kind == "bz2":
+        reader = bz2.BZ2File(raw, mode="rb")
+    elif kind == "zstd":
+        if zstandard is None:
+            raw.close()
+            raise RuntimeError("zstandard is not installed (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+    else:
+        return raw
+    # GzipFile and BZ2File leave a file object they were given open
+    return _ClosingReader(reader, raw)
+
+
+class _ClosingReader(io.BufferedReader):
+    def __init__(self, reader: BinaryIO, raw: BinaryIO) -> None:
+        super().__init__(reader)
+        self._source = raw
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._source.close()
+
+
+def open_log(rel_path: str) -> BinaryIO:
+    """Open a log relative to the PROJECT ROOT, decompressing .gz/.bz2/.zst on the fly."""
+    return decompressing_reader((BASE_DIR / rel_path).open("rb"))
+
+
+def is_compressed(path: pathlib.Path) -> bool:
+    with path.open("rb") as fh:
+        return compression_of(fh.read(4)) is not None
+
+
 def read_log_file(rel_path: str) -> str:
     """
     Read a log file relative to the PROJECT ROOT.
     Example usage:
         read_log_file("examples/java_error.log")
     """
-    path = BASE_DIR / rel_path
-    return path.read_text(encoding="utf-8", errors="ignore")
+    with open_log(rel_path) as fh:
+        return fh.read().decode("utf-8", errors="ignore")
+
+
+def iter_stream_lines(fh: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Split a binary stream into lines. It is read in fixed-size chunks and
+    decoded incrementally, so only one chunk plus a partial line is held
+    in memory at a time. Line endings are stripped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    pending = ""
+
+    while True:
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
 
+def iter_log_lines(rel_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Stream a log file (relative to the PROJECT ROOT) line by line,
+    decompressing it on the fly if it is compressed.
+    """
+    with open_log(rel_path) as fh:
+        yield from iter_stream_lines(fh, chunk_size)
+
+
+def rotated_set(rel_path: str) -> List[pathlib.Path]:
+    """
+    The live log and its rotated siblings, oldest first: for app.log that
+    is app.log-20240101.gz …, app.log.9.gz … app.log.1, app.log. The live
+    file may be missing (only archives left).
+    """
+    live = BASE_DIR / rel_path
+    keyed = []
+    for candidate in live.parent.glob(live.name + "*"):
+        m = _ROTATED_SUFFIX_RE.fullmatch(candidate.name[len(live.name):])
+        if m is None or not candidate.is_file():
+            continue
+        number, date = m.groups()
+        keyed.append(((0, date, 0) if date else (1, "", -int(number)), candidate))
+    paths = [path for _, path in sorted(keyed)]
+    if live.is_file():
+        paths.append(live)
+    return paths
+
+
+def iter_rotated_lines(rel_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Stream a rotated set (see rotated_set) as one log, oldest lines first;
+    each member is opened and decompressed only when its turn comes.
+    """
+    return itertools.chain.from_iterable(
+        iter_log_lines(str(path), chunk_size) for path in rotated_set(rel_path)
+    )
+
+
+class LogFollower:
+    """
+    Follows a growing log file (relative to the PROJECT ROOT), like
+    `tail -F`. Each read_new() call returns the complete lines appended
+    since the previous call; a trailing partial line is held back until
+    its newline arrives. Rotation is handled by polling: when the path
+    points at a new file (rename + create) the rest of the old file is
+    drained first, and when the file shrinks (copytruncate) it is read
+    again from the start. A missing file is waited for.
+    """
+
+    def __init__(self, rel_path: str, from_start: bool = True, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.path = BASE_DIR / rel_path
+        self.chunk_size = chunk_size
+        self.rotations = 0
+        self._fh = None
+        self._identity: Optional[Tuple[int, int]] = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._pending = ""
+        if self._open() and not from_start:
+            self._fh.seek(0, os.SEEK_END)
+
+    def _open(self) -> bool:
+        try:
+            fh = self.path.open("rb")
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(fh.fileno())
+        self._fh = fh
+        self._identity = (stat.st_dev, stat.st_ino)
+        self._decoder.reset()
+        return True
+
+    def _drain(self, lines: List[str]) -> None:
+        while True:
+            chunk = self._fh.read(self.chunk_size)
+            if not chunk:
+                return
+            parts = (self._pending + self._decoder.decode(chunk)).split("\n")
+            self._pending = parts.pop()
+            lines.extend(part.rstrip("\r") for part in parts)
+
+    def _flush_pending(self, lines: List[str]) -> None:
+        # The file this partial line came from will not grow any more
+        self._pending += self._decoder.decode(b"", final=True)
+        if self._pending:
+            lines.append(self._pending.rstrip("\r"))
+        self._pending = ""
+
+    def read_new(self) -> List[str]:
+        lines: List[str] = []
+        if self._fh is None:
+            if not self._open():
+                return lines
+        self._drain(lines)
+
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return lines   # rotated away, the new file is not there yet
+        if (stat.st_dev, stat.st_ino) != self._identity:
+            self._drain(lines)
+            self._flush_pending(lines)
+            self._fh.close()
+            self.rotations += 1
+            if self._open():
+                self._drain(lines)
+        elif stat.st_size < self._fh.tell():
+            self._flush_pending(lines)
+            self._fh.seek(0)
+            self._decoder.reset()
+            self.rotations += 1
+            self._drain(lines)
+        return lines
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def follow_log_lines(
+    rel_path: str,
+    from_start: bool = True,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+) -> Iterator[str]:
+    """
+    Stream a log file line by line and keep streaming as it grows, across
+    rotations; never returns on its own. Sleeps poll_interval between
+    checks when there is nothing new.
+    """
+    follower = LogFollower(rel_path, from_start=from_start)
+    try:
+        while True:
+            lines = follower.read_new()
+            if not lines:
+                time.sleep(poll_interval)
+            yield from lines
+    finally:
+        follower.close()
@@ -0,0 +1,220 @@
+# src/tools/line_index.py
+
+import mmap
+import pathlib
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .file_read_tool import BASE_DIR
+from .log_parser import detect_buffer_format, parse_lines
+from .log_search_tool import ERROR_KEYWORDS, KeywordHit, LogMatch, scan_keywords
+from .parallel_scan import scan_file
+from .timestamps import TimeIndex, TimestampExtractor, extractor_for, sample_lines
+
+# Newline scan block size: bounds the temporary boolean mask per step
+_SCAN_BLOCK = 64 << 20
+
+# Lines decoded per step by MappedLog.iter_lines
+_DECODE_LINES = 1 << 16
+
+# How many mapped files open_mapped_log keeps around for reuse
+_MAX_CACHED = 8
+
+
+def build_line_index(buf) -> np.ndarray:
+    """
+    Return an int64 array with the byte offset of the start of every line.
+    Newlines are located with vectorised NumPy compares, block by block.
+    A trailing newline does not start an extra (empty) line.
+    """
+    size = len(buf)
+    if size == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    data = np.frombuffer(buf, dtype=np.uint8)
+    parts = [np.zeros(1, dtype=np.int64)]
+    for block_start in range(0, size, _SCAN_BLOCK):
+        block = data[block_start:block_start + _SCAN_BLOCK]
+        newlines = np.flatnonzero(block == 0x0A).astype(np.int64)
+        parts.append(newlines + (block_start + 1))
+
+    starts = np.concatenate(parts)
+    if starts[-1] >= size:
+        starts = starts[:-1]
+    return starts
+
+
+class MappedLog:
+    """
+    Read-only, memory-mapped view of a log file with a line-start index.
+    Windows such as "15 lines around line N" or "the last 30 lines" are
+    decoded on demand, so their cost depends on the window, not the file.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        stat = path.stat()
+        self.signature: Tuple[int, int] = (stat.st_size, stat.st_mtime_ns)
+
+        if stat.st_size:
+            with path.open("rb") as fh:
+                self.buffer = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # mmap cannot map an empty file
+            self.buffer = b""
+        self.offsets = build_line_index(self.buffer)
+        self._timestamps: TimestampExtractor | None = None
+        self._time_index: TimeIndex | None = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def size(self) -> int:
+        return len(self.buffer)
+
+    def line_span(self, idx: int) -> Tuple[int, int]:
+        """Byte span (start, end) of 0-based line idx, newline excluded."""
+        start = int(self.offsets[idx])
+        if idx + 1 < len(self.offsets):
+            end = int(self.offsets[idx + 1]) - 1
+        else:
+            end = self.size
+            if end > start and self.buffer[end - 1:end] == b"\n":
+                end -= 1
+        return start, end
+
+    def line(self, idx: int) -> str:
+        start, end = self.line_span(idx)
+        text = self.buffer[start:end].decode("utf-8", errors="ignore")
+        return text[:-1] if text.endswith("\r") else text
+
+    def lines(self, start: int, stop: int) -> List[str]:
+        """Decode 0-based lines [start, stop), clamped to the file."""
+        start = max(0, start)
+        stop = min(len(self), stop)
+        return [self.line(i) for i in range(start, stop)]
+
+    def iter_lines(self) -> Iterator[str]:
+        """
+        Every line in order, decoded a block of lines at a time, so a full
+        pass does not hold the whole file as strings.
+        """
+        total = len(self)
+        for first in range(0, total, _DECODE_LINES):
+            last = min(first + _DECODE_LINES, total)
+            start = int(self.offsets[first])
+            end = int(self.offsets[last]) if last < total else self.size
+            text = self.buffer[start:end].decode("utf-8", errors="ignore")
+            block = text.split("\n")
+            if len(block) > last - first:
+                block.pop()   # "" after the block's final newline
+            for line in block:
+                yield line[:-1] if line.endswith("\r") else line
+
+    def head(self, n: int) -> List[str]:
+        return self.lines(0, n)
+
+    def tail(self, n: int) -> List[str]:
+        return self.lines(len(self) - n, len(self))
+
+    def window(self, idx: int, before: int, after: int) -> List[str]:
+        """Lines idx-before .. idx+after-1 (same bounds as a list slice)."""
+        return self.lines(idx - before, idx + after)
+
+    def line_number_at(self, offset: int) -> int:
+        """1-based number of the line containing byte offset."""
+        return int(np.searchsorted(self.offsets, offset, side="right"))
+
+    def scan_keywords(self, keywords: Sequence[str] = ERROR_KEYWORDS, workers: int = 1) -> List[KeywordHit]:
+        """
+        Keyword hits over the mapped bytes, in one pass, or split across
+        worker processes when workers > 1 (None: every core).
+        """
+        if workers == 1 or not self.size:
+            return scan_keywords(self.buffer, keywords)
+        return scan_file(self.path, keywords, workers, severities=False, templates=False).hits
+
+    def search(
+        self,
+        query: str,
+        context_lines: int = 2,
+        workers: int = 1,
+        min_level: Optional[str] = None,
+        since_ns: Optional[int] = None,
+        until_ns: Optional[int] = None,
+        **fields: str,
+    ) -> List[LogMatch]:
+        """
+        search_log over the mapped file; only matched windows are decoded,
+        except for structured or filtered searches, which parse every line
+        into columns as search_log does.
+        """
+        parser = detect_buffer_format(self.buffer)
+        filtered = min_level is not None or since_ns is not None or until_ns is not None or fields
+        if parser.structured or filtered:
+            batch = parse_lines(self.iter_lines(), parser)
+            rows = batch.where(query, min_level, since_ns, until_ns, **fields).tolist()
+        else:
+            rows = [hit.line_number - 1 for hit in self.scan_keywords((query,), workers)]
+        return [
+            LogMatch(
+                line_number=idx + 1,
+                line=self.line(idx),
+                context_before=self.lines(idx - context_lines, idx),
+                context_after=self.lines(idx + 1, idx + 1 + context_lines),
+            )
+            for idx in rows
+        ]
+
+    def timestamps(self) -> TimestampExtractor:
+        """Timestamp extractor for this log; the format is detected once per path."""
+        if self._timestamps is None:
+            self._timestamps = extractor_for(self.path, sample_lines(self.buffer))
+        return self._timestamps
+
+    def time_index(self) -> TimeIndex:
+        """Sparse time -> byte offset index, built on first use."""
+        if self._time_index is None:
+            self._time_index = TimeIndex(self.buffer, self.timestamps())
+        return self._time_index
+
+    def is_stale(self) -> bool:
+        stat = self.path.stat()
+        return (stat.st_size, stat.st_mtime_ns) != self.signature
+
+    def close(self) -> None:
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+
+_cache: "OrderedDict[pathlib.Path, MappedLog]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def open_mapped_log(rel_path: str | pathlib.Path) -> MappedLog:
+    """
+    Map a log file relative to the PROJECT ROOT (or an absolute path) and
+    index its lines. The mapping, line index and time index are reused
+    across calls until the file's size or mtime changes. The cache owns
+    the mapping: callers must not close it.
+    """
+    path = (BASE_DIR / rel_path).resolve()
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None:
+            if not cached.is_stale():
+                _cache.move_to_end(path)
+                return cached
+            del _cache[path]
+
+        mapped = MappedLog(path)
+        _cache[path] = mapped
+        if len(_cache) > _MAX_CACHED:
+            # Dropped rather than closed: callers may still hold a reference
+            _cache.popitem(last=False)
+        return mapped
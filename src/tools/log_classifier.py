@@ -0,0 +1,104 @@
+# src/tools/log_classifier.py
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from .severity_counter import count_severities
+
+# Signature bank: (regex, weight) per log type. Type names match the labels
+# the LLM detector has been producing, so incident memory partitions line up.
+SIGNATURES: Dict[str, List[Tuple[str, float]]] = {
+    "Java app": [
+        (r"^\s*(?:\S+\s+)?at [\w$.]+(?:/[\w$.]+)?\((?:[\w$]+\.java:\d+|Native Method|Unknown Source)\)", 1.0),
+        (r"^Caused by: [\w$.]+(?:Exception|Error)", 2.0),
+        (r"Exception in thread \"[^\"]*\"", 2.0),
+        (r"\bjava\.(?:lang|sql|net|io|util)\.\w+(?:Exception|Error)\b", 2.0),
+    ],
+    "Python": [
+        (r"Traceback \(most recent call last\):", 3.0),
+        (r"^\s+File \"[^\"]+\", line \d+", 1.0),
+        (r"^(?:[\w.]+\.)?\w+(?:Error|Exception): ", 0.5),
+    ],
+    "Airflow": [
+        (r"^\[\d{4}-\d{2}-\d{2}[ T][\d:,.]+\] \{[\w.]+\.py:\d+\} [A-Z]+ - ", 2.0),
+        (r"\{taskinstance\.py:\d+\}", 1.0),
+        (r"Executing <Task\(\w+\)", 3.0),
+        (r"\bairflow\b", 1.0),
+    ],
+    "Kubernetes": [
+        (r"\bkubelet\b", 2.0),
+        (r"Back-off restarting failed container", 3.0),
+        (r"\b(?:CrashLoopBackOff|OOMKilled|ImagePullBackOff|ErrImagePull)\b", 3.0),
+        (r"^[IWEF]\d{4} \d{2}:\d{2}:\d{2}\.\d+\s+\d+ [\w.-]+:\d+\]", 2.0),
+        (r"\b(?:pod|deployment|replicaset|namespace)/[\w.-]+", 1.0),
+    ],
+    "Docker": [
+        (r"\b(?:dockerd|containerd)\b", 2.0),
+        (r"Error response from daemon", 3.0),
+        (r"^Step \d+/\d+ : [A-Z]+", 3.0),
+        (r"^Successfully (?:built|tagged) ", 2.0),
+        (r"\bdocker(?:-compose)?\b", 1.0),
+    ],
+}
+
+# Platforms whose logs routinely wrap another type's output (an Airflow
+# task log carries the task's Python traceback, a pod log the app's stack
+# trace). Those inner types do not count against the platform's margin.
+EMBEDS: Dict[str, Tuple[str, ...]] = {
+    "Airflow": ("Python",),
+    "Kubernetes": ("Java app", "Python"),
+    "Docker": ("Java app", "Python"),
+}
+
+# One combined pattern, so the text is scanned once for every signature
+_GROUPS: List[Tuple[str, float]] = []
+_parts: List[str] = []
+for _log_type, _sigs in SIGNATURES.items():
+    for _pattern, _weight in _sigs:
+        _parts.append(f"(?P<s{len(_GROUPS)}>{_pattern})")
+        _GROUPS.append((_log_type, _weight))
+_SIGNATURE_RE = re.compile("|".join(_parts), re.MULTILINE)
+
+# Score needed before the top type is trusted at full strength
+MIN_EVIDENCE = 4.0
+
+
+@dataclass
+class Classification:
+    log_type: str
+    confidence: float
+    scores: Dict[str, float] = field(default_factory=dict)
+    severity_counts: Dict[str, int] = field(default_factory=dict)
+
+
+def classify(log_text: str) -> Classification:
+    """
+    Score every log type against the signature bank in one pass.
+    Confidence combines the margin over the runner-up with how much
+    evidence the winner has, so a single stray match stays low.
+    """
+    scores: Dict[str, float] = {t: 0.0 for t in SIGNATURES}
+    for m in _SIGNATURE_RE.finditer(log_text):
+        log_type, weight = _GROUPS[int(m.lastgroup[1:])]
+        scores[log_type] += weight
+
+    best = max(scores, key=scores.get)
+    top = scores[best]
+    if top <= 0:
+        return Classification("unknown", 0.0, scores, count_severities(log_text))
+
+    embedded = EMBEDS.get(best, ())
+    second = max(
+        (v for t, v in scores.items() if t != best and t not in embedded),
+        default=0.0,
+    )
+
+    margin = (top - second) / top
+    evidence = min(1.0, top / MIN_EVIDENCE)
+    return Classification(
+        log_type=best,
+        confidence=round(margin * evidence, 3),
+        scores=scores,
+        severity_counts=count_severities(log_text),
+    )
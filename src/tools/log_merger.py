@@ -0,0 +1,102 @@
+# src/tools/log_merger.py
+
+import heapq
+import itertools
+import pathlib
+from collections import Counter
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from .file_read_tool import BASE_DIR, COMPRESSED_SUFFIXES, iter_log_lines
+from .timestamps import NO_TIMESTAMP, SAMPLE_LINES, TimestampExtractor
+
+
+@dataclass(slots=True)
+class TimedLine:
+    timestamp: int   # ns since the epoch; NO_TIMESTAMP before a source's first dated line
+    source: str
+    line: str
+
+
+def source_label(path: pathlib.Path) -> str:
+    """Short name for a log in the merged timeline: app.log.2.gz -> app."""
+    name = path.name
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return name.split(".", 1)[0] or name
+
+
+def source_labels(paths: Sequence[pathlib.Path]) -> List[str]:
+    """source_label for each path, with the parent directory added where names clash."""
+    labels = [source_label(p) for p in paths]
+    # Count before relabelling, so every member of a clash gets its prefix
+    counts = Counter(labels)
+    return [
+        f"{path.parent.name}/{label}" if counts[label] > 1 else label
+        for path, label in zip(paths, labels)
+    ]
+
+
+def iter_timed_lines(lines: Iterable[str], source: str, year: Optional[int] = None) -> Iterator[TimedLine]:
+    """
+    Date every line of one source. The timestamp format is detected from
+    the first SAMPLE_LINES lines; undated lines (stack frames, wrapped
+    messages) take the time of the dated line before them, so they stay
+    attached to it in a merge.
+    """
+    lines = iter(lines)
+    head = list(itertools.islice(lines, SAMPLE_LINES))
+    extract = TimestampExtractor.detect(head, year).extract
+    current = NO_TIMESTAMP
+    for line in itertools.chain(head, lines):
+        ts = extract(line)
+        if ts is not None:
+            current = ts
+        yield TimedLine(current, source, line)
+
+
+def time_window(
+    records: Iterable[TimedLine],
+    since_ns: Optional[int] = None,
+    until_ns: Optional[int] = None,
+) -> Iterator[TimedLine]:
+    """
+    The time-ordered records in [since_ns, until_ns); reading stops at the
+    first record past until_ns. Records before the first dated line are
+    kept only without since_ns, as TimeIndex.iter_window does.
+    """
+    for record in records:
+        if since_ns is not None and record.timestamp < since_ns:
+            continue
+        if until_ns is not None and record.timestamp >= until_ns:
+            break
+        yield record
+
+
+def merge_timed(streams: Sequence[Iterable[TimedLine]]) -> Iterator[TimedLine]:
+    """
+    k-way merge of already time-ordered streams on a heap of one pending
+    line per stream, so memory does not grow with the inputs. Ties keep
+    the order of the streams.
+    """
+    return heapq.merge(*streams, key=attrgetter("timestamp"))
+
+
+def merge_log_files(
+    rel_paths: Sequence[str],
+    since_ns: Optional[int] = None,
+    until_ns: Optional[int] = None,
+) -> Iterator[TimedLine]:
+    """
+    One timeline from several logs (relative to the PROJECT ROOT; may be
+    compressed), each line tagged with the source it came from and
+    optionally limited to [since_ns, until_ns).
+    """
+    paths = [BASE_DIR / p for p in rel_paths]
+    labels = source_labels(paths)
+    merged = merge_timed([
+        iter_timed_lines(iter_log_lines(str(path)), label) for path, label in zip(paths, labels)
+    ])
+    return time_window(merged, since_ns, until_ns)
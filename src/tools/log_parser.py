@@ -0,0 +1,372 @@
+# src/tools/log_parser.py
+
+import calendar
+import datetime
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .log_search_tool import split_lines
+from .severity_counter import LEVELS, normalize_level, token_level
+from .timestamps import MONTHS, NO_TIMESTAMP, NS_PER_SECOND, epoch_to_ns, iso_to_ns
+
+# Bytes looked at to pick a format, and the share of those lines a parser
+# must understand to be chosen over plain text
+PROBE_BYTES = 4096
+MIN_PROBE_SHARE = 0.6
+
+# Placeholder in the level column (timestamps use NO_TIMESTAMP)
+NO_LEVEL = -1
+
+# Level code = index in LEVELS, so "at least WARN" is one integer compare
+LEVEL_CODES = {level: code for code, level in enumerate(LEVELS)}
+
+_ISO_PREFIX_RE = re.compile(r"\[?(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)\]?\s*")
+
+# One parsed line: (timestamp ns, level, message, source, other fields)
+Record = Tuple[int, Optional[str], str, str, Dict[str, str]]
+
+
+def _any_time_to_ns(value) -> int:
+    if isinstance(value, bool):
+        return NO_TIMESTAMP
+    if isinstance(value, (int, float)):
+        return epoch_to_ns(value)
+    if isinstance(value, str):
+        try:
+            return epoch_to_ns(float(value))
+        except ValueError:
+            return iso_to_ns(value)
+    return NO_TIMESTAMP
+
+
+# bunyan / pino numeric levels
+_NUMERIC_LEVELS = {10: "TRACE", 20: "DEBUG", 30: "INFO", 40: "WARN", 50: "ERROR", 60: "FATAL"}
+
+
+def _json_level(value) -> Optional[str]:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return _NUMERIC_LEVELS.get(value)
+    return normalize_level(str(value))
+
+
+def _flatten(value) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class LogParser:
+    """
+    One log format. parse() returns a Record for a line in this format, or
+    None. Logs in a structured format are segmented from their records;
+    the others keep going through the line-based stages.
+    """
+    name = "plain"
+    structured = False
+
+    def parse(self, line: str) -> Optional[Record]:
+        raise NotImplementedError
+
+
+class PlainParser(LogParser):
+    """Fallback: optional leading ISO timestamp, first upper-case level token."""
+    name = "plain"
+
+    def parse(self, line: str) -> Optional[Record]:
+        ts = NO_TIMESTAMP
+        m = _ISO_PREFIX_RE.match(line)
+        if m:
+            ts = iso_to_ns(m.group(1))
+        return ts, token_level(line), line, "", {}
+
+
+class JsonParser(LogParser):
+    """One JSON object per line (zap, logrus, bunyan, Docker json-file, ...)."""
+    name = "json"
+    structured = True
+
+    TIME_KEYS = ("@timestamp", "timestamp", "time", "ts", "t")
+    LEVEL_KEYS = ("level", "severity", "lvl", "levelname", "log.level")
+    MESSAGE_KEYS = ("msg", "message", "log", "event")
+    SOURCE_KEYS = ("logger", "caller", "source", "component", "name", "app")
+
+    def parse(self, line: str) -> Optional[Record]:
+        if not line.startswith("{"):
+            return None
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(obj, dict):
+            return None
+
+        ts = NO_TIMESTAMP
+        level = message = source = None
+        for key in self.TIME_KEYS:
+            if key in obj:
+                ts = _any_time_to_ns(obj.pop(key))
+                break
+        for key in self.LEVEL_KEYS:
+            if key in obj:
+                level = _json_level(obj.pop(key))
+                break
+        for key in self.MESSAGE_KEYS:
+            if key in obj:
+                message = _flatten(obj.pop(key)).rstrip("\n")
+                break
+        for key in self.SOURCE_KEYS:
+            if key in obj:
+                source = _flatten(obj.pop(key))
+                break
+
+        message = message or ""
+        if level is None:
+            # Docker json-file wraps the application's own line in "log"
+            level = token_level(message)
+        return ts, level, message, source or "", {k: _flatten(v) for k, v in obj.items()}
+
+
+_LOGFMT_PAIR_RE = re.compile(r'([\w.@-]+)=("(?:[^"\\]|\\.)*"|\S*)')
+
+
+class LogfmtParser(LogParser):
+    """key=value pairs, as emitted by Go services (logrus, go-kit, slog)."""
+    name = "logfmt"
+    structured = True
+
+    def parse(self, line: str) -> Optional[Record]:
+        pairs = {}
+        for key, value in _LOGFMT_PAIR_RE.findall(line):
+            if value.startswith('"'):
+                value = value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+            pairs[key] = value
+        if len(pairs) < 2 or not any(k in pairs for k in ("level", "lvl", "msg", "ts", "time")):
+            return None
+        ts = _any_time_to_ns(pairs.pop("ts", None) or pairs.pop("time", None) or pairs.pop("timestamp", ""))
+        level = normalize_level(pairs.pop("level", None) or pairs.pop("lvl", None) or pairs.pop("severity", ""))
+        message = pairs.pop("msg", None) or pairs.pop("message", "")
+        source = pairs.pop("logger", None) or pairs.pop("caller", None) or pairs.pop("component", "")
+        return ts, level, message, source, pairs
+
+
+# syslog severity (PRI % 8) to our levels
+_SYSLOG_LEVELS = ("FATAL", "FATAL", "FATAL", "ERROR", "WARN", "INFO", "INFO", "DEBUG")
+
+_RFC3164_RE = re.compile(
+    r"(?:<(\d{1,3})>)?([A-Z][a-z]{2}) +(\d{1,2}) (\d{2}):(\d{2}):(\d{2}) (\S+) ([^\s:\[]+)(?:\[(\d+)\])?: ?(.*)"
+)
+_RFC5424_RE = re.compile(r"<(\d{1,3})>1 (\S+) (\S+) (\S+) (\S+) (\S+) (-|\[.*?\]) ?(.*)")
+
+
+class SyslogParser(LogParser):
+    """
+    RFC 3164 ("Jan  2 15:04:05 host app[42]: ...") and RFC 5424 lines.
+    RFC 3164 has no year; the year given to the parser is used.
+    """
+    name = "syslog"
+    structured = True
+
+    def __init__(self, year: Optional[int] = None) -> None:
+        self.year = year or datetime.datetime.now(datetime.timezone.utc).year
+
+    def parse(self, line: str) -> Optional[Record]:
+        m = _RFC5424_RE.fullmatch(line)
+        if m:
+            pri, ts, host, app, pid, msgid, _, message = m.groups()
+            fields = {"host": host}
+            if pid != "-":
+                fields["pid"] = pid
+            if msgid != "-":
+                fields["msgid"] = msgid
+            level = _SYSLOG_LEVELS[int(pri) % 8]
+            return iso_to_ns(ts), level, message, "" if app == "-" else app, fields
+
+        m = _RFC3164_RE.fullmatch(line)
+        if m is None or m.group(2) not in MONTHS:
+            return None
+        pri, month, day, hh, mm, ss, host, app, pid, message = m.groups()
+        try:
+            seconds = calendar.timegm((self.year, MONTHS[month], int(day), int(hh), int(mm), int(ss)))
+        except ValueError:
+            seconds = None
+        level = _SYSLOG_LEVELS[int(pri) % 8] if pri else token_level(message)
+        fields = {"host": host}
+        if pid:
+            fields["pid"] = pid
+        return NO_TIMESTAMP if seconds is None else seconds * NS_PER_SECOND, level, message, app, fields
+
+
+_KLOG_LINE_RE = re.compile(r"([IWEF])(\d{2})(\d{2}) (\d{2}):(\d{2}):(\d{2})\.(\d{6}) +(\d+) ([^:\]]+:\d+)\] ?(.*)")
+
+
+class KlogParser(LogParser):
+    """Kubernetes klog/glog header lines; klog has no year either."""
+    name = "klog"
+
+    def __init__(self, year: Optional[int] = None) -> None:
+        self.year = year or datetime.datetime.now(datetime.timezone.utc).year
+
+    def parse(self, line: str) -> Optional[Record]:
+        m = _KLOG_LINE_RE.fullmatch(line)
+        if m is None:
+            return None
+        letter, mo, d, hh, mm, ss, us, thread, source, message = m.groups()
+        try:
+            seconds = calendar.timegm((self.year, int(mo), int(d), int(hh), int(mm), int(ss)))
+            ts = seconds * NS_PER_SECOND + int(us) * 1000
+        except ValueError:
+            ts = NO_TIMESTAMP
+        return ts, normalize_level(letter), message, source, {"thread": thread}
+
+
+# Detection order; earlier parsers win ties. register_parser() adds more.
+PARSERS: List[Callable[[], LogParser]] = [JsonParser, LogfmtParser, SyslogParser, KlogParser]
+
+
+def register_parser(factory: Callable[[], LogParser], first: bool = False) -> None:
+    """Make a format available to detect_format()."""
+    if first:
+        PARSERS.insert(0, factory)
+    else:
+        PARSERS.append(factory)
+
+
+def detect_format(sample: str) -> LogParser:
+    """
+    The parser that understands most of the lines in the first
+    PROBE_BYTES of sample (at least MIN_PROBE_SHARE of them), else plain.
+    """
+    lines = [line for line in split_lines(sample[:PROBE_BYTES]) if line.strip()]
+    if len(sample) > PROBE_BYTES and len(lines) > 1:
+        lines.pop()   # probably cut short
+    best, best_share = None, MIN_PROBE_SHARE
+    if lines:
+        for factory in PARSERS:
+            parser = factory()
+            share = sum(parser.parse(line) is not None for line in lines) / len(lines)
+            if share > best_share or (best is None and share >= best_share):
+                best, best_share = parser, share
+    return best or PlainParser()
+
+
+def detect_buffer_format(buf) -> LogParser:
+    """detect_format for the head of a bytes-like buffer, e.g. an mmap."""
+    # PROBE_BYTES characters take at most four times as many UTF-8 bytes
+    return detect_format(buf[:PROBE_BYTES * 4 + 1].decode("utf-8", errors="ignore"))
+
+
+def minute_label(ts: int) -> str:
+    """ "YYYY-MM-DD HH:MM" (UTC) of a ns timestamp, as SeverityCounter.per_minute buckets it."""
+    minute = datetime.datetime.fromtimestamp(ts // (60 * NS_PER_SECOND) * 60, datetime.timezone.utc)
+    return minute.strftime("%Y-%m-%d %H:%M")
+
+
+@dataclass(slots=True)
+class LogBatch:
+    """
+    Parsed records in columns, one record per input line (record i is line
+    i + 1). Timestamps and levels are NumPy arrays, so filters on them are
+    vectorised; fields holds one column per key seen (None where absent).
+    """
+    format: str
+    timestamps: np.ndarray                 # int64 ns since the epoch, NO_TIMESTAMP if none
+    levels: np.ndarray                     # int8 code into LEVELS, NO_LEVEL if none
+    messages: List[str]
+    sources: List[str]
+    fields: Dict[str, List[Optional[str]]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def level_mask(self, min_level: str) -> np.ndarray:
+        return self.levels >= LEVEL_CODES[min_level]
+
+    def time_mask(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> np.ndarray:
+        """Records in [start_ns, end_ns); records without a timestamp are excluded."""
+        mask = self.timestamps != NO_TIMESTAMP
+        if start_ns is not None:
+            mask &= self.timestamps >= start_ns
+        if end_ns is not None:
+            mask &= self.timestamps < end_ns
+        return mask
+
+    def field_mask(self, name: str, value: str) -> np.ndarray:
+        if name == "source":
+            column = self.sources
+        else:
+            column = self.fields.get(name)
+            if column is None:
+                return np.zeros(len(self), dtype=bool)
+        return np.asarray(column, dtype=object) == value
+
+    def text_mask(self, query: str) -> np.ndarray:
+        """Case-insensitive substring match on the message column."""
+        q = query.lower()
+        return np.fromiter((q in m.lower() for m in self.messages), dtype=bool, count=len(self))
+
+    def where(
+        self,
+        query: Optional[str] = None,
+        min_level: Optional[str] = None,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        **fields: str,
+    ) -> np.ndarray:
+        """Indices of the records matching every given filter, cheapest filters first."""
+        mask = np.ones(len(self), dtype=bool)
+        if min_level is not None:
+            mask &= self.level_mask(min_level)
+        if start_ns is not None or end_ns is not None:
+            mask &= self.time_mask(start_ns, end_ns)
+        for name, value in fields.items():
+            mask &= self.field_mask(name, value)
+        if query is not None:
+            candidates = np.flatnonzero(mask)
+            q = query.lower()
+            keep = [i for i in candidates if q in self.messages[i].lower()]
+            return np.asarray(keep, dtype=np.int64)
+        return np.flatnonzero(mask)
+
+
+def parse_lines(lines: Iterable[str], parser: LogParser) -> LogBatch:
+    """Parse every line; lines the parser rejects fall back to plain text."""
+    fallback = PlainParser()
+    timestamps: List[int] = []
+    levels: List[int] = []
+    messages: List[str] = []
+    sources: List[str] = []
+    fields: Dict[str, List[Optional[str]]] = {}
+
+    for i, line in enumerate(lines):
+        record = parser.parse(line) or fallback.parse(line)
+        ts, level, message, source, extra = record
+        timestamps.append(ts)
+        levels.append(LEVEL_CODES[level] if level else NO_LEVEL)
+        messages.append(message)
+        sources.append(source)
+        for key, value in extra.items():
+            column = fields.get(key)
+            if column is None:
+                column = fields[key] = [None] * i
+            column.append(value)
+        for column in fields.values():
+            if len(column) == i:
+                column.append(None)
+
+    return LogBatch(
+        format=parser.name,
+        timestamps=np.asarray(timestamps, dtype=np.int64),
+        levels=np.asarray(levels, dtype=np.int8),
+        messages=messages,
+        sources=sources,
+        fields=fields,
+    )
+
+
+def parse_text(log_text: str, parser: Optional[LogParser] = None) -> LogBatch:
+    """Parse a log in memory, detecting its format unless a parser is given."""
+    return parse_lines(split_lines(log_text), parser or detect_format(log_text))
@@ -1,7 +1,14 @@
 # src/tools/log_search_tool.py
 
+import re
+from collections import deque
 from dataclasses import dataclass
-from typing import List
+from functools import lru_cache
+from typing import Deque, Iterable, Iterator, List, Optional, Pattern, Sequence, Tuple
+
+# Keywords the segmenter treats as "error-like"
+ERROR_KEYWORDS: Tuple[str, ...] = ("error", "exception", "failed")
+
 
 @dataclass
 class LogMatch:
@@ -11,31 +18,251 @@ class LogMatch:
     context_after: List[str]
 
 
+@dataclass
+class KeywordHit:
+    line_number: int   # 1-based, like LogMatch
+    start: int         # offset of the first character of the line
+    end: int           # offset just past the line (newline excluded)
+    keyword: str       # first keyword found on the line (lower-cased)
+
+
+# Scan block size; blocks are extended to the next newline so no line is split
+_SCAN_BLOCK = 8 << 20
+
+
+@lru_cache(maxsize=32)
+def _compile_keywords(keywords: Tuple[str, ...], binary: bool, ignore_case: bool) -> Pattern:
+    # Longest first so "exception" wins over a shorter prefix in the alternation
+    ordered = sorted(set(keywords), key=len, reverse=True)
+    alternation = "|".join(re.escape(k) for k in ordered)
+    flags = re.IGNORECASE if ignore_case else 0
+    if binary:
+        return re.compile(alternation.encode("utf-8"), flags)
+    return re.compile(alternation, flags)
+
+
+def split_lines(text: str) -> List[str]:
+    """
+    Lines as every reader and scanner here counts them: split on "\\n"
+    only, with a trailing "\\r" dropped and no empty line after a final
+    newline. str.splitlines() also splits on "\\r", form feeds and U+2028,
+    which would shift line numbers against the keyword scanner.
+    """
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    if "\r" in text:
+        lines = [line[:-1] if line.endswith("\r") else line for line in lines]
+    return lines
+
+
+def match_keyword(line: str, keywords: Sequence[str] = ERROR_KEYWORDS) -> Optional[str]:
+    """
+    Per-line variant of the scanner for streaming callers.
+    Returns the first keyword found in the line (lower-cased), or None.
+    """
+    m = _compile_keywords(tuple(keywords), False, True).search(line)
+    return m.group(0).lower() if m else None
+
+
+def iter_keyword_hits(
+    log_text: str | bytes,
+    keywords: Sequence[str] = ERROR_KEYWORDS,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> Iterator[KeywordHit]:
+    """
+    Single pass over the text with one compiled pattern for all keywords.
+    Yields one hit per matching line, in line order. Works on str and on
+    bytes-like input such as an mmap (offsets are then byte offsets).
+    With start/stop (start at a line boundary) only that range is
+    scanned; offsets stay absolute and line numbers count from start.
+
+    The text is processed in line-aligned blocks. ASCII blocks are
+    lower-cased once in C and searched case-sensitively, which is several
+    times faster than an IGNORECASE pattern.
+    """
+    binary = not isinstance(log_text, str)
+    newline = b"\n" if binary else "\n"
+    folded = _compile_keywords(tuple(k.lower() for k in keywords), binary, False)
+    ignore_case = _compile_keywords(tuple(keywords), binary, True)
+
+    n = len(log_text) if stop is None else stop
+    block_start = start
+    line_number = 1
+
+    while block_start < n:
+        block_end = min(n, block_start + _SCAN_BLOCK)
+        if block_end < n:
+            nl = log_text.find(newline, block_end)
+            block_end = n if nl == -1 else nl + 1
+        block = log_text[block_start:block_end]
+
+        # bytes.lower() only touches ASCII, so offsets never move; str.lower()
+        # can change lengths outside ASCII, so fall back to IGNORECASE there
+        if binary or block.isascii():
+            haystack, pattern = block.lower(), folded
+        else:
+            haystack, pattern = block, ignore_case
+
+        size = len(haystack)
+        pos = 0
+        counted_to = 0
+        while pos < size:
+            m = pattern.search(haystack, pos)
+            if m is None:
+                break
+            line_start = haystack.rfind(newline, 0, m.start()) + 1
+            line_end = haystack.find(newline, m.end())
+            if line_end == -1:
+                line_end = size
+
+            line_number += haystack.count(newline, counted_to, line_start)
+            counted_to = line_start
+
+            keyword = m.group(0)
+            if binary:
+                keyword = keyword.decode("utf-8", errors="ignore")
+            yield KeywordHit(
+                line_number=line_number,
+                start=block_start + line_start,
+                end=block_start + line_end,
+                keyword=keyword.lower(),
+            )
+            # Skip the rest of this line: one hit per line
+            pos = line_end + 1
+
+        line_number += haystack.count(newline, counted_to, size)
+        block_start = block_end
+
+
+def scan_keywords(
+    log_text: str | bytes,
+    keywords: Sequence[str] = ERROR_KEYWORDS,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> List[KeywordHit]:
+    return list(iter_keyword_hits(log_text, keywords, start, stop))
+
+
+def hit_line(log_text: str, hit: KeywordHit) -> str:
+    line = log_text[hit.start:hit.end]
+    return line[:-1] if line.endswith("\r") else line
+
+
+def build_match(log_text: str, hit: KeywordHit, context_lines: int = 2) -> LogMatch:
+    """
+    Build a LogMatch for a single hit. Context is found by walking newlines
+    outwards from the hit, so the cost is O(context), not O(file).
+    """
+    before: List[str] = []
+    start = hit.start
+    while len(before) < context_lines and start > 0:
+        prev_start = log_text.rfind("\n", 0, start - 1) + 1
+        line = log_text[prev_start:start - 1]
+        before.append(line[:-1] if line.endswith("\r") else line)
+        start = prev_start
+    before.reverse()
+
+    after: List[str] = []
+    end = hit.end
+    n = len(log_text)
+    while len(after) < context_lines and end < n:
+        next_start = end + 1
+        if next_start >= n:
+            break
+        next_end = log_text.find("\n", next_start)
+        if next_end == -1:
+            next_end = n
+        line = log_text[next_start:next_end]
+        after.append(line[:-1] if line.endswith("\r") else line)
+        end = next_end
+
+    return LogMatch(
+        line_number=hit.line_number,
+        line=hit_line(log_text, hit),
+        context_before=before,
+        context_after=after,
+    )
+
+
 def search_log(
     log_text: str,
     query: str,
     context_lines: int = 2,
+    min_level: Optional[str] = None,
+    since_ns: Optional[int] = None,
+    until_ns: Optional[int] = None,
+    **fields: str,
 ) -> List[LogMatch]:
     """
     Simple log search tool.
     Given a keyword, returns matching lines with surrounding context.
+
+    JSON, logfmt and syslog logs, and any log searched with a filter, are
+    parsed into columns first (see log_parser.LogBatch.where): query then
+    matches the message rather than the raw line, and min_level, the
+    [since_ns, until_ns) window and field=value filters (source= included)
+    are vectorised compares on the columns.
+    Example: search_log(text, "timeout", min_level="WARN", service="payments")
     """
-    lines = log_text.splitlines()
-    matches: List[LogMatch] = []
-
-    for i, line in enumerate(lines):
-        if query.lower() in line.lower():
-            start = max(0, i - context_lines)
-            end = min(len(lines), i + context_lines + 1)
-            before = lines[start:i]
-            after = lines[i + 1:end]
-            matches.append(
-                LogMatch(
-                    line_number=i + 1,
-                    line=line,
-                    context_before=before,
-                    context_after=after,
-                )
+    # Imported here: the parser builds on this module's line splitting
+    from .log_parser import detect_format, parse_lines
+
+    parser = detect_format(log_text)
+    filtered = min_level is not None or since_ns is not None or until_ns is not None or fields
+    if not parser.structured and not filtered:
+        return [
+            build_match(log_text, hit, context_lines)
+            for hit in iter_keyword_hits(log_text, (query,))
+        ]
+
+    lines = split_lines(log_text)
+    batch = parse_lines(lines, parser)
+    return [
+        LogMatch(
+            line_number=i + 1,
+            line=lines[i],
+            context_before=lines[max(0, i - context_lines):i],
+            context_after=lines[i + 1:i + 1 + context_lines],
+        )
+        for i in batch.where(query, min_level, since_ns, until_ns, **fields).tolist()
+    ]
+
+
+def search_log_stream(
+    lines: Iterable[str],
+    query: str,
+    context_lines: int = 2,
+) -> Iterator[LogMatch]:
+    """
+    Streaming variant of search_log over an iterable of lines.
+    Only the last `context_lines` lines and the matches still waiting for
+    their trailing context are kept in memory.
+    """
+    before: Deque[str] = deque(maxlen=context_lines)
+    waiting: Deque[LogMatch] = deque()
+
+    for i, line in enumerate(lines, start=1):
+        if waiting:
+            for m in waiting:
+                m.context_after.append(line)
+            while waiting and len(waiting[0].context_after) >= context_lines:
+                yield waiting.popleft()
+
+        if match_keyword(line, (query,)) is not None:
+            match = LogMatch(
+                line_number=i,
+                line=line,
+                context_before=list(before),
+                context_after=[],
             )
-    return matches
+            if context_lines:
+                waiting.append(match)
+            else:
+                yield match
+
+        before.append(line)
+
+    yield from waiting
 
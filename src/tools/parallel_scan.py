@@ -0,0 +1,209 @@
+# src/tools/parallel_scan.py
+
+import mmap
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .log_search_tool import ERROR_KEYWORDS, KeywordHit, scan_keywords
+from .severity_counter import SeverityCounter, buffer_blocks
+from .template_miner import MAX_EXAMPLES, TemplateMiner, mask
+
+# Chunks per worker; a few more chunks than workers evens out the tail
+# when some regions are slower (longer lines, more errors) than others
+CHUNKS_PER_WORKER = 4
+
+# Per masked line: [count, first line, last line, [(line, text), ...]]
+MaskedStats = List
+
+
+@dataclass(slots=True)
+class ChunkScan:
+    """Partial results for one byte range; line numbers count from its start."""
+    start: int
+    stop: int
+    lines: int = 0
+    hits: List[KeywordHit] = field(default_factory=list)
+    severities: Optional[SeverityCounter] = None
+    masked: Dict[str, MaskedStats] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class ScanResult:
+    lines_total: int
+    hits: List[KeywordHit]
+    # Empty when the scan was asked to skip them
+    severities: SeverityCounter = field(default_factory=SeverityCounter)
+    templates: TemplateMiner = field(default_factory=TemplateMiner)
+    # Byte offsets of the start of the first and last error line
+    first_error_offset: Optional[int] = None
+    last_error_offset: Optional[int] = None
+
+
+def plan_chunks(buf, n_chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split a buffer into at most n_chunks newline-aligned byte ranges made
+    of whole severity-counter blocks, so every stage sees the same block
+    boundaries as a single pass would.
+    """
+    blocks = list(buffer_blocks(buf))
+    if not blocks:
+        return []
+    n_chunks = max(1, min(n_chunks, len(blocks)))
+    chunks = []
+    for i in range(n_chunks):
+        first = i * len(blocks) // n_chunks
+        last = (i + 1) * len(blocks) // n_chunks - 1
+        chunks.append((blocks[first][0], blocks[last][1]))
+    return chunks
+
+
+def _count_lines(buf, start: int, stop: int) -> int:
+    data = np.frombuffer(buf, dtype=np.uint8, count=stop - start, offset=start)
+    lines = int(np.count_nonzero(data == 0x0A))
+    if stop > start and data[-1] != 0x0A:
+        lines += 1   # last line of the file without a trailing newline
+    return lines
+
+
+def _mask_lines(buf, start: int, stop: int) -> Dict[str, MaskedStats]:
+    masked_lines: Dict[str, MaskedStats] = {}
+    n = 0
+    for pos, end in buffer_blocks(buf, start, stop):
+        block = buf[pos:end].decode("utf-8", errors="ignore").split("\n")
+        if block[-1] == "":
+            block.pop()
+        for line in block:
+            n += 1
+            if line.endswith("\r"):
+                line = line[:-1]
+            key = mask(line)
+            stats = masked_lines.get(key)
+            if stats is None:
+                masked_lines[key] = [1, n, n, [(n, line)]]
+            else:
+                stats[0] += 1
+                stats[2] = n
+                if len(stats[3]) < MAX_EXAMPLES:
+                    stats[3].append((n, line))
+    return masked_lines
+
+
+def scan_chunk(
+    buf,
+    start: int,
+    stop: int,
+    keywords: Sequence[str] = ERROR_KEYWORDS,
+    severities: bool = True,
+    templates: bool = True,
+) -> ChunkScan:
+    """Every local scan over buf[start:stop], which must be line-aligned."""
+    chunk = ChunkScan(start, stop, lines=_count_lines(buf, start, stop))
+    chunk.hits = scan_keywords(buf, keywords, start, stop)
+    if severities:
+        chunk.severities = SeverityCounter()
+        chunk.severities.feed_buffer(buf, start, stop)
+    if templates:
+        chunk.masked = _mask_lines(buf, start, stop)
+    return chunk
+
+
+def _scan_file_chunk(
+    path: str,
+    start: int,
+    stop: int,
+    keywords: Sequence[str],
+    severities: bool,
+    templates: bool,
+) -> ChunkScan:
+    # Each worker maps the file itself; only the partial results travel back
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        return scan_chunk(buf, start, stop, keywords, severities, templates)
+
+
+def merge_chunks(chunks: Sequence[ChunkScan]) -> ScanResult:
+    """
+    Combine chunk results given in file order. Distinct masked lines reach
+    the template miner in order of first occurrence, so the templates and
+    their counts, line ranges and examples match a single pass (as long as
+    the miner's masked-line cache does not overflow).
+    """
+    hits: List[KeywordHit] = []
+    counter = SeverityCounter()
+    miner = TemplateMiner()
+    examples: Dict[int, List[Tuple[int, str]]] = {}
+    line_offset = 0
+
+    for chunk in chunks:
+        for hit in chunk.hits:
+            hit.line_number += line_offset
+        hits.extend(chunk.hits)
+
+        if chunk.severities is not None:
+            counter.merge(chunk.severities)
+
+        for key, (count, first, last, found) in chunk.masked.items():
+            tpl = miner.template_for(key)
+            if not tpl.count:
+                tpl.first_line = first + line_offset
+            tpl.count += count
+            tpl.last_line = max(tpl.last_line, last + line_offset)
+            examples.setdefault(tpl.id, []).extend((n + line_offset, line) for n, line in found)
+
+        line_offset += chunk.lines
+
+    miner.lines_total = line_offset
+    for tpl in miner.templates:
+        tpl.examples = [line for _, line in sorted(examples.get(tpl.id, []))[:MAX_EXAMPLES]]
+
+    return ScanResult(
+        lines_total=line_offset,
+        hits=hits,
+        severities=counter,
+        templates=miner,
+        first_error_offset=hits[0].start if hits else None,
+        last_error_offset=hits[-1].start if hits else None,
+    )
+
+
+def scan_file(
+    path: pathlib.Path,
+    keywords: Sequence[str] = ERROR_KEYWORDS,
+    workers: Optional[int] = None,
+    severities: bool = True,
+    templates: bool = True,
+) -> ScanResult:
+    """
+    Scan a log across CPU cores: the file is split at newline-aligned
+    offsets, each chunk is scanned in a worker process over its own
+    memory map, and the partial results are merged in file order. The
+    result is the same for any number of workers; with one worker, or a
+    file of a single block, everything runs in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    with path.open("rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return merge_chunks([])
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            plan = plan_chunks(buf, workers * CHUNKS_PER_WORKER)
+            if workers == 1 or len(plan) == 1:
+                return merge_chunks(
+                    [scan_chunk(buf, start, stop, keywords, severities, templates) for start, stop in plan]
+                )
+
+    n = len(plan)
+    with ProcessPoolExecutor(max_workers=min(workers, n)) as pool:
+        chunks = list(pool.map(
+            _scan_file_chunk,
+            [str(path)] * n,
+            [start for start, _ in plan],
+            [stop for _, stop in plan],
+            [tuple(keywords)] * n,
+            [severities] * n,
+            [templates] * n,
+        ))
+    return merge_chunks(chunks)
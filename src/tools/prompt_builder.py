@@ -0,0 +1,181 @@
+# src/tools/prompt_builder.py
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .log_search_tool import split_lines
+from .severity_counter import is_error_line, token_level
+
+# Token budget for the log part of each agent's prompt
+PROMPT_BUDGETS: Dict[str, int] = {
+    "log_type_detector": 1500,
+    "root_cause_analyst": 4000,
+    "logpilot_mvp": 6000,
+}
+
+# Rough size of a token for English text and log lines; close enough to
+# keep prompts bounded without shipping a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Longest line kept verbatim; one minified JSON or stack line can be kilobytes
+MAX_LINE_CHARS = 400
+
+# Frames kept from the top and bottom of each stack trace
+FRAMES_HEAD = 3
+FRAMES_TAIL = 1
+
+_TEMPLATES: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<TS>"),
+    (re.compile(r"^([IWEF])\d{4} \d{2}:\d{2}:\d{2}\.\d+"), r"\1<TS>"),
+    (re.compile(r"\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) [ \d]\d \d{2}:\d{2}:\d{2}\b"), "<TS>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<TS>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<HEX>"),
+]
+
+# Java "at ...", "... 12 more"; Python "File ..." (its source line follows,
+# indented); Go "\t/path/file.go:12 +0x1f" and "pkg.fn(...)" lines
+_FRAME_RE = re.compile(
+    r"^(?:\s+at \S|\s*\.\.\. \d+ more|\s+File \"|\t\S|[\w./*()-]+\(.*\)$|goroutine \d+ \[)"
+)
+_FRAME_CONTINUATION_RE = re.compile(r"^\s{4,}\S")
+
+# Stack-trace headers rank with error lines
+_TRACE_HEADER_RE = re.compile(r"\b(?:Traceback|Caused by)\b")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def template(line: str) -> str:
+    """Replace timestamps, UUIDs and addresses with placeholders."""
+    for pattern, repl in _TEMPLATES:
+        line = pattern.sub(repl, line)
+    return line
+
+
+def _truncate(line: str) -> str:
+    if len(line) <= MAX_LINE_CHARS:
+        return line
+    return f"{line[:MAX_LINE_CHARS]}…[+{len(line) - MAX_LINE_CHARS} chars]"
+
+
+def _signal(line: str) -> int:
+    if is_error_line(line) or _TRACE_HEADER_RE.search(line):
+        return 3
+    if token_level(line) == "WARN":
+        return 2
+    return 1
+
+
+def _group(lines: Iterable[str]) -> List[List[str]]:
+    """
+    Split lines into entries: a log line plus any stack frames under it.
+    """
+    entries: List[List[str]] = []
+    in_frames = False
+    for line in lines:
+        if not line.strip():
+            continue
+        is_frame = bool(_FRAME_RE.match(line)) or (in_frames and bool(_FRAME_CONTINUATION_RE.match(line)))
+        if is_frame and entries:
+            entries[-1].append(line)
+        else:
+            entries.append([line])
+        in_frames = is_frame
+    return entries
+
+
+def _collapse_frames(entry: List[str]) -> List[str]:
+    head, frames = entry[0], entry[1:]
+    if len(frames) <= FRAMES_HEAD + FRAMES_TAIL + 1:
+        return entry
+    hidden = len(frames) - FRAMES_HEAD - FRAMES_TAIL
+    return [head, *frames[:FRAMES_HEAD], f"    ... {hidden} frames collapsed", *frames[-FRAMES_TAIL:]]
+
+
+@dataclass
+class CompressedLog:
+    text: str
+    tokens: int
+    lines_in: int
+    entries_kept: int
+    entries_omitted: int
+
+
+def compress_lines(lines: Sequence[str], budget_tokens: int) -> CompressedLog:
+    """
+    Fit log lines into a token budget:
+      - timestamps/UUIDs become templates, so repeats collapse into one
+        entry with a "×N" count
+      - stack traces keep their first and last frames
+      - over-long lines are cut
+      - when it still does not fit, errors beat warnings beat the rest
+        (earlier first within a level); kept entries stay in log order
+    """
+    counts: Dict[str, int] = {}
+    first: Dict[str, Tuple[int, str, int]] = {}   # key -> (order, rendered, signal)
+    for entry in _group(lines):
+        rendered = "\n".join(_truncate(template(l)) for l in _collapse_frames(entry))
+        if rendered in counts:
+            counts[rendered] += 1
+        else:
+            counts[rendered] = 1
+            first[rendered] = (len(first), rendered, _signal(entry[0]))
+
+    items = []
+    for key, (order, rendered, signal) in first.items():
+        n = counts[key]
+        text = f"{rendered}  (×{n})" if n > 1 else rendered
+        items.append((order, signal, text, estimate_tokens(text) + 1))
+
+    # Reserve room for the omission note up front
+    remaining = budget_tokens - estimate_tokens("[... 000000 lower-signal entries omitted]")
+    kept = []
+    for order, signal, text, cost in sorted(items, key=lambda it: (-it[1], it[0])):
+        if cost <= remaining:
+            kept.append((order, text))
+            remaining -= cost
+
+    kept.sort()
+    omitted = len(items) - len(kept)
+    out = [text for _, text in kept]
+    if omitted:
+        out.append(f"[... {omitted} lower-signal entries omitted]")
+    text = "\n".join(out)
+    return CompressedLog(
+        text=text,
+        tokens=estimate_tokens(text),
+        lines_in=len(lines),
+        entries_kept=len(kept),
+        entries_omitted=omitted,
+    )
+
+
+def compress_log(log_text: str, budget_tokens: int) -> CompressedLog:
+    return compress_lines(split_lines(log_text), budget_tokens)
+
+
+def compress_sections(
+    sections: Sequence[Tuple[str, Sequence[str]]],
+    budget_tokens: int,
+) -> str:
+    """
+    Fit several titled blocks of lines into one budget. Each section gets an
+    equal share; sections needing less hand the rest on to the others.
+    """
+    rendered: Dict[int, str] = {}
+    pending = sorted(
+        range(len(sections)),
+        key=lambda i: sum(estimate_tokens(l) + 1 for l in sections[i][1]),
+    )
+    remaining = budget_tokens
+    for n, i in enumerate(pending):
+        title, lines = sections[i]
+        share = (remaining // (len(pending) - n)) - estimate_tokens(title) - 1
+        block = compress_lines(lines, max(share, 0))
+        rendered[i] = f"{title}\n{block.text}"
+        remaining -= estimate_tokens(rendered[i]) + 1
+    return "\n".join(rendered[i] for i in range(len(sections)))
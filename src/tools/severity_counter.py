@@ -0,0 +1,207 @@
+# src/tools/severity_counter.py
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .log_search_tool import ERROR_KEYWORDS, match_keyword
+
+LEVELS = ("TRACE", "DEBUG", "INFO", "WARN", "ERROR", "FATAL")
+
+# Every spelling we recognise, mapped to one of LEVELS
+_ALIASES = {
+    "TRACE": "TRACE", "FINEST": "TRACE", "FINER": "TRACE",
+    "DEBUG": "DEBUG", "FINE": "DEBUG",
+    "INFO": "INFO", "NOTICE": "INFO", "I": "INFO",
+    "WARN": "WARN", "WARNING": "WARN", "W": "WARN",
+    "ERROR": "ERROR", "ERR": "ERROR", "SEVERE": "ERROR", "E": "ERROR",
+    "FATAL": "FATAL", "CRITICAL": "FATAL", "CRIT": "FATAL", "PANIC": "FATAL",
+    "EMERG": "FATAL", "ALERT": "FATAL", "F": "FATAL",
+}
+
+# Level tokens as plain-text lines spell them. Upper-case only, so "error"
+# in prose or class names such as DefaultCredentialsError does not count.
+# This is the one definition every stage reading levels off raw lines uses.
+_LEVEL_TOKENS = (
+    "TRACE", "DEBUG", "INFO", "NOTICE", "WARNING", "WARN",
+    "ERROR", "SEVERE", "FATAL", "CRITICAL", "CRIT", "PANIC",
+)
+LEVEL_TOKEN = r"(?<![\w])(" + "|".join(_LEVEL_TOKENS) + r")(?![\w])"
+_LEVEL_TOKEN_RE = re.compile(LEVEL_TOKEN)
+
+# Any token of ERROR or above, and Go's lower-case "panic:"
+_SEVERE_TOKEN_RE = re.compile(
+    r"(?<![\w])(?:"
+    + "|".join(t for t in _LEVEL_TOKENS if _ALIASES[t] in ("ERROR", "FATAL"))
+    + r"|panic)(?![\w])"
+)
+
+_MINUTE = r"(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2})"
+
+# Plain text lines (log4j, Python logging, Airflow, klog). Groups:
+#   1, 2  klog header "E0101 12:34" -> letter, "MMDD HH:MM"
+#   3     leading ISO-8601 / log4j timestamp, to the minute
+#   4     first level token on the line (LEVEL_TOKEN)
+# Each match consumes the rest of its line, so the scan resumes at the
+# next line start.
+_PLAIN_RE = re.compile(
+    r"^(?:([IWEF])(\d{4} \d{2}:\d{2}):\d{2}\.\d+"
+    r"|\[?" + _MINUTE + r"?[^\n]*?" + LEVEL_TOKEN +
+    r")[^\n]*",
+    re.MULTILINE,
+)
+
+# JSON lines: optional timestamp field before the level field
+_JSON_RE = re.compile(
+    r"^[^\n]*?(?:\"(?:@?timestamp|time|ts)\"\s*:\s*\"" + _MINUTE + r"[^\n]*?)?"
+    r"\"(?:level|severity|lvl)\"\s*:\s*\"(\w+)\"[^\n]*",
+    re.MULTILINE,
+)
+
+# logfmt: ts=... level=...
+_LOGFMT_RE = re.compile(
+    r"^[^\n]*?(?:\b(?:ts|time|timestamp)=\"?" + _MINUTE + r"[^\n]*?)?"
+    r"\b(?:level|lvl|severity)=\"?(\w+)[^\n]*",
+    re.MULTILINE,
+)
+_LOGFMT_PROBE = re.compile(r"^[^\n]*\b(?:level|lvl|severity)=\w", re.MULTILINE)
+
+# Lines buffered by feed() before they are counted as one block
+_BATCH_LINES = 4096
+
+# Bytes of each block looked at to pick its format
+_PROBE_CHARS = 4096
+
+# Block size for feed_buffer; blocks are cut at the last newline
+_BUFFER_BLOCK = 8 << 20
+
+
+def buffer_blocks(buf, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    """
+    The (start, end) byte ranges feed_buffer counts as blocks. The format
+    is picked per block, so splitting work on these boundaries counts
+    exactly what one feed_buffer call over the whole range would.
+    """
+    pos, size = start, len(buf) if stop is None else stop
+    while pos < size:
+        end = min(pos + _BUFFER_BLOCK, size)
+        if end < size:
+            cut = buf.rfind(b"\n", pos, end)
+            end = cut + 1 if cut >= pos else end
+        yield pos, end
+        pos = end
+
+
+def normalize_level(raw: str) -> Optional[str]:
+    """One of LEVELS for any spelling we recognise, else None."""
+    return _ALIASES.get(raw.upper())
+
+
+def token_level(line: str) -> Optional[str]:
+    """Level of a plain-text line: its first level token, normalised."""
+    m = _LEVEL_TOKEN_RE.search(line)
+    return _ALIASES[m.group(1)] if m else None
+
+
+def is_error_line(line: str) -> bool:
+    """
+    Whether a raw line is an error line: a level token of ERROR or above
+    (or a Go panic) anywhere on it, or one of the error keywords.
+    """
+    return bool(_SEVERE_TOKEN_RE.search(line)) or match_keyword(line, ERROR_KEYWORDS) is not None
+
+
+def _pattern_for(block: str) -> re.Pattern:
+    sample = block[:_PROBE_CHARS]
+    if sample.lstrip().startswith("{"):
+        return _JSON_RE
+    if _LOGFMT_PROBE.search(sample):
+        return _LOGFMT_RE
+    return _PLAIN_RE
+
+
+class SeverityCounter:
+    """
+    Exact severity histogram, overall and per minute.
+    Each block is matched with one findall (pattern picked from a sample
+    of the block) and tallied by Counter in C, so the Python-level work
+    per block depends on the number of distinct (minute, level) pairs, not
+    on the number of lines. Blocks passed to feed_text must end on a line
+    boundary; feed() buffers single lines into blocks itself.
+    """
+
+    def __init__(self) -> None:
+        self._raw: Counter = Counter()
+        self._pending: List[str] = []
+
+    def feed_text(self, text: str) -> None:
+        self._raw.update(_pattern_for(text).findall(text))
+
+    def feed_buffer(self, buf, start: int = 0, stop: Optional[int] = None) -> None:
+        """
+        Count a bytes-like buffer (e.g. an mmap), or its [start, stop)
+        byte range, in line-aligned blocks, decoding one block at a time.
+        """
+        for pos, end in buffer_blocks(buf, start, stop):
+            self.feed_text(buf[pos:end].decode("utf-8", errors="ignore"))
+
+    def merge(self, other: "SeverityCounter") -> None:
+        """Add the counts of another counter, e.g. one from a worker process."""
+        other.flush()
+        self._raw.update(other._raw)
+
+    def add(self, level: str, minute: str = "") -> None:
+        """Count one line whose level is already known, e.g. a parsed record."""
+        self._raw[(minute, level)] += 1
+
+    def feed(self, line: str) -> None:
+        self._pending.append(line)
+        if len(self._pending) >= _BATCH_LINES:
+            self.flush()
+
+    def feed_all(self, lines: Iterable[str]) -> "SeverityCounter":
+        for line in lines:
+            self.feed(line)
+        return self
+
+    def flush(self) -> None:
+        if self._pending:
+            self.feed_text("\n".join(self._pending))
+            self._pending = []
+
+    def _tally(self) -> Tuple[Dict[str, int], Dict[str, Dict[str, int]]]:
+        self.flush()
+        totals: Dict[str, int] = {}
+        per_minute: Dict[str, Dict[str, int]] = {}
+        for groups, n in self._raw.items():
+            if len(groups) == 4:
+                k_letter, k_minute, iso_minute, upper = groups
+                level = normalize_level(k_letter or upper)
+                minute = iso_minute or k_minute
+            else:
+                minute, raw = groups
+                level = normalize_level(raw)
+            if level is None:
+                continue
+            totals[level] = totals.get(level, 0) + n
+            if minute:
+                bucket = per_minute.setdefault(minute.replace("T", " "), {})
+                bucket[level] = bucket.get(level, 0) + n
+        ordered = {lvl: totals[lvl] for lvl in LEVELS if lvl in totals}
+        return ordered, dict(sorted(per_minute.items()))
+
+    def counts(self) -> Dict[str, int]:
+        return self._tally()[0]
+
+    def per_minute(self) -> Dict[str, Dict[str, int]]:
+        """
+        {"YYYY-MM-DD HH:MM": {level: count}} in time order. klog lines,
+        which carry no year, are bucketed as "MMDD HH:MM".
+        """
+        return self._tally()[1]
+
+
+def count_severities(log_text: str) -> Dict[str, int]:
+    counter = SeverityCounter()
+    counter.feed_text(log_text)
+    return counter.counts()
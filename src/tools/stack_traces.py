@@ -0,0 +1,400 @@
+# src/tools/stack_traces.py
+
+import dataclasses
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Raw lines kept per trace for display; the fingerprint covers every frame
+MAX_TRACE_LINES = 200
+
+# Distinct traces tracked per log; traces of later new kinds are only counted
+MAX_TRACE_GROUPS = 1000
+
+# Lines allowed between a Go "panic:" line and its goroutine header
+_GO_HEADER_LINES = 10
+
+# Java: "\tat pkg.Class.method(File.java:12)", possibly behind a log prefix,
+# with a module ("java.base/") or a logback jar suffix ("~[app.jar:1.0]")
+_JAVA_FRAME_RE = re.compile(r"(?:^|\s)at ([\w$][\w$<>/@-]*\.[\w$.<>/@-]+)\([^()]*\)(?:\s+~?\[[^\]]*\])?\s*$")
+_JAVA_CAUSE_RE = re.compile(r"^\s*(?:Caused by|Suppressed): ([\w$.]+)(?::\s?(.*))?")
+_JAVA_MORE_RE = re.compile(r"^\s*\.\.\. \d+ (?:more|common frames omitted)")
+_JAVA_EXCEPTION_RE = re.compile(r"\b((?:[A-Za-z_$][\w$]*\.)*[A-Z][\w$]*(?:Exception|Error|Throwable))\b(?::\s?(.*))?")
+# Lambda and reflection classes are renumbered on every JVM start
+_JAVA_LAMBDA_RE = re.compile(r"\$\$Lambda(?:\$\d+)?/0x[0-9a-fA-F]+")
+_JAVA_GENERATED_RE = re.compile(r"(Accessor|\$Proxy)\d+")
+
+# Python: the traceback header, frames, the final "Type: message" line and
+# the markers between chained exceptions
+_PY_START_RE = re.compile(r"Traceback \(most recent call last\):")
+_PY_FRAME_RE = re.compile(r'^\s+File "([^"]*)", line \d+(?:, in (.+))?')
+_PY_EXCEPTION_RE = re.compile(r"^([A-Za-z_][\w.]*)(?::\s?(.*))?$")
+_PY_CHAIN_RE = re.compile(r"^(?:During handling of the above exception|The above exception was the direct cause)")
+
+# Go: "panic: ..." / "fatal error: ...", then "goroutine 1 [running]:" and
+# pairs of "pkg.fn(args)" and "\t/path/file.go:12 +0x1f" lines
+_GO_START_RE = re.compile(r"^(panic|fatal error): (.*)")
+_GO_GOROUTINE_RE = re.compile(r"^goroutine \d+ \[")
+# "main.(*Server).handle(0xc000012345, {0x1, 0x2})" -> main.(*Server).handle
+_GO_FRAME_RE = re.compile(r"^(?:created by )?([^\s(]+(?:\(\*?[\w.]+\)[^\s(]*)?)(?:\(.*\))?(?: in goroutine \d+)?$")
+
+# Lines that can start a trace; the scanner only runs the parser near
+# these. Kept as separate patterns that each begin with a literal, which
+# the regex engine searches for far faster than one alternation.
+_ANCHORS = (
+    r"Traceback \(most recent call last\):",
+    r"\n(?:panic|fatal error): ",
+    r"at [\w$][\w$<>/@-]*\.[\w$.<>/@-]*\(",
+)
+_ANCHOR_RES = tuple(re.compile(a) for a in _ANCHORS)
+_ANCHOR_BYTES_RES = tuple(re.compile(a.encode("ascii")) for a in _ANCHORS)
+
+
+@dataclass(slots=True)
+class StackTrace:
+    language: str                  # "java", "python" or "go"
+    exception: str                 # thrown type; "panic" / "fatal error" for Go
+    message: str
+    # Normalised frames: no line numbers, arguments, addresses or paths
+    frames: List[str] = field(default_factory=list)
+    # Chained exception types ("Caused by:", Python's earlier tracebacks)
+    causes: List[str] = field(default_factory=list)
+    lines: List[str] = field(default_factory=list)
+    first_line: int = 0            # 1-based line number of lines[0]
+    last_line: int = 0             # of the trace's last line (lines may be capped)
+    fingerprint: str = ""
+
+
+@dataclass(slots=True)
+class TraceGroup:
+    """Every occurrence of one fingerprint; trace is the first of them."""
+    fingerprint: str
+    trace: StackTrace
+    count: int = 1
+    last_line: int = 0
+
+
+def _java_frame(name: str) -> str:
+    name = _JAVA_LAMBDA_RE.sub("$$Lambda", name)
+    name = _JAVA_GENERATED_RE.sub(r"\1", name)
+    # Drop the module or class loader prefix ("java.base/", "app//")
+    return name.rsplit("/", 1)[-1]
+
+
+def _python_frame(path: str, func: Optional[str]) -> str:
+    # Only the file name: install prefixes differ between hosts and venvs
+    name = path.replace("\\", "/").rsplit("/", 1)[-1]
+    return f"{name}:{func.strip()}" if func else name
+
+
+def fingerprint(trace: StackTrace) -> str:
+    """
+    Stable id of a trace: language, exception types and normalised frames,
+    with directly repeated frames (recursion) counted once. Messages, line
+    numbers and addresses are left out, so the same failure at the same
+    place always gets the same fingerprint.
+    """
+    parts = [trace.language, trace.exception, *trace.causes]
+    previous = None
+    for frame in trace.frames:
+        if frame != previous:
+            parts.append(frame)
+            previous = frame
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class StackTraceParser:
+    """
+    Line-by-line state machine that groups Java, Python and Go stack traces
+    (header, frames and chained causes) into StackTrace objects. A trace is
+    returned by the feed() of the first line after it, or by flush().
+    """
+
+    def __init__(self) -> None:
+        self._trace: Optional[StackTrace] = None
+        self._state = ""
+        # The line fed last and its number: a Java trace's header
+        self._prev: Tuple[int, str] = (0, "")
+
+    @property
+    def open(self) -> bool:
+        return self._trace is not None
+
+    def feed(self, line: str, line_number: int) -> Optional[StackTrace]:
+        done = None
+        if self._trace is not None:
+            if self._continue(line):
+                if len(self._trace.lines) < MAX_TRACE_LINES:
+                    self._trace.lines.append(line)
+                self._trace.last_line = line_number
+                self._prev = (line_number, line)
+                return None
+            done = self.flush()
+        self._start(line, line_number)
+        self._prev = (line_number, line)
+        return done
+
+    def peek(self) -> Optional[StackTrace]:
+        """The open trace as flush() would return it, leaving it open."""
+        trace = self._trace
+        if trace is None or not trace.frames:
+            return None
+        lines = list(trace.lines)
+        last_line = trace.last_line
+        while lines and not lines[-1].strip():
+            lines.pop()
+            last_line -= 1
+        trace = dataclasses.replace(
+            trace, frames=list(trace.frames), causes=list(trace.causes), lines=lines, last_line=last_line,
+        )
+        trace.fingerprint = fingerprint(trace)
+        return trace
+
+    def flush(self) -> Optional[StackTrace]:
+        trace = self.peek()
+        self._trace = None
+        return trace
+
+    def _start(self, line: str, line_number: int) -> None:
+        if _PY_START_RE.search(line):
+            self._trace = StackTrace("python", "", "", lines=[line], first_line=line_number, last_line=line_number)
+            self._state = "frames"
+            return
+        m = _GO_START_RE.match(line)
+        if m:
+            self._trace = StackTrace(
+                "go", m.group(1), m.group(2), lines=[line], first_line=line_number, last_line=line_number,
+            )
+            self._state = "header"
+            return
+        m = _JAVA_FRAME_RE.search(line)
+        if m:
+            # The exception is named on the line above the first frame
+            prev_number, prev = self._prev
+            trace = StackTrace("java", "", "", lines=[line], first_line=line_number, last_line=line_number)
+            if prev.strip():
+                trace.lines.insert(0, prev)
+                trace.first_line = prev_number
+                header = _JAVA_EXCEPTION_RE.search(prev)
+                if header:
+                    trace.exception, trace.message = header.group(1), (header.group(2) or "").strip()
+                else:
+                    trace.message = prev.strip()
+            trace.frames.append(_java_frame(m.group(1)))
+            self._trace = trace
+            self._state = "frames"
+
+    def _continue(self, line: str) -> bool:
+        trace = self._trace
+        if trace.language == "java":
+            m = _JAVA_FRAME_RE.search(line)
+            if m:
+                trace.frames.append(_java_frame(m.group(1)))
+                return True
+            m = _JAVA_CAUSE_RE.match(line)
+            if m:
+                trace.causes.append(m.group(1))
+                return True
+            return bool(_JAVA_MORE_RE.match(line))
+
+        if trace.language == "python":
+            state = self._state
+            if state == "frames":
+                m = _PY_FRAME_RE.match(line)
+                if m:
+                    trace.frames.append(_python_frame(m.group(1), m.group(2)))
+                    return True
+                if line[:1].isspace():
+                    return True   # source line or ^^^ markers under a frame
+                m = _PY_EXCEPTION_RE.match(line)
+                if not m:
+                    return False
+                if trace.exception:
+                    trace.causes.append(trace.exception)
+                trace.exception, trace.message = m.group(1), (m.group(2) or "").strip()
+                self._state = "ended"
+                return True
+            if state in ("ended", "gap"):
+                if _PY_CHAIN_RE.match(line):
+                    self._state = "chain"
+                    return True
+                if state == "ended" and not line.strip():
+                    self._state = "gap"
+                    return True
+                return False
+            # "chain": blank lines, then the next traceback of the chain
+            if _PY_START_RE.search(line):
+                self._state = "frames"
+                return True
+            return not line.strip()
+
+        # Go: only the panicking goroutine; other goroutines in the dump vary
+        if self._state == "header":
+            if _GO_GOROUTINE_RE.match(line):
+                self._state = "frames"
+                return True
+            return len(trace.lines) < _GO_HEADER_LINES and (not line.strip() or line[:1] in "[\t")
+        if not line.strip() or _GO_GOROUTINE_RE.match(line):
+            return False
+        if line[:1].isspace():
+            return True   # "\t/path/file.go:12 +0x1f"
+        m = _GO_FRAME_RE.match(line)
+        if m:
+            trace.frames.append(m.group(1))
+        return m is not None
+
+
+class TraceCatalog:
+    """
+    Distinct stack traces of a log by fingerprint, with occurrence counts.
+    Feed it lines (or add() parsed traces); memory is bounded by
+    MAX_TRACE_GROUPS distinct traces of at most MAX_TRACE_LINES lines.
+    """
+
+    def __init__(self) -> None:
+        self.groups: Dict[str, TraceGroup] = {}
+        self.traces_total = 0
+        self.dropped = 0   # occurrences of kinds first seen after the cap
+        self._parser = StackTraceParser()
+
+    def add(self, trace: StackTrace) -> None:
+        self.traces_total += 1
+        group = self.groups.get(trace.fingerprint)
+        if group is not None:
+            group.count += 1
+            group.last_line = trace.last_line
+        elif len(self.groups) < MAX_TRACE_GROUPS:
+            self.groups[trace.fingerprint] = TraceGroup(trace.fingerprint, trace, last_line=trace.last_line)
+        else:
+            self.dropped += 1
+
+    def feed(self, line: str, line_number: int) -> None:
+        trace = self._parser.feed(line, line_number)
+        if trace is not None:
+            self.add(trace)
+
+    def feed_all(self, lines: Iterable[str], first_line: int = 1) -> "TraceCatalog":
+        for n, line in enumerate(lines, start=first_line):
+            self.feed(line, n)
+        return self.finish()
+
+    def finish(self) -> "TraceCatalog":
+        """End the open trace, if any; the next line fed starts afresh."""
+        trace = self._parser.flush()
+        if trace is not None:
+            self.add(trace)
+        self._parser = StackTraceParser()
+        return self
+
+    def open_trace(self) -> Optional[StackTrace]:
+        """A trace still being fed (e.g. at the end of a live log), if any."""
+        return self._parser.peek()
+
+    def merge(self, other: "TraceCatalog") -> "TraceCatalog":
+        """Add the finished traces of another catalog (e.g. another source)."""
+        for fp, group in other.groups.items():
+            mine = self.groups.get(fp)
+            if mine is not None:
+                mine.count += group.count
+                mine.last_line = max(mine.last_line, group.last_line)
+                if group.trace.first_line < mine.trace.first_line:
+                    mine.trace = group.trace
+            elif len(self.groups) < MAX_TRACE_GROUPS:
+                self.groups[fp] = TraceGroup(fp, group.trace, group.count, group.last_line)
+            else:
+                self.dropped += group.count
+        self.traces_total += other.traces_total
+        self.dropped += other.dropped
+        return self
+
+    def ranked(self, top_n: Optional[int] = None) -> List[TraceGroup]:
+        """Most frequent first; earlier first among equals."""
+        groups = sorted(self.groups.values(), key=lambda g: (-g.count, g.trace.first_line))
+        return groups if top_n is None else groups[:top_n]
+
+
+# Bytes counted per slice between anchors (an mmap has no count())
+_COUNT_BLOCK = 8 << 20
+
+
+def _count_newlines(log_text, newline, start: int, stop: int) -> int:
+    n = 0
+    for pos in range(start, stop, _COUNT_BLOCK):
+        n += log_text[pos:min(pos + _COUNT_BLOCK, stop)].count(newline)
+    return n
+
+
+def _anchor_finder(log_text, binary: bool):
+    """find(pos) -> an offset on the first line at or after pos that may start a trace."""
+    patterns = _ANCHOR_BYTES_RES if binary else _ANCHOR_RES
+    # Earliest match of each pattern, kept until the scan passes it
+    pending: List[Optional[int]] = [-1] * len(patterns)
+    head = log_text[:16]
+    at_start = head.startswith((b"panic: ", b"fatal error: ") if binary else ("panic: ", "fatal error: "))
+
+    def find(pos: int) -> Optional[int]:
+        if pos == 0 and at_start:
+            return 0
+        best = None
+        for i, pattern in enumerate(patterns):
+            offset = pending[i]
+            if offset is not None and offset < pos:
+                # From pos - 1: the "\n" before "panic:" may precede pos
+                m = pattern.search(log_text, max(pos - 1, 0))
+                if m is not None and m.end() - 1 < pos:
+                    m = pattern.search(log_text, pos)
+                # The match's last character is always on the anchor line
+                offset = pending[i] = None if m is None else m.end() - 1
+            if offset is not None and (best is None or offset < best):
+                best = offset
+        return best
+
+    return find
+
+
+def scan_traces(log_text: str | bytes) -> TraceCatalog:
+    """
+    Stack traces of a whole text or bytes-like buffer (e.g. an mmap). A
+    few regex searches find the lines that can start a trace; the parser
+    only runs from the line above each of them until the trace ends, so
+    the rest of the log is never split into lines. Same result as feeding
+    every line to a TraceCatalog.
+    """
+    binary = not isinstance(log_text, str)
+    newline = b"\n" if binary else "\n"
+    find_anchor = _anchor_finder(log_text, binary)
+    catalog = TraceCatalog()
+    parser = catalog._parser
+    size = len(log_text)
+    pos = 0           # no trace starts before this offset
+    line_number = 1   # line number at pos
+
+    while pos < size:
+        anchor = find_anchor(pos)
+        if anchor is None:
+            break
+        # Start a line early: a Java header sits above the first frame. When
+        # that line was fed already, the parser still remembers it.
+        start = log_text.rfind(newline, 0, anchor) + 1
+        if start > pos:
+            start = max(log_text.rfind(newline, pos, start - 1) + 1, pos)
+            line_number += _count_newlines(log_text, newline, pos, start)
+        while start < size:
+            end = log_text.find(newline, start)
+            end = size if end == -1 else end
+            line = log_text[start:end]
+            if binary:
+                line = line.decode("utf-8", errors="ignore")
+            if line.endswith("\r"):
+                line = line[:-1]
+            trace = parser.feed(line, line_number)
+            if trace is not None:
+                catalog.add(trace)
+            start = end + 1
+            line_number += 1
+            if not parser.open and start > anchor:
+                break
+        pos = start
+
+    return catalog.finish()
@@ -0,0 +1,181 @@
+# src/tools/template_miner.py
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from .severity_counter import is_error_line
+
+WILDCARD = "<*>"
+
+# Prefix-tree depth (length bucket + DEPTH - 2 leading tokens) and the
+# share of matching tokens needed to join an existing template
+DEPTH = 4
+SIMILARITY = 0.4
+MAX_CHILDREN = 100
+MAX_EXAMPLES = 3
+
+# Masked lines remembered for the exact-match fast path
+MAX_CACHE = 200_000
+
+# Variable parts replaced before tokenising: UUIDs, and any run that
+# starts with a digit at a word boundary (dates, times, IPs, ports, hex,
+# ids, durations). Kept to one cheap alternation; masking is most of the
+# per-line cost.
+_MASK_RE = re.compile(r"\b(?:[0-9a-fA-F]{8}-[\w-]{27}|\d[\w:.,/+-]*)")
+
+# Rarity is -log(share of lines); an error template outranks any
+# non-error one unless that is about 10^4 times rarer
+ERROR_WEIGHT = 10.0
+
+
+@dataclass
+class LogTemplate:
+    id: int
+    tokens: List[str]
+    count: int = 0
+    first_line: int = 0
+    last_line: int = 0
+    examples: List[str] = field(default_factory=list)
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def is_error(self) -> bool:
+        text = self.examples[0] if self.examples else self.template
+        return is_error_line(text)
+
+
+def mask(line: str) -> str:
+    return _MASK_RE.sub(WILDCARD, line)
+
+
+def _similarity(template: List[str], tokens: List[str]) -> float:
+    same = 0
+    for a, b in zip(template, tokens):
+        if a == b:
+            same += 1
+    return same / len(tokens)
+
+
+class TemplateMiner:
+    """
+    Streaming Drain-style template miner.
+    Lines are masked, tokenised, and routed through a fixed-depth prefix
+    tree (token count, then the first few tokens) to a small list of
+    candidate templates; the most similar one absorbs the line, turning
+    differing tokens into <*>, or a new template is started.
+    Masked lines seen before skip the tree entirely, which is what keeps
+    the miner fast on real logs where most lines repeat a shape.
+    """
+
+    def __init__(
+        self,
+        depth: int = DEPTH,
+        similarity: float = SIMILARITY,
+        max_children: int = MAX_CHILDREN,
+    ) -> None:
+        self.depth = depth
+        self.similarity = similarity
+        self.max_children = max_children
+        self.templates: List[LogTemplate] = []
+        self.lines_total = 0
+        self._root: Dict[int, dict] = {}
+        self._cache: Dict[str, LogTemplate] = {}
+
+    def add(self, line: str, line_number: Optional[int] = None) -> LogTemplate:
+        self.lines_total += 1
+        if line_number is None:
+            line_number = self.lines_total
+
+        masked = _MASK_RE.sub(WILDCARD, line)
+        tpl = self._cache.get(masked)
+        if tpl is None:
+            tpl = self.template_for(masked)
+
+        if not tpl.count:
+            tpl.first_line = line_number
+        tpl.count += 1
+        tpl.last_line = line_number
+        if len(tpl.examples) < MAX_EXAMPLES:
+            tpl.examples.append(line)
+        return tpl
+
+    def template_for(self, masked: str) -> LogTemplate:
+        """
+        The template a masked line (see mask()) belongs to, without counting
+        it. Feeding distinct masked lines in order of first occurrence
+        builds the same templates as add() over every line.
+        """
+        tpl = self._cache.get(masked)
+        if tpl is None:
+            tpl = self._match(masked.split())
+            if len(self._cache) >= MAX_CACHE:
+                self._cache.clear()
+            self._cache[masked] = tpl
+        return tpl
+
+    def add_all(self, lines: Iterable[str]) -> "TemplateMiner":
+        add = self.add
+        for line in lines:
+            add(line)
+        return self
+
+    def _leaf(self, tokens: List[str]) -> list:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            if WILDCARD in token:
+                token = WILDCARD
+            child = node.get(token)
+            if child is None:
+                if len(node) >= self.max_children:
+                    token = WILDCARD
+                    child = node.get(token)
+                if child is None:
+                    child = node[token] = {}
+            node = child
+        return node.setdefault(None, [])
+
+    def _match(self, tokens: List[str]) -> LogTemplate:
+        leaf = self._leaf(tokens)
+        if not tokens:
+            if not leaf:
+                leaf.append(self._new([]))
+            return leaf[0]
+
+        best, best_sim = None, -1.0
+        for tpl in leaf:
+            sim = _similarity(tpl.tokens, tokens)
+            if sim > best_sim:
+                best, best_sim = tpl, sim
+        if best is not None and best_sim >= self.similarity:
+            best.tokens = [a if a == b else WILDCARD for a, b in zip(best.tokens, tokens)]
+            return best
+
+        tpl = self._new(tokens)
+        leaf.append(tpl)
+        return tpl
+
+    def _new(self, tokens: List[str]) -> LogTemplate:
+        tpl = LogTemplate(id=len(self.templates) + 1, tokens=list(tokens))
+        self.templates.append(tpl)
+        return tpl
+
+    def ranked(self, top_n: Optional[int] = None) -> List[LogTemplate]:
+        """
+        Non-empty templates, highest score first: rarity plus a fixed bonus
+        for error templates.
+        """
+        total = max(self.lines_total, 1)
+
+        def score(tpl: LogTemplate) -> float:
+            rarity = math.log(total / tpl.count)
+            return rarity + (ERROR_WEIGHT if tpl.is_error() else 0.0)
+
+        ranked = sorted(
+            (t for t in self.templates if t.count and t.tokens),
+            key=lambda t: (-score(t), t.first_line),
+        )
+        return ranked if top_n is None else ranked[:top_n]
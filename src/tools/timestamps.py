@@ -0,0 +1,311 @@
+# src/tools/timestamps.py
+
+import calendar
+import datetime
+import pathlib
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .log_search_tool import split_lines
+
+# Placeholder for "no timestamp" in int64 columns
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+NS_PER_SECOND = 1_000_000_000
+
+# Only the start of a line is searched; timestamps live in the header
+HEAD_CHARS = 120
+
+# Lines looked at to pick a file's format
+SAMPLE_LINES = 200
+
+# One index entry per this many bytes: 16k entries for a 1 GB log
+INDEX_STRIDE = 64 << 10
+
+# Bytes decoded at a time by TimeIndex.iter_window
+_DECODE_BLOCK = 8 << 20
+
+# Lines tried after an index position before giving up on a timestamp
+_PROBE_LINES = 32
+
+# Formats detected per file, reused until evicted
+_MAX_CACHED_FORMATS = 256
+
+
+def iso_to_ns(text: str) -> int:
+    """ISO-8601 / log4j timestamp to ns since the epoch; naive times are UTC."""
+    try:
+        dt = datetime.datetime.fromisoformat(text.replace(",", ".", 1))
+    except ValueError:
+        return NO_TIMESTAMP
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    seconds = calendar.timegm(dt.utctimetuple())
+    return seconds * NS_PER_SECOND + dt.microsecond * 1000
+
+
+def epoch_to_ns(value: float) -> int:
+    """Epoch seconds, ms, µs or ns (told apart by magnitude) to ns."""
+    magnitude = abs(value)
+    if magnitude < 1e11:
+        return int(value * NS_PER_SECOND)
+    if magnitude < 1e14:
+        return int(value * 1_000_000)
+    if magnitude < 1e17:
+        return int(value * 1000)
+    return int(value)
+
+
+def _fraction_ns(digits: Optional[str]) -> int:
+    return int(digits[:9].ljust(9, "0")) if digits else 0
+
+
+def _civil_ns(year: int, month: int, day: int, hh: int, mm: int, ss: int) -> Optional[int]:
+    if not (1 <= month <= 12 and 1 <= day <= 31 and hh < 24 and mm < 60 and ss < 61):
+        return None
+    return calendar.timegm((year, month, day, hh, mm, ss)) * NS_PER_SECOND
+
+
+def _iso(m: re.Match, year: int) -> Optional[int]:
+    y, mo, d, hh, mm, ss, frac, tz = m.groups()
+    ns = _civil_ns(int(y), int(mo), int(d), int(hh), int(mm), int(ss))
+    if ns is None:
+        return None
+    ns += _fraction_ns(frac)
+    if tz and tz != "Z":
+        sign = -1 if tz[0] == "-" else 1
+        tz = tz[1:].replace(":", "")
+        ns -= sign * (int(tz[:2]) * 3600 + int(tz[2:]) * 60) * NS_PER_SECOND
+    return ns
+
+
+# "Jan" -> 1 ... "Dec" -> 12, for syslog-style dates
+MONTHS = {m: i for i, m in enumerate(calendar.month_abbr) if m}
+
+
+def _syslog(m: re.Match, year: int) -> Optional[int]:
+    month, d, hh, mm, ss = m.groups()
+    if month not in MONTHS:
+        return None
+    return _civil_ns(year, MONTHS[month], int(d), int(hh), int(mm), int(ss))
+
+
+def _klog(m: re.Match, year: int) -> Optional[int]:
+    mo, d, hh, mm, ss, frac = m.groups()
+    ns = _civil_ns(year, int(mo), int(d), int(hh), int(mm), int(ss))
+    return None if ns is None else ns + _fraction_ns(frac)
+
+
+def _epoch(m: re.Match, year: int) -> Optional[int]:
+    return epoch_to_ns(float(m.group(1)))
+
+
+@dataclass(frozen=True)
+class TimestampFormat:
+    name: str
+    pattern: re.Pattern
+    convert: Callable[[re.Match, int], Optional[int]]
+
+
+# Tried in this order during detection; log4j ("2025-11-25 10:15:23,123")
+# and Airflow ("[2025-11-25 02:05:11,001]") are ISO-8601 variants
+FORMATS: Tuple[TimestampFormat, ...] = (
+    TimestampFormat(
+        "iso8601",
+        re.compile(r"(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:[.,](\d{1,9}))?(Z|[+-]\d{2}:?\d{2})?"),
+        _iso,
+    ),
+    TimestampFormat("klog", re.compile(r"^[IWEF](\d{2})(\d{2}) (\d{2}):(\d{2}):(\d{2})\.(\d{6})"), _klog),
+    TimestampFormat(
+        "syslog",
+        re.compile(r"^(?:<\d{1,3}>)?([A-Z][a-z]{2}) +(\d{1,2}) (\d{2}):(\d{2}):(\d{2})\b"),
+        _syslog,
+    ),
+    # Epoch seconds (optionally fractional), ms, µs or ns from 2001 to 2033
+    TimestampFormat("epoch", re.compile(r"(?<![\w.])(1\d{9}(?:\.\d+)?|1\d{12}|1\d{15}|1\d{18})(?![\w])"), _epoch),
+)
+_BY_NAME = {f.name: f for f in FORMATS}
+
+
+class TimestampExtractor:
+    """
+    Pulls a timestamp (ns since the epoch, UTC) from the head of a line,
+    using one format detected up front instead of trying every format on
+    every line. Formats without a year (syslog, klog) use `year`.
+    """
+
+    def __init__(self, fmt: Optional[TimestampFormat], year: Optional[int] = None) -> None:
+        self.format = fmt
+        self.year = year or datetime.datetime.now(datetime.timezone.utc).year
+        self._search = fmt.pattern.search if fmt else None
+
+    @classmethod
+    def detect(cls, lines: Iterable[str], year: Optional[int] = None) -> "TimestampExtractor":
+        """The format that dates the most sample lines (first in FORMATS on ties)."""
+        sample = [line[:HEAD_CHARS] for line in lines]
+        best, best_hits = None, 0
+        for fmt in FORMATS:
+            hits = sum(1 for line in sample if fmt.pattern.search(line))
+            if hits > best_hits:
+                best, best_hits = fmt, hits
+        return cls(best, year)
+
+    def extract(self, line: str) -> Optional[int]:
+        if self._search is None:
+            return None
+        m = self._search(line, 0, HEAD_CHARS)
+        return self.format.convert(m, self.year) if m else None
+
+
+_formats: "OrderedDict[pathlib.Path, Optional[str]]" = OrderedDict()
+
+
+def extractor_for(path: pathlib.Path, sample: Iterable[str]) -> TimestampExtractor:
+    """
+    Extractor for a file; the format detected from sample is remembered
+    per path, so later opens of the same (e.g. growing) file skip detection.
+    """
+    key = path.resolve()
+    if key in _formats:
+        _formats.move_to_end(key)
+        name = _formats[key]
+        return TimestampExtractor(_BY_NAME[name] if name else None)
+    extractor = TimestampExtractor.detect(sample)
+    _formats[key] = extractor.format.name if extractor.format else None
+    if len(_formats) > _MAX_CACHED_FORMATS:
+        _formats.popitem(last=False)
+    return extractor
+
+
+def sample_lines(buf, n: int = SAMPLE_LINES) -> List[str]:
+    """Decoded heads of the first n lines of a bytes-like buffer."""
+    lines: List[str] = []
+    pos, size = 0, len(buf)
+    while pos < size and len(lines) < n:
+        end = buf.find(b"\n", pos)
+        end = size if end == -1 else end
+        lines.append(buf[pos:min(end, pos + HEAD_CHARS * 4)].decode("utf-8", errors="ignore"))
+        pos = end + 1
+    return lines
+
+
+class TimeIndex:
+    """
+    Sparse time -> byte offset index over a bytes-like buffer (an mmap or
+    an upload): one entry per INDEX_STRIDE bytes, holding the first dated
+    line at or after that point. Building it reads a few lines per stride,
+    not the file. Times are made non-decreasing (a running maximum) so
+    they can be binary searched; a line far out of order near the end of
+    a window can fall outside the range found for it.
+    """
+
+    def __init__(self, buf, extractor: TimestampExtractor, stride: int = INDEX_STRIDE) -> None:
+        self.buf = buf
+        self.extractor = extractor
+        self.size = len(buf)
+        offsets: List[int] = []
+        times: List[int] = []
+        pos = 0
+        while pos < self.size:
+            found = self._first_time_at(pos)
+            if found is not None and (not offsets or found[1] > offsets[-1]):
+                times.append(found[0])
+                offsets.append(found[1])
+            nl = buf.find(b"\n", pos + stride - 1)
+            if nl == -1:
+                break
+            pos = nl + 1
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.times = np.maximum.accumulate(np.asarray(times, dtype=np.int64)) if times else np.zeros(0, np.int64)
+
+    def _line_time(self, pos: int) -> Tuple[Optional[int], int]:
+        end = self.buf.find(b"\n", pos)
+        end = self.size if end == -1 else end
+        head = self.buf[pos:min(end, pos + HEAD_CHARS * 4)].decode("utf-8", errors="ignore")
+        return self.extractor.extract(head), end + 1
+
+    def _first_time_at(self, pos: int) -> Optional[Tuple[int, int]]:
+        for _ in range(_PROBE_LINES):
+            if pos >= self.size:
+                return None
+            ts, next_pos = self._line_time(pos)
+            if ts is not None:
+                return ts, pos
+            pos = next_pos
+        return None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def first_time(self) -> Optional[int]:
+        return int(self.times[0]) if len(self.times) else None
+
+    @property
+    def last_time(self) -> Optional[int]:
+        """Time of the last dated line (looked up from the end of the buffer)."""
+        if not len(self.times):
+            return None
+        pos = int(self.offsets[-1])
+        last = int(self.times[-1])
+        while pos < self.size:
+            ts, pos = self._line_time(pos)
+            if ts is not None:
+                last = max(last, ts)
+        return last
+
+    def time_at(self, offset: int) -> Optional[int]:
+        """Timestamp of the line starting at offset, or of the nearest dated line before it."""
+        ts, _ = self._line_time(offset)
+        if ts is not None:
+            return ts
+        i = int(np.searchsorted(self.offsets, offset, side="right")) - 1
+        return int(self.times[i]) if i >= 0 else None
+
+    def byte_range(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> Tuple[int, int]:
+        """
+        [start, end) byte offsets, on line boundaries, that contain every
+        line timed in [start_ns, end_ns); found by binary search.
+        """
+        lo, hi = 0, self.size
+        if start_ns is not None:
+            i = int(np.searchsorted(self.times, start_ns, side="left")) - 1
+            lo = int(self.offsets[i]) if i >= 0 else 0
+        if end_ns is not None:
+            j = int(np.searchsorted(self.times, end_ns, side="left"))
+            hi = int(self.offsets[j]) if j < len(self.offsets) else self.size
+        return lo, max(lo, hi)
+
+    def _iter_lines(self, lo: int, hi: int) -> Iterator[str]:
+        # Decoded a line-aligned block at a time, so a wide window does not
+        # turn into one huge string
+        while lo < hi:
+            end = min(lo + _DECODE_BLOCK, hi)
+            if end < hi:
+                nl = self.buf.rfind(b"\n", lo, end)
+                end = nl + 1 if nl >= lo else end
+            yield from split_lines(self.buf[lo:end].decode("utf-8", errors="ignore"))
+            lo = end
+
+    def iter_window(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> Iterator[str]:
+        """
+        Lines timed in [start_ns, end_ns), decoded from the byte range only.
+        Undated lines (stack frames, continuations) take the time of the
+        dated line before them.
+        """
+        lo, hi = self.byte_range(start_ns, end_ns)
+        current = None
+        for line in self._iter_lines(lo, hi):
+            ts = self.extractor.extract(line)
+            if ts is not None:
+                current = ts
+            if current is None:
+                if start_ns is None:
+                    yield line
+                continue
+            if (start_ns is None or current >= start_ns) and (end_ns is None or current < end_ns):
+                yield line
@@ -1,5 +1,7 @@
+import datetime
 import os
 import sys
+import pandas as pd
 import streamlit as st
 
 # Ensure project root is on sys.path (usually already is, but safe)
@@ -7,11 +9,9 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 if BASE_DIR not in sys.path:
     sys.path.append(BASE_DIR)
 
-from src.agents.log_type_detector import run as detect_log_type
-from src.agents.segmenter_cluster import run as segment_logs
-from src.agents.root_cause_analyst import run as analyze_root_cause
-from src.agents.fix_recommender import run as recommend_fixes
-from src.agents.knowledge_memory_agent import store_incident, find_similar
+from src.pipeline import analyze_lines, analyze_text
+from src.tools.file_read_tool import COMPRESSED_SUFFIXES, decompressing_reader, iter_stream_lines
+from src.tools.timestamps import TimeIndex, TimestampExtractor, sample_lines
 
 # =========================
 # PAGE CONFIG
@@ -264,8 +264,8 @@ with left_col:
         unsafe_allow_html=True,
     )
     uploaded_file = st.file_uploader(
-        "Upload .log or .txt",
-        type=["log", "txt"],
+        "Upload .log or .txt (optionally .gz, .bz2 or .zst)",
+        type=["log", "txt", "gz", "bz2", "zst"],
         label_visibility="collapsed",
     )
     st.markdown("</div>", unsafe_allow_html=True)
@@ -286,20 +286,66 @@ with right_col:
     st.markdown("</div>", unsafe_allow_html=True)
 
 st.markdown("")
+
+# Time-window filter for uploads with timestamps: the sparse time index
+# finds the window by binary search and only that part is decoded
+upload_index = None
+time_window = None
+if uploaded_file is not None and not uploaded_file.name.endswith(COMPRESSED_SUFFIXES):
+    upload_bytes = uploaded_file.getvalue()
+    upload_index = TimeIndex(upload_bytes, TimestampExtractor.detect(sample_lines(upload_bytes)))
+    first_ns, last_ns = upload_index.first_time, upload_index.last_time
+    if first_ns is not None and last_ns - first_ns >= 1_000_000_000:
+        def to_datetime(ns):
+            return datetime.datetime.fromtimestamp(ns // 1_000_000_000, datetime.timezone.utc).replace(tzinfo=None)
+
+        full_range = (to_datetime(first_ns), to_datetime(last_ns))
+        time_window = st.slider(
+            "Time window (UTC)",
+            min_value=full_range[0],
+            max_value=full_range[1],
+            value=full_range,
+            step=datetime.timedelta(seconds=1),
+            format="YYYY-MM-DD HH:mm:ss",
+        )
+        if time_window == full_range:
+            time_window = None
+
+refresh = st.checkbox(
+    "Re-run the full analysis for known incidents",
+    help="By default a log whose signature matches a stored analysis reuses it without calling the LLM.",
+)
 analyze_clicked = st.button("Analyze logs", use_container_width=True)
 
 # =========================
 # BACKEND + RESULTS
 # =========================
 log_text = None
+log_stream = None
+source = None
 if uploaded_file is not None:
-    log_text = uploaded_file.read().decode("utf-8", errors="ignore")
+    source = uploaded_file.name
+    if source.endswith(COMPRESSED_SUFFIXES):
+        # st.file_uploader already holds the compressed bytes in memory; they
+        # are decompressed while segmented, so the decompressed text never is
+        log_stream = decompressing_reader(uploaded_file)
+    elif time_window is not None:
+        start, end = (
+            int(t.replace(tzinfo=datetime.timezone.utc).timestamp()) * 1_000_000_000 for t in time_window
+        )
+        # The slider works in whole seconds; keep all of the last one
+        log_text = "\n".join(upload_index.iter_window(start, end + 1_000_000_000))
+        source = f"{source} ({time_window[0]:%Y-%m-%d %H:%M:%S} to {time_window[1]:%H:%M:%S} UTC)"
+    else:
+        log_text = uploaded_file.getvalue().decode("utf-8", errors="ignore")
 if pasted_text and pasted_text.strip():
     # Pasted text wins if both are provided
     log_text = pasted_text
+    log_stream = None
+    source = "pasted text"
 
 if analyze_clicked:
-    if not log_text:
+    if not log_text and log_stream is None:
         st.error("Please upload a log file or paste log text before analyzing.")
     else:
         # Show Step 2 heading as soon as we start analysis
@@ -308,31 +354,17 @@ if analyze_clicked:
         try:
             with st.spinner("Analyzing logs with LogPilot agents…"):
                 # ----- Agent calls -----
-                lt_result = detect_log_type(log_text)
-                seg_result = segment_logs(log_text)
-                rc_result = analyze_root_cause(
-                    log_type=lt_result.log_type,
-                    segments=seg_result.segments,
-                    error_samples=seg_result.error_samples,
-                )
-                fix_result = recommend_fixes(
-                    log_type=lt_result.log_type,
-                    primary_root_cause=rc_result.primary_root_cause,
-                    symptoms=rc_result.symptoms,
-                )
-
-                # Prepare example data for memory
-                example_error = seg_result.error_samples[0] if seg_result.error_samples else ""
-                first_quick = fix_result.quick_fixes[0] if fix_result.quick_fixes else ""
-                first_long = fix_result.long_term_fixes[0] if fix_result.long_term_fixes else ""
-
-                store_incident(
-                    log_type=lt_result.log_type,
-                    primary_root_cause=rc_result.primary_root_cause,
-                    example_error=example_error,
-                    quick_fix=first_quick,
-                    long_term_fix=first_long,
-                )
+                # Same agent graph and report as the CLI; independent agents
+                # run concurrently inside it
+                if log_stream is not None:
+                    report = analyze_lines(iter_stream_lines(log_stream), source=source, refresh=refresh)
+                else:
+                    report = analyze_text(log_text, source=source, refresh=refresh)
+                lt_result = report.log_type
+                seg_result = report.segments
+                rc_result = report.root_cause
+                fix_result = report.fixes
+                similar = report.similar
 
         except Exception as e:
             # If anything in the agents/LLM fails, show it instead of crashing the app
@@ -349,7 +381,12 @@ if analyze_clicked:
                 st.markdown("</div>", unsafe_allow_html=True)
 
             with m2:
-                total_errors = len(seg_result.error_samples)
+                # Exact counts over the whole log, not just the sampled lines
+                severity_counts = seg_result.severity_counts
+                if severity_counts:
+                    total_errors = severity_counts.get("ERROR", 0) + severity_counts.get("FATAL", 0)
+                else:
+                    total_errors = seg_result.error_lines_total
                 st.markdown('<div class="lp-metric-card">', unsafe_allow_html=True)
                 st.markdown('<div class="lp-metric-label">Detected errors</div>', unsafe_allow_html=True)
                 st.markdown(f'<div class="lp-metric-value">{total_errors}</div>', unsafe_allow_html=True)
@@ -381,8 +418,13 @@ if analyze_clicked:
                 st.subheader("Log type & severity")
                 st.write("**Detected log type:**", lt_result.log_type)
                 if getattr(lt_result, "severity_summary", None):
-                    st.write("**Severity estimate:**")
+                    st.write("**Severity counts:**")
                     st.json(lt_result.severity_summary)
+                if len(seg_result.severity_per_minute) > 1:
+                    st.write("**Severities per minute:**")
+                    st.bar_chart(
+                        pd.DataFrame.from_dict(seg_result.severity_per_minute, orient="index").fillna(0)
+                    )
                 if getattr(lt_result, "notes", None):
                     st.caption("Classifier notes:")
                     st.code(lt_result.notes)
@@ -406,6 +448,22 @@ if analyze_clicked:
                 else:
                     st.info("No obvious error lines found.")
 
+                if seg_result.templates:
+                    st.markdown("**Line templates (errors and rarest first):**")
+                    for seg in seg_result.templates:
+                        with st.expander(seg.summary):
+                            st.code("\n".join(seg.sample_lines))
+
+                if seg_result.stack_traces:
+                    st.markdown(
+                        f"**Stack traces ({seg_result.stack_traces_total} in total, one copy of each):**"
+                    )
+                    for group in seg_result.stack_traces:
+                        trace = group.trace
+                        title = trace.exception or trace.message[:80]
+                        with st.expander(f"{group.count}x {title} – `{group.fingerprint}`"):
+                            st.code("\n".join(trace.lines))
+
             # ---- TAB 3 ----
             with tab3:
                 st.subheader("Root cause analysis")
@@ -424,11 +482,12 @@ if analyze_clicked:
             with tab4:
                 st.subheader("Fix recommendations & memory lookup")
 
-                similar = find_similar(
-                    log_type=lt_result.log_type,
-                    primary_root_cause=rc_result.primary_root_cause,
-                )
-                if similar:
+                if report.reused:
+                    st.success(
+                        f"Known incident (signature `{report.signature[:12]}`): stored analysis reused"
+                        f" without LLM calls. Reuse hit rate so far: {report.metrics['reuse_hit_rate']:.0%}."
+                    )
+                elif similar:
                     st.success("Similar past incident found in memory.")
                     st.write("**Past root cause:**", similar.primary_root_cause)
                     st.write("**Past quick fix:**", similar.quick_fix)
@@ -451,7 +510,22 @@ if analyze_clicked:
                 else:
                     st.write("_No long-term fixes parsed._")
 
-            st.success("Analysis complete and incident stored in memory.")
+            st.caption(
+                f"Critical path: {' → '.join(report.critical_path)} "
+                f"({report.wall_time:.1f}s wall clock, "
+                f"{report.metrics['llm_calls']} LLM calls, "
+                f"~{report.metrics['prompt_tokens'] + report.metrics['response_tokens']} tokens)"
+            )
+            st.download_button(
+                "Download report (JSON)",
+                data=report.to_json(indent=2),
+                file_name="logpilot_report.json",
+                mime="application/json",
+            )
+            if report.reused:
+                st.success("Analysis complete: stored analysis reused, nothing new stored in memory.")
+            else:
+                st.success("Analysis complete and incident stored in memory.")
 
 else:
     st.info("Upload a log file or paste log text above, then click **Analyze logs** to generate your incident report.")
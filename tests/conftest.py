@@ -0,0 +1,112 @@
+import asyncio
+import datetime
+import random
+from typing import List
+
+import pytest
+
+_START = datetime.datetime(2025, 11, 25, 10, 0, 0)
+
+JAVA_TRACE = [
+    "java.lang.IllegalStateException: pool exhausted",
+    "\tat com.example.db.Pool.acquire(Pool.java:88)",
+    "\tat com.example.api.Handler.handle(Handler.java:41)",
+    "Caused by: java.net.SocketTimeoutException: connect timed out",
+    "\tat java.base/java.net.Socket.connect(Socket.java:633)",
+    "\t... 12 more",
+]
+
+PYTHON_TRACE = [
+    "Traceback (most recent call last):",
+    '  File "/srv/app/worker.py", line 12, in run',
+    "    job()",
+    '  File "/srv/app/jobs.py", line 40, in job',
+    "    raise KeyError(name)",
+    "KeyError: 'tenant'",
+]
+
+
+def make_log(seed: int = 0, lines: int = 600, bursts=((200, 20, 1), (450, 6, 3))) -> List[str]:
+    """
+    A log4j-style log, one line per second, with error bursts given as
+    (first line, errors, line gap between errors) and a Java and a Python
+    stack trace after each burst.
+    """
+    rng = random.Random(seed)
+    out = []
+    error_lines = set()
+    for first, count, gap in bursts:
+        error_lines.update(first + i * gap for i in range(count))
+    traces = {first + count * gap: JAVA_TRACE if i % 2 == 0 else PYTHON_TRACE for i, (first, count, gap) in enumerate(bursts)}
+
+    n = 0
+    while len(out) < lines:
+        ts = (_START + datetime.timedelta(seconds=n)).strftime("%Y-%m-%d %H:%M:%S,%f")[:-3]
+        n += 1
+        if len(out) in traces:
+            out.append(f"{ts} ERROR [main] c.e.Worker - job {rng.randint(1, 999)} crashed")
+            out.extend(traces[len(out) - 1])
+        elif len(out) in error_lines:
+            out.append(f"{ts} ERROR [pool-{rng.randint(1, 4)}] c.e.Client - request {rng.randint(1, 9999)} failed: timeout")
+        else:
+            level = rng.choice(("INFO", "INFO", "INFO", "DEBUG", "WARN"))
+            out.append(f"{ts} {level} [main] c.e.Service - handled request {rng.randint(1, 9999)} in {rng.randint(1, 900)}ms")
+    return out[:lines]
+
+
+@pytest.fixture
+def log_lines():
+    return make_log
+
+
+class StubModel:
+    """Async backend for llm_client: answers every prompt with `answer`."""
+
+    def __init__(self, answer="stub answer", delay: float = 0.0):
+        self.answer = answer
+        self.delay = delay
+        self.prompts: List[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.failures: List[BaseException] = []   # raised, in order, before answering
+
+    async def __call__(self, prompt: str, model: str) -> str:
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.failures:
+                raise self.failures.pop(0)
+            return self.answer(prompt) if callable(self.answer) else self.answer
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def stub_llm(tmp_path, monkeypatch):
+    """Every LLM call goes to a StubModel, with a fresh response cache."""
+    from src import llm_cache, llm_client
+
+    monkeypatch.setattr(llm_cache, "_cache", llm_cache.ResponseCache(tmp_path / "llm_cache.sqlite3"))
+    stub = StubModel()
+    llm_client.set_async_backend(stub)
+    yield stub
+    llm_client.set_async_backend(None)
+
+
+@pytest.fixture
+def memory_store(tmp_path, monkeypatch):
+    """The incident store, on a scratch database."""
+    from src.memory import incident_store
+
+    monkeypatch.setattr(incident_store, "MEMORY_PATH", tmp_path / "incidents.sqlite3")
+    monkeypatch.setattr(incident_store, "LEGACY_JSON_PATH", tmp_path / "incidents.json")
+    monkeypatch.setattr(incident_store, "_conn", None)
+    monkeypatch.setattr(incident_store, "_index", None)
+    monkeypatch.setattr(incident_store, "_indexed_upto", {})
+    monkeypatch.setattr(incident_store, "_writer", incident_store._GroupCommitWriter())
+    yield incident_store
+    if incident_store._conn is not None:
+        incident_store._conn.close()
@@ -0,0 +1,35 @@
+import json
+import os
+
+from src.batch import find_logs, run_batch
+
+
+def test_second_run_skips_files_already_in_the_checkpoint(tmp_path, stub_llm, memory_store, log_lines):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    for seed in range(3):
+        lines = log_lines(seed, lines=200, bursts=((100, 5, 1),))
+        (logs / f"app{seed}.log").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    paths = find_logs(str(logs))
+    output = tmp_path / "triage.jsonl"
+
+    first = run_batch(paths, output, workers=1, concurrency=2)
+    assert (first["ok"], first["error"], first["skipped"]) == (3, 0, 0)
+    calls = len(stub_llm.prompts)
+    assert calls > 0
+
+    second = run_batch(paths, output, workers=1, concurrency=2)
+    assert (second["ok"], second["skipped"]) == (0, 3)
+    assert len(stub_llm.prompts) == calls
+
+    # A file that changed since it was analysed is done again
+    changed = paths[1]
+    with changed.open("a", encoding="utf-8") as fh:
+        fh.write("2025-11-25T11:00:00 ERROR appended after the first run\n")
+    os.utime(changed, ns=(0, changed.stat().st_mtime_ns + 1))
+    third = run_batch(paths, output, workers=1, concurrency=2)
+    assert (third["ok"], third["skipped"]) == (1, 2)
+
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [r["status"] for r in records] == ["ok"] * 4
+    assert records[-1]["path"] == str(changed)
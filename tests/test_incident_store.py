@@ -0,0 +1,158 @@
+import multiprocessing
+import pathlib
+import random
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from src.memory import incident_store, similarity
+from src.memory.incident_store import Incident
+
+PROCESSES = 4
+THREADS = 4
+INSERTS = 25
+
+
+def _incident(tag: str, log_type: str = "Stress") -> Incident:
+    return Incident(
+        log_type=log_type,
+        primary_root_cause=f"stress root cause {tag}",
+        example_error=tag,
+        quick_fix="",
+        long_term_fix="",
+    )
+
+
+def _use_scratch_db(path: str) -> None:
+    # Runs in each child before any connection exists there
+    incident_store.MEMORY_PATH = pathlib.Path(path)
+    incident_store.LEGACY_JSON_PATH = pathlib.Path(path).with_suffix(".json")
+
+
+def _insert_many(worker: int) -> int:
+    def one_thread(t: int) -> int:
+        for i in range(INSERTS):
+            incident_store.add_incident(_incident(f"w{worker}t{t}i{i}"))
+        return INSERTS
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        return sum(pool.map(one_thread, range(THREADS)))
+
+
+def test_concurrent_writers_lose_and_duplicate_nothing(tmp_path):
+    db_path = str(tmp_path / "stress.sqlite3")
+    # spawn: children start clean and open their own connections
+    with ProcessPoolExecutor(
+        max_workers=PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_use_scratch_db,
+        initargs=(db_path,),
+    ) as pool:
+        submitted = sum(pool.map(_insert_many, range(PROCESSES)))
+
+    conn = sqlite3.connect(db_path)
+    tags = [r[0] for r in conn.execute("SELECT example_error FROM incidents")]
+    conn.close()
+
+    expected = {f"w{w}t{t}i{i}" for w in range(PROCESSES) for t in range(THREADS) for i in range(INSERTS)}
+    assert submitted == len(expected)
+    assert len(tags) == len(set(tags))
+    assert set(tags) == expected
+
+
+def test_search_chunks_long_queries(memory_store, monkeypatch):
+    for i in range(30):
+        words = " ".join(f"w{j}" for j in range(i, i + 40))
+        memory_store.add_incident(_incident(f"incident {i} {words}", log_type="Java app"))
+    memory_store.add_incident(_incident("w5 w6 w7", log_type="Python"))
+
+    query = " ".join(f"w{j}" for j in range(0, 60))
+    expected = memory_store.search_similar_incidents("Java app", query, k=10)
+
+    monkeypatch.setattr(memory_store, "_SQL_CHUNK", 3)
+    monkeypatch.setattr(memory_store, "MAX_CANDIDATES", 12)
+    chunked = memory_store.search_similar_incidents("Java app", query, k=10)
+    monkeypatch.setattr(memory_store, "_SQL_CHUNK", 500)
+    unchunked = memory_store.search_similar_incidents("Java app", query, k=10)
+
+    assert len(expected) == 10
+    assert all(inc.log_type == "Java app" for inc, _ in expected)
+    assert [(i.example_error, round(s, 6)) for i, s in chunked] == \
+        [(i.example_error, round(s, 6)) for i, s in unchunked]
+
+
+def _topic_corpus(store, seed: int = 7):
+    rng = random.Random(seed)
+    topics = [[f"t{t}w{w}" for w in range(20)] for t in range(10)]
+    for i in range(200):
+        words = rng.sample(topics[i % 10], 8) + rng.sample(topics[rng.randrange(10)], 2)
+        store.add_incident(_incident(f"{i} " + " ".join(words), log_type=("Java app", "Python")[i % 2]))
+    return rng, topics
+
+
+def _brute_force(store, log_type: str, query: str, k: int):
+    """Cosine against every stored vector of the log type; with hashed
+    TF-IDF only incidents sharing a word with the query are eligible."""
+    conn = store._connect()
+    rows = conn.execute(
+        "SELECT i.id, i.primary_root_cause, i.example_error, v.vector"
+        " FROM incidents AS i JOIN incident_vectors AS v"
+        " ON v.incident_id = i.id AND v.embedder = ? WHERE i.log_type_key = ?",
+        (similarity.embedder_name(), log_type.lower()),
+    ).fetchall()
+    words = set(similarity.tokenize(query))
+    if similarity.uses_token_candidates():
+        rows = [r for r in rows if words & set(similarity.tokenize(f"{r[1]}\n{r[2]}"))]
+    q = similarity.embed([f"{query}\n"], store._idf_for(conn, [f"{query}\n"]))[0]
+    scored = sorted(
+        ((float(np.frombuffer(blob, dtype=np.float32) @ q), i, example) for i, _, example, blob in rows),
+        key=lambda s: (-s[0], s[1]),
+    )
+    return [(example, round(score, 5)) for score, _, example in scored[:k]]
+
+
+def test_top_k_matches_brute_force_cosine(memory_store):
+    rng, topics = _topic_corpus(memory_store)
+    for _ in range(10):
+        query = " ".join(rng.sample(topics[rng.randrange(10)], 5))
+        hits = memory_store.search_similar_incidents("Java app", query, k=5)
+        assert [(inc.example_error, round(s, 5)) for inc, s in hits] == \
+            _brute_force(memory_store, "Java app", query, 5)
+
+
+def test_capped_postings_keep_recall(memory_store, monkeypatch):
+    rng, topics = _topic_corpus(memory_store)
+    # Java app incidents are mostly about the even topics
+    queries = [" ".join(rng.sample(topics[2 * rng.randrange(5)], 5)) for _ in range(20)]
+    # Each query word has about ten postings; read at most eight of three words
+    monkeypatch.setattr(memory_store, "MAX_POSTINGS", 8)
+    monkeypatch.setattr(memory_store, "MAX_QUERY_TOKENS", 3)
+
+    found = 0
+    for query in queries:
+        exact = {e for e, _ in _brute_force(memory_store, "Java app", query, 5)}
+        hits = memory_store.search_similar_incidents("Java app", query, k=5)
+        found += len(exact & {inc.example_error for inc, _ in hits})
+    assert found / (5 * len(queries)) >= 0.85
+
+
+def test_semantic_embedder_searches_its_partition(memory_store):
+    _topic_corpus(memory_store)
+    similarity.set_embedder(
+        lambda texts: np.stack([similarity.hashed_tfidf(t, lambda tok: 1.0) for t in texts]),
+        name="flat",
+    )
+    try:
+        query = "t3w1 t3w2 t3w3"
+        first = memory_store.search_similar_incidents("Python", query, k=5)
+        assert [(inc.example_error, round(s, 5)) for inc, s in first] == \
+            _brute_force(memory_store, "Python", query, 5)
+        # Only the Python partition was loaded; the new incident is appended to it
+        assert len(memory_store._index) == 100
+        memory_store.add_incident(_incident("new t3w1 t3w2 t3w3", log_type="Python"))
+        second = memory_store.search_similar_incidents("Python", query, k=5)
+        assert second[0][0].example_error.startswith("new")
+        assert len(memory_store._index) == 101
+    finally:
+        similarity.set_embedder(None)
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from src import instrumentation
+from src.instrumentation import otel_json, prometheus_text, span, write_metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_spans():
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+
+
+def _record():
+    with span("outer", model="m1") as outer:
+        with span("inner", tokens=10, cache_hit=True, ratio=0.5):
+            pass
+        with span("inner", tokens=5, cache_hit=False):
+            pass
+    with pytest.raises(KeyError):
+        with span('odd "name"\nhere'):
+            raise KeyError("boom")
+    return outer
+
+
+def test_prometheus_text_exposes_counts_errors_and_attribute_sums():
+    _record()
+    lines = prometheus_text().splitlines()
+
+    assert 'logpilot_span_seconds_count{span="inner"} 2' in lines
+    assert 'logpilot_span_seconds_count{span="outer"} 1' in lines
+    assert 'logpilot_span_errors_total{span="inner"} 0' in lines
+    assert 'logpilot_span_errors_total{span="odd \\"name\\"\\nhere"} 1' in lines
+    assert 'logpilot_span_attribute_total{span="inner",attribute="tokens"} 15' in lines
+    assert 'logpilot_span_attribute_total{span="inner",attribute="cache_hit"} 1' in lines
+    assert 'logpilot_span_attribute_total{span="inner",attribute="ratio"} 0.5' in lines
+    # String attributes are not summed
+    assert not any('attribute="model"' in line for line in lines)
+
+    # Every sample belongs to a metric declared just above it
+    declared = None
+    for line in lines:
+        if line.startswith("# TYPE "):
+            declared = line.split()[2]
+        elif not line.startswith("#"):
+            assert line.split("{")[0] in (f"{declared}_count", f"{declared}_sum", declared)
+            float(line.rsplit(" ", 1)[1])
+
+
+def test_otel_json_links_spans_and_types_attributes():
+    outer = _record()
+    doc = json.loads(json.dumps(otel_json()))
+    resource = doc["resourceSpans"][0]
+    assert resource["resource"]["attributes"] == [
+        {"key": "service.name", "value": {"stringValue": instrumentation.SERVICE_NAME}},
+    ]
+    spans = resource["scopeSpans"][0]["spans"]
+    assert [s["name"] for s in spans] == ["inner", "inner", "outer", 'odd "name"\nhere']
+
+    first, _, top, failed = spans
+    assert first["parentSpanId"] == top["spanId"] == outer.span_id
+    assert first["traceId"] == top["traceId"]
+    assert "parentSpanId" not in top and failed["traceId"] != top["traceId"]
+    assert len(top["traceId"]) == 32 and len(top["spanId"]) == 16
+    assert int(top["startTimeUnixNano"]) <= int(first["startTimeUnixNano"]) <= int(first["endTimeUnixNano"])
+    assert first["attributes"] == [
+        {"key": "tokens", "value": {"intValue": "10"}},
+        {"key": "cache_hit", "value": {"boolValue": True}},
+        {"key": "ratio", "value": {"doubleValue": 0.5}},
+    ]
+    assert top["attributes"] == [{"key": "model", "value": {"stringValue": "m1"}}]
+    assert top["status"] == {"code": 1}
+    assert failed["status"] == {"code": 2, "message": "KeyError('boom')"}
+
+
+def test_write_metrics_picks_the_format_from_the_suffix(tmp_path):
+    _record()
+    write_metrics(str(tmp_path / "metrics.json"))
+    write_metrics(str(tmp_path / "metrics.prom"))
+    assert json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8")) == otel_json()
+    assert (tmp_path / "metrics.prom").read_text(encoding="utf-8") == prometheus_text()
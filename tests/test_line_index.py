@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.tools import line_index
+from src.tools.line_index import MappedLog, build_line_index, open_mapped_log
+from src.tools.log_search_tool import search_log, split_lines
+
+TEXTS = [
+    "",
+    "one line, no newline",
+    "a\nb\n",
+    "a\r\nerror b\r\n\r\nc",
+    "\n\nlast error\n",
+    "ünïcode error\nnext\n" * 50,
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_index_and_windows_match_split_lines(tmp_path, text):
+    path = tmp_path / "app.log"
+    path.write_bytes(text.encode("utf-8"))
+    lines = split_lines(text)
+
+    log = MappedLog(path)
+    try:
+        assert len(log) == len(lines)
+        assert list(log.iter_lines()) == lines
+        assert log.lines(0, len(log)) == lines
+        assert log.tail(3) == lines[-3:]
+        assert log.window(5, 2, 3) == lines[3:8]
+        matches = log.search("error", context_lines=1)
+        assert [(m.line_number, m.line, m.context_before, m.context_after) for m in matches] == [
+            (m.line_number, m.line, m.context_before, m.context_after) for m in search_log(text, "error", 1)
+        ]
+    finally:
+        log.close()
+
+
+def test_build_line_index_blocks(monkeypatch):
+    monkeypatch.setattr(line_index, "_SCAN_BLOCK", 5)
+    data = b"ab\ncdefgh\n\nij\nk"
+    expected = [0] + [i + 1 for i, c in enumerate(data) if c == 0x0A]
+    assert build_line_index(data).tolist() == expected
+    assert build_line_index(data + b"\n").tolist() == expected
+    assert build_line_index(b"").dtype == np.int64
+
+
+def test_open_mapped_log_reuses_index_until_file_changes(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("a\nerror b\n", encoding="utf-8")
+
+    first = open_mapped_log(path)
+    assert open_mapped_log(path) is first
+    assert open_mapped_log(os.path.relpath(path, line_index.BASE_DIR)) is first
+
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write("c\n")
+    second = open_mapped_log(path)
+    assert second is not first
+    assert list(second.iter_lines()) == ["a", "error b", "c"]
+
+    # Same size, new mtime: still a different file
+    stat = path.stat()
+    path.write_text("x\nerror y\nz\n", encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    third = open_mapped_log(path)
+    assert third is not second
+    assert list(third.iter_lines()) == ["x", "error y", "z"]
@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from src import llm_client
+from src.llm_client import generate_batch, generate_text, track_usage
+
+
+class _ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+def test_batch_keeps_order_and_bounds_concurrency(stub_llm):
+    stub_llm.answer = lambda prompt: prompt.upper()
+    stub_llm.delay = 0.01
+    prompts = [f"prompt {i}" for i in range(40)]
+
+    assert generate_batch(prompts, max_concurrency=5) == [p.upper() for p in prompts]
+    assert stub_llm.max_in_flight == 5
+
+
+def test_generate_text_uses_backend_and_cache(stub_llm):
+    with track_usage() as usage:
+        assert generate_text("hello") == "stub answer"
+        assert generate_text("hello") == "stub answer"
+        assert generate_text("hello", use_cache=False) == "stub answer"
+
+    assert stub_llm.prompts == ["hello", "hello"]
+    assert (usage.calls, usage.cached_calls) == (3, 1)
+
+
+def test_cache_io_stays_off_the_event_loop(stub_llm, monkeypatch):
+    cache = llm_client.get_cache()
+    threads = []
+    for name in ("get", "put"):
+        method = getattr(cache, name)
+
+        def record(*args, _method=method):
+            threads.append(threading.current_thread())
+            return _method(*args)
+
+        monkeypatch.setattr(cache, name, record)
+
+    generate_text("hello")
+    generate_text("hello")
+    assert len(threads) == 3
+    assert llm_client._loop_thread not in threads
+
+
+def test_usage_is_counted_for_the_calling_thread(stub_llm):
+    seen = {}
+
+    def worker(name):
+        with track_usage() as usage:
+            generate_batch([f"{name} {i}" for i in range(3)])
+        seen[name] = usage.calls
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert seen == {"a": 3, "b": 3}
+
+
+def test_concurrent_callers_share_the_event_loop(stub_llm):
+    stub_llm.delay = 0.05
+    threads = [threading.Thread(target=generate_text, args=(f"p{i}",)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(stub_llm.prompts) == 6
+    assert stub_llm.max_in_flight > 1
+
+
+def test_rate_limits_are_retried(stub_llm, monkeypatch):
+    monkeypatch.setattr(llm_client, "_backoff", lambda attempt: 0)
+    stub_llm.failures = [_ApiError(429), _ApiError(503)]
+    assert generate_text("retry me") == "stub answer"
+    assert len(stub_llm.prompts) == 3
+
+
+def test_other_errors_are_raised_or_returned(stub_llm):
+    stub_llm.failures = [_ApiError(400)]
+    with pytest.raises(_ApiError):
+        generate_text("bad request")
+
+    stub_llm.failures = [_ApiError(400)]
+    results = generate_batch(["x", "y"], max_concurrency=1, return_exceptions=True)
+    assert isinstance(results[0], _ApiError)
+    assert results[1] == "stub answer"
@@ -0,0 +1,64 @@
+import gzip
+import os
+import pathlib
+import random
+
+from src.tools.file_read_tool import BASE_DIR
+from src.tools.log_merger import (
+    TimedLine, iter_timed_lines, merge_log_files, merge_timed, source_labels,
+)
+from src.tools.timestamps import NO_TIMESTAMP, iso_to_ns
+
+
+def test_every_clashing_name_gets_its_directory():
+    paths = [pathlib.Path(p) for p in ("/var/a/app.log", "/var/b/app.log.1.gz", "/var/c/db.log", "/var/d/app.log")]
+    assert source_labels(paths) == ["a/app", "b/app", "db", "d/app"]
+
+
+def test_merge_is_time_ordered_and_stable():
+    rng = random.Random(3)
+    streams = []
+    for source in ("a", "b", "c"):
+        times = sorted(rng.randrange(50) for _ in range(40))
+        streams.append([TimedLine(t, source, f"{source}{i}") for i, t in enumerate(times)])
+
+    merged = list(merge_timed(streams))
+    assert len(merged) == 120
+    assert [r.timestamp for r in merged] == sorted(r.timestamp for r in merged)
+    # Ties keep stream order, and each stream keeps its own order
+    for prev, cur in zip(merged, merged[1:]):
+        if prev.timestamp == cur.timestamp:
+            assert prev.source <= cur.source
+    for stream in streams:
+        assert [r for r in merged if r.source == stream[0].source] == stream
+
+
+def test_undated_lines_stay_with_the_line_before_them():
+    lines = ["preamble", "2025-11-25T10:00:00 ERROR boom", "\tat a.b(C.java:1)", "2025-11-25T10:00:05 INFO ok"]
+    assert [r.timestamp for r in iter_timed_lines(lines, "app")] == [
+        NO_TIMESTAMP, iso_to_ns("2025-11-25T10:00:00"), iso_to_ns("2025-11-25T10:00:00"), iso_to_ns("2025-11-25T10:00:05"),
+    ]
+
+
+def test_merge_log_files_labels_sources_and_applies_the_window(tmp_path):
+    (tmp_path / "web").mkdir()
+    (tmp_path / "worker").mkdir()
+    web = tmp_path / "web" / "app.log"
+    worker = tmp_path / "worker" / "app.log.1.gz"
+    db = tmp_path / "db.log"
+    web.write_text("".join(f"2025-11-25T10:00:{s:02d} INFO web {s}\n" for s in range(0, 60, 3)), encoding="utf-8")
+    with gzip.open(worker, "wt", encoding="utf-8") as fh:
+        fh.write("".join(f"2025-11-25T10:00:{s:02d} WARN worker {s}\n" for s in range(1, 60, 5)))
+    db.write_text("".join(f"2025-11-25T10:00:{s:02d} ERROR db {s}\n" for s in range(2, 60, 7)), encoding="utf-8")
+
+    rel = [os.path.relpath(p, BASE_DIR) for p in (web, worker, db)]
+    merged = list(merge_log_files(rel))
+    assert {r.source for r in merged} == {"web/app", "worker/app", "db"}
+    assert len(merged) == 20 + 12 + 9
+    seconds = [int(r.line.split()[-1]) for r in merged]
+    assert seconds == sorted(seconds)
+
+    window = list(merge_log_files(
+        rel, since_ns=iso_to_ns("2025-11-25T10:00:10"), until_ns=iso_to_ns("2025-11-25T10:00:20"),
+    ))
+    assert [r.line.split()[-1] for r in window] == ["11", "12", "15", "16", "16", "18"]
@@ -0,0 +1,112 @@
+import json
+import random
+
+import pytest
+
+from src.agents.segmenter_cluster import run as segment_text
+from src.tools import log_search_tool
+from src.tools.line_index import MappedLog
+from src.tools.log_search_tool import hit_line, match_keyword, scan_keywords, search_log, split_lines
+from src.tools.timestamps import iso_to_ns
+
+# Separators str.splitlines() honours but the scanners must not
+ODD_SEPARATORS = ("\r", "\u2028", "\x0c", "\x1c")
+WORDS = ("ok", "Error", "EXCEPTION", "failed", "İstanbul", "straße", "x", "")
+
+
+def _random_log(rng: random.Random, lines: int) -> str:
+    parts = []
+    for _ in range(lines):
+        parts.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 4))))
+        parts.append(rng.choice(("\n", "\n", "\r\n", *ODD_SEPARATORS)))
+    if parts and rng.random() < 0.5:
+        parts.pop()   # no trailing newline
+    return "".join(parts)
+
+
+def _expected_hits(text: str):
+    return [(i, line) for i, line in enumerate(split_lines(text), start=1) if match_keyword(line)]
+
+
+@pytest.mark.parametrize("block", [7, 64, 8 << 20])
+def test_scanner_matches_line_by_line(monkeypatch, block):
+    monkeypatch.setattr(log_search_tool, "_SCAN_BLOCK", block)
+    rng = random.Random(block)
+    for _ in range(200):
+        text = _random_log(rng, rng.randint(0, 40))
+        expected = _expected_hits(text)
+        hits = scan_keywords(text)
+        assert [(h.line_number, hit_line(text, h)) for h in hits] == expected
+
+        data = text.encode("utf-8")
+        assert [h.line_number for h in scan_keywords(data)] == [n for n, _ in expected]
+
+
+def test_split_lines():
+    assert split_lines("") == []
+    assert split_lines("a\r\nb\n") == ["a", "b"]
+    assert split_lines("a\rb c\n\nd") == ["a\rb c", "", "d"]
+
+
+def test_search_log_keeps_odd_separators_inside_lines():
+    text = "start\nfirst error second error\rthird\nend error\n"
+    matches = search_log(text, "error", context_lines=1)
+    assert [(m.line_number, m.line) for m in matches] == [
+        (2, "first error second error\rthird"),
+        (3, "end error"),
+    ]
+    assert matches[0].context_before == ["start"]
+    assert matches[1].context_after == []
+
+
+def test_segment_windows_line_up_with_scanner():
+    lines = [f"2025-01-01 10:00:{i % 60:02d} INFO step {i} detail\rmore" for i in range(200)]
+    lines[120] = "2025-01-01 10:02:00 ERROR boom caused by disk"
+    text = "\r\n".join(lines) + "\r\n"
+
+    result = segment_text(text)
+    assert result.lines_total == len(lines)
+    assert result.error_samples == [lines[120]]
+    for seg in result.segments:
+        start = seg.start_line - 1
+        assert seg.sample_lines == lines[start:start + len(seg.sample_lines)]
+    assert any(lines[120] in seg.sample_lines for seg in result.segments if seg.id.startswith("error_burst"))
+
+
+def test_structured_search_filters_on_parsed_columns(tmp_path):
+    lines = []
+    for i in range(60):
+        service = ("payments", "orders")[i % 2]
+        level = "error" if i % 10 == 4 else "info"
+        msg = f"call {i} timeout" if i % 5 == 4 else f"call {i} ok"
+        lines.append(json.dumps({
+            "time": f"2025-11-25T10:00:{i:02d}Z", "level": level, "msg": msg, "service": service, "error": None,
+        }))
+    text = "\n".join(lines) + "\n"
+
+    # The query matches messages, not the "error" key every record has
+    assert [m.line_number for m in search_log(text, "error")] == []
+    timeouts = search_log(text, "timeout", context_lines=1)
+    assert [m.line_number for m in timeouts] == [i + 1 for i in range(60) if i % 5 == 4]
+    assert timeouts[0].context_before == [lines[3]] and timeouts[0].context_after == [lines[5]]
+
+    matches = search_log(
+        text, "timeout", min_level="ERROR", since_ns=iso_to_ns("2025-11-25T10:00:10Z"), service="payments",
+    )
+    assert [m.line for m in matches] == [lines[i] for i in (14, 24, 34, 44, 54)]
+
+    path = tmp_path / "app.json.log"
+    path.write_text(text, encoding="utf-8")
+    log = MappedLog(path)
+    try:
+        assert log.search("timeout", min_level="ERROR", service="payments") == \
+            search_log(text, "timeout", min_level="ERROR", service="payments")
+    finally:
+        log.close()
+
+
+def test_filters_apply_to_plain_logs():
+    lines = [f"2025-01-01T10:00:{i:02d}Z {'WARN' if i % 3 else 'ERROR'} step {i} slow" for i in range(30)]
+    text = "\n".join(lines)
+    assert [m.line_number for m in search_log(text, "slow", min_level="ERROR")] == list(range(1, 31, 3))
+    assert len(search_log(text, "slow", until_ns=iso_to_ns("2025-01-01T10:00:05Z"))) == 5
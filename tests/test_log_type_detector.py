@@ -0,0 +1,24 @@
+import pathlib
+
+import pytest
+
+from src.agents import log_type_detector
+from src.llm_client import track_usage
+
+EXAMPLES = pathlib.Path(__file__).resolve().parent.parent / "examples"
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("airflow_failure.log", "Airflow"),
+    ("java_error.log", "Java app"),
+    ("k8s_crashloop.log", "Kubernetes"),
+])
+def test_examples_are_classified_locally(stub_llm, name, expected):
+    text = (EXAMPLES / name).read_text(encoding="utf-8")
+    with track_usage() as usage:
+        result = log_type_detector.run(text)
+
+    assert result.log_type == expected
+    assert result.confidence >= log_type_detector.LOCAL_CONFIDENCE_THRESHOLD
+    assert usage.calls == 0
+    assert stub_llm.prompts == []
@@ -0,0 +1,48 @@
+import pytest
+
+from src.agents.segmenter_cluster import run, run_mapped
+from src.tools import severity_counter
+from src.tools.line_index import MappedLog
+from src.tools.log_search_tool import scan_keywords
+from src.tools.parallel_scan import plan_chunks, scan_file
+
+
+@pytest.fixture
+def big_log(tmp_path, log_lines, monkeypatch):
+    # Small blocks, so a small file still splits into many chunks
+    monkeypatch.setattr(severity_counter, "_BUFFER_BLOCK", 4096)
+    lines = log_lines(3, lines=3000, bursts=((200, 40, 1), (1400, 10, 5), (2900, 30, 2)))
+    path = tmp_path / "big.log"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def test_chunks_are_line_aligned_and_cover_the_file(big_log):
+    data = big_log.read_bytes()
+    plan = plan_chunks(data, 16)
+    assert len(plan) == 16
+    assert plan[0][0] == 0 and plan[-1][1] == len(data)
+    for (_, stop), (start, _) in zip(plan, plan[1:]):
+        assert stop == start and data[stop - 1:stop] == b"\n"
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_parallel_scan_matches_one_pass(big_log, workers):
+    data = big_log.read_bytes()
+    one = scan_file(big_log, workers=1)
+    many = scan_file(big_log, workers=workers)
+
+    assert many.lines_total == one.lines_total == 3000
+    assert many.hits == one.hits == scan_keywords(data)
+    assert many.severities.counts() == one.severities.counts()
+    assert many.severities.per_minute() == one.severities.per_minute()
+    assert many.templates.ranked(20) == one.templates.ranked(20)
+
+
+def test_parallel_segmenting_matches_run(big_log):
+    log = MappedLog(big_log)
+    try:
+        parallel = run_mapped(log, workers=3)
+    finally:
+        log.close()
+    assert parallel == run(big_log.read_text(encoding="utf-8"))
@@ -0,0 +1,112 @@
+import gzip
+import pathlib
+
+import pytest
+
+from src.agents.log_type_detector import LogTypeResult
+from src.agents.segmenter_cluster import run
+from src.pipeline import _signature, analyze_text, segment_log_file
+from src.tools.timestamps import iso_to_ns
+
+EXAMPLES = pathlib.Path(__file__).resolve().parent.parent / "examples"
+
+
+@pytest.fixture
+def copies(tmp_path, log_lines):
+    """The same log as a plain file, gzipped, and as a rotated pair."""
+    lines = log_lines(5, lines=900, bursts=((300, 15, 1), (700, 25, 1)))
+    text = "\n".join(lines) + "\n"
+    plain = tmp_path / "app.log"
+    plain.write_text(text, encoding="utf-8")
+    with gzip.open(tmp_path / "app.log.gz", "wt", encoding="utf-8") as fh:
+        fh.write(text)
+    rotated = tmp_path / "rotated"
+    rotated.mkdir()
+    (rotated / "app.log.1").write_text("\n".join(lines[:500]) + "\n", encoding="utf-8")
+    (rotated / "app.log").write_text("\n".join(lines[500:]) + "\n", encoding="utf-8")
+    return {
+        "plain": (str(plain), False),
+        "gzip": (str(tmp_path / "app.log.gz"), False),
+        "rotated": (str(rotated / "app.log"), True),
+    }
+
+
+@pytest.mark.parametrize("window", [
+    {"since_ns": iso_to_ns("2025-11-25T10:08:00")},
+    {"until_ns": iso_to_ns("2025-11-25T10:06:00")},
+    {"since_ns": iso_to_ns("2025-11-25T10:10:00"), "until_ns": iso_to_ns("2025-11-25T10:13:00")},
+    {"minutes_before_error": 2.0},
+])
+def test_windows_apply_to_compressed_and_rotated_input(copies, window):
+    results = {
+        name: segment_log_file(path, rotated=rotated, **window)
+        for name, (path, rotated) in copies.items()
+    }
+    full = segment_log_file(copies["plain"][0])
+    assert 0 < results["plain"].lines_total < full.lines_total
+    assert results["gzip"] == results["plain"]
+    assert results["rotated"] == results["plain"]
+
+
+def test_window_before_first_error_ends_at_it(copies):
+    for path, rotated in copies.values():
+        seg_result = segment_log_file(path, rotated=rotated, minutes_before_error=1.0)
+        assert seg_result.lines_total == 61
+        assert seg_result.error_lines_total == 1
+
+
+def _trace(name: str):
+    return [
+        f"java.lang.IllegalStateException: {name}",
+        f"\tat com.example.{name}.Handler.handle(Handler.java:41)",
+        "\tat com.example.api.Server.run(Server.java:12)",
+    ]
+
+
+def test_signature_covers_every_trace_fingerprint():
+    def log(rare: str) -> str:
+        lines = []
+        for i in range(12):
+            name = rare if i == 11 else f"svc{i}"
+            for _ in range(1 if i == 11 else 3):
+                lines.append(f"2025-11-25 10:00:{i:02d},000 ERROR [main] c.e.Worker - job crashed")
+                lines.extend(_trace(name))
+        return "\n".join(lines)
+
+    a, b = run(log("payments")), run(log("billing"))
+    assert len(a.stack_traces) == len(b.stack_traces) == 10   # only the top ones are shown
+    assert len(a.trace_fingerprints) == 12
+    lt_result = LogTypeResult(log_type="Java app")
+    assert _signature(lt_result, a) != _signature(lt_result, b)
+    assert _signature(lt_result, a) == _signature(lt_result, run(log("payments")))
+
+
+def test_recurring_incident_reuses_the_stored_analysis(stub_llm, memory_store):
+    stub_llm.answer = "Primary root cause: connection pool exhausted\n- timeouts\nConfidence: 0.9"
+    text = (EXAMPLES / "java_error.log").read_text(encoding="utf-8")
+    first = analyze_text(text)
+    assert not first.reused and first.metrics["llm_calls"] > 0
+
+    second = analyze_text(text)
+    assert second.reused
+    assert second.signature == first.signature
+    assert second.metrics["llm_calls"] == 0
+    assert second.root_cause == first.root_cause
+
+
+def test_refresh_bypasses_the_response_cache(stub_llm, memory_store):
+    stub_llm.answer = "Primary root cause: connection pool exhausted\n- timeouts\nConfidence: 0.9"
+    text = (EXAMPLES / "java_error.log").read_text(encoding="utf-8")
+    first = analyze_text(text)
+    calls = len(stub_llm.prompts)
+    assert calls == first.metrics["llm_calls"] > 0
+
+    stub_llm.answer = "Primary root cause: disk full\n- write errors\nConfidence: 0.8"
+    refreshed = analyze_text(text, refresh=True)
+    assert not refreshed.reused
+    assert len(stub_llm.prompts) == 2 * calls
+    assert refreshed.metrics["llm_cached_calls"] == 0
+    assert refreshed.root_cause.primary_root_cause == "disk full"
+
+    # The refreshed analysis replaces the stored one
+    assert analyze_text(text).root_cause.primary_root_cause == "disk full"
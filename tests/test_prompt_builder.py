@@ -0,0 +1,57 @@
+from src.tools.prompt_builder import (
+    MAX_LINE_CHARS, compress_lines, compress_sections, estimate_tokens, template,
+)
+from tests.conftest import JAVA_TRACE
+
+
+def test_lines_within_budget_are_kept_whole_and_in_order(log_lines):
+    lines = log_lines(1, lines=40, bursts=((10, 2, 1),))[:12]
+    out = compress_lines(lines, budget_tokens=100_000)
+    assert out.entries_omitted == 0
+    assert out.text.splitlines() == [template(line) for line in lines]
+
+
+def test_trimming_keeps_errors_first_and_stays_in_budget():
+    lines = []
+    for i in range(300):
+        level = "ERROR" if i % 100 == 50 else "WARN" if i % 20 == 7 else "INFO"
+        lines.append(f"2025-11-25 10:{i // 60:02d}:{i % 60:02d},000 {level} request {i} handled")
+    for budget in (40, 150, 400):
+        out = compress_lines(lines, budget)
+        assert out.tokens <= budget
+        assert out.entries_omitted == 300 - out.entries_kept > 0
+        kept = out.text.splitlines()
+        assert kept[-1] == f"[... {out.entries_omitted} lower-signal entries omitted]"
+        kept = kept[:-1]
+        # Errors outrank warnings, which outrank the rest
+        levels = [line.split()[1] for line in kept]
+        assert levels.count("ERROR") == min(3, len(kept))
+        if len(kept) > 3:
+            assert levels.count("WARN") == min(15, len(kept) - 3)
+        # Kept entries stay in log order
+        order = [int(line.split()[3]) for line in kept]
+        assert order == sorted(order)
+
+
+def test_repeats_collapse_and_traces_and_long_lines_shrink():
+    lines = [f"2025-11-25 10:00:{i:02d},000 INFO heartbeat ok" for i in range(20)]
+    lines += ["2025-11-25 10:01:00,000 ERROR worker crashed", *JAVA_TRACE[1:3], *[f"\tat f{i}(F.java:{i})" for i in range(10)]]
+    lines.append("2025-11-25 10:02:00,000 INFO payload " + "x" * 2000)
+    out = compress_lines(lines, budget_tokens=100_000).text.splitlines()
+
+    assert out[0] == "<TS> INFO heartbeat ok  (×20)"
+    assert out[1] == "<TS> ERROR worker crashed"
+    assert "    ... 8 frames collapsed" in out
+    assert out[-1].endswith(f"…[+{len(template(lines[-1])) - MAX_LINE_CHARS} chars]")
+
+
+def test_sections_share_one_budget():
+    small = ("== Head ==", ["2025-11-25 10:00:00,000 INFO started"])
+    big = ("== Errors ==", [f"2025-11-25 10:00:{i % 60:02d},000 ERROR request {i} failed: code E{i}" for i in range(300)])
+    text = compress_sections([small, big], budget_tokens=300)
+
+    assert estimate_tokens(text) <= 300
+    assert text.startswith("== Head ==\n<TS> INFO started\n== Errors ==\n")
+    # The small section's unused share went to the big one
+    alone = compress_lines(big[1], 150 - estimate_tokens(big[0]) - 1)
+    assert text.count("ERROR") > alone.text.count("ERROR")
@@ -0,0 +1,31 @@
+import pathlib
+
+import pytest
+
+from src.pipeline import analyze_text
+from src.report import AnalysisReport
+
+EXAMPLES = pathlib.Path(__file__).resolve().parent.parent / "examples"
+
+
+@pytest.fixture
+def report(stub_llm, memory_store):
+    stub_llm.answer = "Primary root cause: connection pool exhausted\n- timeouts\nConfidence: 0.9"
+    text = (EXAMPLES / "java_error.log").read_text(encoding="utf-8")
+    analyze_text(text)
+    # The second analysis finds the first in memory, so every field is set
+    report = analyze_text(text, refresh=True)
+    assert report.similar is not None
+    assert report.segments.stack_traces and report.timings and report.token_usage
+    return report
+
+
+def test_report_round_trips_through_dict_and_json(report):
+    assert AnalysisReport.from_dict(report.to_dict()) == report
+    assert AnalysisReport.from_json(report.to_json()) == report
+    assert AnalysisReport.from_json(report.to_json(indent=2)) == report
+
+
+def test_report_round_trips_through_msgpack(report):
+    pytest.importorskip("msgpack")
+    assert AnalysisReport.from_msgpack(report.to_msgpack()) == report
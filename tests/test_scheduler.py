@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from src.scheduler import Stage, StageTiming, _critical_path, run_dag
+
+
+def test_cycles_unknown_deps_and_duplicates_are_rejected():
+    with pytest.raises(ValueError, match=r"cycle among: \['a', 'b'\]"):
+        run_dag([Stage("a", lambda b: b, ("b",)), Stage("b", lambda a: a, ("a",)), Stage("c", lambda: 1)])
+    with pytest.raises(ValueError, match="unknown stages: \\['x'\\]"):
+        run_dag([Stage("a", lambda x: x, ("x",))])
+    with pytest.raises(ValueError, match="Duplicate"):
+        run_dag([Stage("a", lambda: 1), Stage("a", lambda: 2)])
+
+
+def test_independent_stages_overlap_and_dependents_wait():
+    barrier = threading.Barrier(2, timeout=5)
+    log = []
+
+    def branch(name):
+        def fn(root):
+            log.append(f"{name} start")
+            barrier.wait()   # only returns once both branches are running
+            time.sleep(0.01)
+            log.append(f"{name} end")
+            return f"{root}+{name}"
+        return fn
+
+    def join(left, right):
+        log.append("join")
+        return (left, right)
+
+    result = run_dag([
+        Stage("join", join, ("left", "right")),
+        Stage("left", branch("left"), ("root",)),
+        Stage("right", branch("right"), ("root",)),
+        Stage("root", lambda: "r"),
+    ])
+
+    # Arguments arrive in deps order, whatever order the stages finished in
+    assert result.results["join"] == ("r+left", "r+right")
+    assert log[-1] == "join"
+    assert {"left end", "right end"} <= set(log[:-1])
+    t = result.timings
+    assert t["root"].end <= min(t["left"].start, t["right"].start)
+    assert max(t["left"].end, t["right"].end) <= t["join"].start
+
+
+def test_failing_stage_stops_the_dag_after_running_stages_finish():
+    finished = threading.Event()
+    started = []
+
+    def slow(_):
+        time.sleep(0.05)
+        finished.set()
+
+    def fail(_):
+        raise RuntimeError("stage failed")
+
+    with pytest.raises(RuntimeError, match="stage failed"):
+        run_dag([
+            Stage("root", lambda: None),
+            Stage("slow", slow, ("root",)),
+            Stage("fail", fail, ("root",)),
+            Stage("after", lambda _: started.append("after"), ("fail",)),
+            Stage("later", lambda _: started.append("later"), ("slow",)),
+        ])
+    # The running stage was waited for; nothing downstream started
+    assert finished.is_set()
+    assert started == []
+
+
+def test_critical_path_follows_the_dependency_that_finished_last():
+    stages = [
+        Stage("load", lambda: None),
+        Stage("fast", lambda _: None, ("load",)),
+        Stage("slow", lambda _: None, ("load",)),
+        Stage("report", lambda a, b: None, ("fast", "slow")),
+        Stage("side", lambda _: None, ("load",)),
+    ]
+    timings = {
+        "load": StageTiming("load", 0.0, 1.0),
+        "fast": StageTiming("fast", 1.0, 1.5),
+        "slow": StageTiming("slow", 1.0, 4.0),
+        "side": StageTiming("side", 1.0, 3.0),
+        "report": StageTiming("report", 4.0, 5.0),
+    }
+    assert _critical_path(stages, timings) == ["load", "slow", "report"]
+    assert _critical_path(stages, {}) == []
+
+
+def test_run_dag_reports_timings_and_critical_path():
+    result = run_dag([
+        Stage("load", lambda: time.sleep(0.01)),
+        Stage("fast", lambda _: None, ("load",)),
+        Stage("slow", lambda _: time.sleep(0.1), ("load",)),
+        Stage("report", lambda a, b: None, ("fast", "slow")),
+    ])
+    assert result.critical_path == ["load", "slow", "report"]
+    assert result.timings["slow"].duration >= 0.1
+    assert result.wall_time >= result.timings["report"].end
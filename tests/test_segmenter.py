@@ -0,0 +1,124 @@
+import json
+import pathlib
+from typing import List
+
+import pytest
+
+from src.agents.segmenter_cluster import SegmentAccumulator, run, run_mapped, run_stream
+from src.tools.line_index import MappedLog
+from src.tools.log_search_tool import split_lines
+from tests.conftest import JAVA_TRACE
+
+EXAMPLES = sorted((pathlib.Path(__file__).resolve().parent.parent / "examples").glob("*.log"))
+
+
+def _mapped(path: pathlib.Path):
+    log = MappedLog(path)
+    try:
+        return run_mapped(log)
+    finally:
+        log.close()
+
+
+@pytest.mark.parametrize("path", EXAMPLES, ids=lambda p: p.name)
+def test_stream_and_mapped_match_run_on_examples(path):
+    text = path.read_text(encoding="utf-8")
+    expected = run(text)
+    assert run_stream(split_lines(text)) == expected
+    assert _mapped(path) == expected
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_stream_and_mapped_match_run(tmp_path, log_lines, seed):
+    lines = log_lines(seed, lines=700, bursts=((100, 30, 1), (300, 5, 4), (500, 12, 2), (640, 3, 1)))
+    text = "\n".join(lines) + "\n"
+    path = tmp_path / "app.log"
+    path.write_text(text, encoding="utf-8")
+
+    expected = run(text)
+    assert expected.error_lines_total > 0 and expected.stack_traces_total == 4
+    assert run_stream(iter(lines)) == expected
+    assert _mapped(path) == expected
+
+
+def test_accumulator_result_can_be_taken_while_feeding(log_lines):
+    lines = log_lines(1)
+    acc = SegmentAccumulator()
+    for i, line in enumerate(lines, start=1):
+        acc.feed(line)
+        if i % 97 == 0:
+            # A snapshot must not disturb what is collected afterwards
+            assert acc.result().lines_total == i
+    assert acc.result() == run("\n".join(lines))
+
+
+def test_bursts_split_on_time_gaps_in_every_timestamp_format(tmp_path):
+    # Errors a few lines apart but ten minutes apart are separate bursts,
+    # so only the first three (equally dense) are shown; klog and epoch
+    # timestamps count as well as ISO-8601
+    headers = {
+        "klog": lambda m: f"I1125 10:{m:02d}:00.000000       7 app.go:12]",
+        "epoch": lambda m: f"{1764064800 + m * 60}.250 app",
+        "iso": lambda m: f"2025-11-25T10:{m:02d}:00Z app",
+    }
+    for name, header in headers.items():
+        lines = [f"{header(0)} started"]
+        for m in (1, 11, 21, 31, 41):
+            lines += [f"{header(m)} request failed"] * 2 + [f"{header(m)} retrying"]
+        text = "\n".join(lines) + "\n"
+        path = tmp_path / f"{name}.log"
+        path.write_text(text, encoding="utf-8")
+
+        expected = run(text)
+        bursts = [s for s in expected.segments if s.id.startswith("error_burst")]
+        assert [s.summary for s in bursts] == ["Error burst: 6 error lines in lines 2-9"], name
+        assert run_stream(lines) == expected
+        assert _mapped(path) == expected
+
+
+def _json_log(n: int = 400) -> List[str]:
+    # bunyan-style: numeric levels, and an "error" key on every record, so
+    # keyword matching on the raw line would call every line an error
+    lines = []
+    for i in range(n):
+        record = {"time": f"2025-11-25T10:{i // 60:02d}:{i % 60:02d}Z", "level": 30, "msg": f"handled request {i}", "error": None}
+        if 150 <= i < 170 or i in (300, 303):
+            record.update(level=50, msg=f"request {i} timed out")
+        if i == 171:
+            record.update(level=60, msg="worker crashed", stack="\n".join(JAVA_TRACE))
+        lines.append(json.dumps(record))
+    return lines
+
+
+def test_structured_logs_are_segmented_from_records(tmp_path):
+    lines = _json_log()
+    text = "\n".join(lines) + "\n"
+    path = tmp_path / "app.json.log"
+    path.write_text(text, encoding="utf-8")
+
+    expected = run(text)
+    assert expected.error_lines_total == 23
+    assert expected.severity_counts == {"INFO": 377, "ERROR": 22, "FATAL": 1}
+    assert expected.stack_traces_total == 1
+    assert run_stream(iter(lines)) == expected
+    assert _mapped(path) == expected
+    log = MappedLog(path)
+    try:
+        assert run_mapped(log, workers=2) == expected
+    finally:
+        log.close()
+
+
+def test_structured_stream_matches_run_for_logfmt_and_syslog():
+    logfmt = [
+        f'ts=2025-11-25T10:00:{i % 60:02d}Z level={"error" if i % 50 == 7 else "info"} msg="step {i}"'
+        for i in range(300)
+    ]
+    syslog = [
+        f"Nov 25 10:{i // 60:02d}:{i % 60:02d} host app[7]: {'disk write failed' if i % 40 == 3 else 'tick'} {i}"
+        for i in range(300)
+    ]
+    for lines in (logfmt, syslog):
+        expected = run("\n".join(lines))
+        assert expected.error_lines_total > 0
+        assert run_stream(lines) == expected
@@ -0,0 +1,31 @@
+import pytest
+
+from src.tools import prompt_builder
+from src.tools.log_parser import PlainParser
+from src.tools.severity_counter import SeverityCounter, is_error_line, token_level
+from src.tools.template_miner import TemplateMiner
+
+LINES = [
+    ("2025-01-01 10:00:00 PANIC worker lost", "FATAL", True),
+    ("2025-01-01 10:00:01 CRIT disk full", "FATAL", True),
+    ("2025-01-01 10:00:02 SEVERE pool exhausted", "ERROR", True),
+    ("2025-01-01 10:00:03 WARNING retry 2 of 5", "WARN", False),
+    ("2025-01-01 10:00:04 NOTICE config reloaded", "INFO", False),
+    ("2025-01-01 10:00:05 INFO DefaultCredentialsError is only a class name", "INFO", True),
+    ("panic: runtime error: index out of range", None, True),
+    ("plain line with nothing in it", None, False),
+]
+
+
+@pytest.mark.parametrize("line, level, is_error", LINES)
+def test_stages_agree_on_level_and_error(line, level, is_error):
+    assert token_level(line) == level
+    assert PlainParser().parse(line)[1] == level
+
+    counter = SeverityCounter()
+    counter.feed_text(line + "\n")
+    assert counter.counts() == ({level: 1} if level else {})
+
+    assert is_error_line(line) == is_error
+    assert TemplateMiner().add_all([line]).templates[0].is_error() == is_error
+    assert (prompt_builder._signal(line) == 3) == is_error
@@ -0,0 +1,134 @@
+from src.tools.stack_traces import StackTraceParser, TraceCatalog, scan_traces
+from tests.conftest import JAVA_TRACE, PYTHON_TRACE, make_log
+
+GO_PANIC = [
+    "panic: runtime error: invalid memory address or nil pointer dereference",
+    "[signal SIGSEGV: segmentation violation code=0x1 addr=0x0 pc=0x4a1b2c]",
+    "",
+    "goroutine 17 [running]:",
+    "main.(*Server).handle(0xc000012345, {0x1, 0x2})",
+    "\t/home/ci/src/app/server.go:88 +0x1f",
+    "main.main()",
+    "\t/home/ci/src/app/main.go:12 +0x25",
+]
+
+
+def parse(lines):
+    parser = StackTraceParser()
+    traces = [t for n, line in enumerate(lines, start=1) if (t := parser.feed(line, n))]
+    last = parser.flush()
+    return traces + ([last] if last else [])
+
+
+def only(lines):
+    traces = parse(lines)
+    assert len(traces) == 1
+    return traces[0]
+
+
+def test_java_fingerprint_ignores_line_numbers_messages_and_jvm_noise():
+    base = only(JAVA_TRACE)
+    assert base.exception == "java.lang.IllegalStateException"
+    assert base.causes == ["java.net.SocketTimeoutException"]
+
+    variant = [
+        "2025-11-25 10:00:01,123 ERROR [pool-3] c.e.Api - java.lang.IllegalStateException: pool exhausted (42/42)",
+        "\tat com.example.db.Pool.acquire(Pool.java:91) ~[app.jar:1.2]",
+        "\tat com.example.api.Handler.handle(Handler.java:57)",
+        "Caused by: java.net.SocketTimeoutException: connect timed out after 3000ms",
+        "\tat java.net.Socket.connect(Socket.java:640)",
+        "\t... 9 more",
+    ]
+    assert only(variant).fingerprint == base.fingerprint
+
+    lambdas = [
+        "java.lang.IllegalStateException: boom",
+        "\tat com.example.Job$$Lambda$112/0x0000000800c4b040.run(Unknown Source)",
+        "\tat jdk.internal.reflect.GeneratedMethodAccessor42.invoke(Unknown Source)",
+    ]
+    renumbered = [
+        lambdas[0],
+        "\tat com.example.Job$$Lambda$97/0x00000008001a2c40.run(Unknown Source)",
+        "\tat jdk.internal.reflect.GeneratedMethodAccessor7.invoke(Unknown Source)",
+    ]
+    assert only(lambdas).fingerprint == only(renumbered).fingerprint
+
+
+def test_java_fingerprint_tells_failures_apart():
+    base = only(JAVA_TRACE).fingerprint
+    other_type = ["java.lang.IllegalArgumentException: pool exhausted", *JAVA_TRACE[1:]]
+    other_cause = [*JAVA_TRACE[:3], "Caused by: java.io.IOException: reset", *JAVA_TRACE[4:]]
+    other_frame = [JAVA_TRACE[0], "\tat com.example.db.Pool.release(Pool.java:88)", *JAVA_TRACE[2:]]
+    fingerprints = {base, only(other_type).fingerprint, only(other_cause).fingerprint, only(other_frame).fingerprint}
+    assert len(fingerprints) == 4
+
+
+def test_python_fingerprint_ignores_install_paths_and_line_numbers():
+    base = only(PYTHON_TRACE)
+    assert base.exception == "KeyError" and base.frames == ["worker.py:run", "jobs.py:job"]
+
+    moved = [
+        "Traceback (most recent call last):",
+        '  File "/opt/venv/lib/app/worker.py", line 19, in run',
+        "    job()",
+        '  File "C:\\app\\jobs.py", line 44, in job',
+        "    raise KeyError(name)",
+        "    ^^^^^^^^^^^^^^^^^^^^",
+        "KeyError: 'other-tenant'",
+    ]
+    assert only(moved).fingerprint == base.fingerprint
+    assert only([*PYTHON_TRACE[:-1], "ValueError: 'tenant'"]).fingerprint != base.fingerprint
+
+
+def test_go_fingerprint_ignores_addresses_and_goroutine_ids():
+    base = only(GO_PANIC)
+    assert base.frames == ["main.(*Server).handle", "main.main"]
+
+    variant = [
+        GO_PANIC[0],
+        "[signal SIGSEGV: segmentation violation code=0x1 addr=0x8 pc=0x4c0d11]",
+        "",
+        "goroutine 4211 [running]:",
+        "main.(*Server).handle(0xc0004a0f00, {0x9, 0x3})",
+        "\t/build/app/server.go:90 +0x2a",
+        "main.main()",
+        "\t/build/app/main.go:12 +0x25",
+    ]
+    assert only(variant).fingerprint == base.fingerprint
+
+
+def test_recursion_depth_does_not_change_the_fingerprint():
+    def recursive(depth):
+        frames = ["\tat com.example.Tree.walk(Tree.java:10)"] * depth
+        return ["java.lang.StackOverflowError", *frames, "\tat com.example.Main.main(Main.java:3)"]
+
+    assert only(recursive(3)).fingerprint == only(recursive(300)).fingerprint
+
+
+def groups(catalog):
+    return {fp: (g.count, g.trace.first_line, g.last_line) for fp, g in catalog.groups.items()}
+
+
+def test_scan_matches_line_by_line_feeding():
+    lines = make_log(lines=900, bursts=((100, 5, 1), (300, 5, 2), (500, 5, 1), (700, 5, 2)))
+    lines[600:600] = GO_PANIC
+    text = "\n".join(lines) + "\n"
+
+    fed = TraceCatalog().feed_all(lines)
+    assert fed.traces_total == 5 and len(fed.groups) == 3
+    assert groups(scan_traces(text)) == groups(fed)
+    assert groups(scan_traces(text.encode("utf-8"))) == groups(fed)
+
+
+def test_merged_catalogs_keep_fingerprints_and_counts():
+    lines = make_log(lines=900, bursts=((100, 5, 1), (300, 5, 2), (500, 5, 1), (700, 5, 2)))
+    whole = TraceCatalog().feed_all(lines)
+
+    # Split at a line outside any trace, as per-chunk scans do
+    half = 400
+    first = TraceCatalog().feed_all(lines[:half])
+    second = TraceCatalog().feed_all(lines[half:], first_line=half + 1)
+    merged = first.merge(second)
+    assert merged.traces_total == whole.traces_total == 4
+    assert groups(merged) == groups(whole)
+    assert [g.fingerprint for g in merged.ranked()] == [g.fingerprint for g in whole.ranked()]
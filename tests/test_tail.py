@@ -0,0 +1,123 @@
+from src import tail
+from src.tail import TailSession, follow
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _append(path, lines):
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write("".join(line + "\n" for line in lines))
+
+
+def _burst_summaries(seg_result):
+    return [s.summary for s in seg_result.segments if s.id.startswith("error_burst")]
+
+
+def test_new_sparse_burst_is_reported_after_dense_old_ones(tmp_path, log_lines):
+    path = tmp_path / "app.log"
+    old = log_lines(0, lines=600, bursts=((100, 40, 1), (300, 30, 1), (500, 20, 1)))
+    _append(path, old)
+    clock = FakeClock()
+    session = TailSession(str(path), debounce=5, max_wait=30, min_interval=60, clock=clock)
+    assert session.segmenter.bursts_total >= 3
+    assert not session.due()
+
+    # A sparse burst: 4 errors three lines apart, after 40 quiet lines
+    new = [f"2025-11-25 11:00:{i:02d},000 INFO [main] c.e.Service - handled request {i}" for i in range(60)]
+    for i in range(40, 50, 3):
+        new[i] = f"2025-11-25 11:00:{i:02d},000 ERROR [main] c.e.Client - request {i} failed: timeout"
+    _append(path, new)
+    clock.now = 1.0
+    assert session.poll() == len(new)
+    assert not session.due()   # errors not quiet for the debounce yet
+
+    clock.now = 7.0
+    assert session.due()
+    seg_result = session.take()
+    first_new = len(old) + 41
+    assert _burst_summaries(seg_result) == [f"Error burst: 4 error lines in lines {first_new}-{first_new + 9}"]
+    assert len(seg_result.error_samples) == 4
+    assert all("failed" in line for line in seg_result.error_samples)
+    # Whole-log counts are unchanged by the window
+    assert seg_result.lines_total == len(old) + len(new)
+    assert not session.due()
+    session.close()
+
+
+def test_max_wait_and_min_interval(tmp_path, log_lines):
+    path = tmp_path / "app.log"
+    path.write_text("", encoding="utf-8")
+    clock = FakeClock()
+    session = TailSession(str(path), debounce=5, max_wait=30, min_interval=60, clock=clock)
+
+    lines = log_lines(2, lines=400, bursts=((10, 300, 1),))[:300]
+    for step in range(0, 300, 10):
+        clock.now = step / 10
+        _append(path, lines[step:step + 10])
+        session.poll()
+    # The burst started at t=1 and is still going: analysed once max_wait has passed
+    clock.now = 30.0
+    assert not session.due()
+    clock.now = 31.0
+    assert session.due()
+    session.take()
+
+    # The next burst waits for min_interval
+    _append(path, [f"2025-11-25 11:00:00,000 INFO [main] c.e.Service - idle {i}" for i in range(20)])
+    _append(path, ["2025-11-25 11:00:01,000 ERROR [main] c.e.Client - request 1 failed: timeout"])
+    clock.now = 40.0
+    session.poll()
+    clock.now = 90.0
+    assert not session.due()
+    clock.now = 91.0
+    assert session.due()
+    session.close()
+
+
+def test_failed_analysis_is_dropped_and_following_continues(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "app.log"
+    path.write_text("", encoding="utf-8")
+    session = TailSession(str(path), debounce=0, max_wait=0, min_interval=0)
+    calls = []
+
+    def fake_analysis(source, segment):
+        calls.append(segment())
+        if len(calls) == 1:
+            # The next burst arrives while the first analysis fails
+            _append(path, [f"2025-11-25 12:00:{i:02d},000 INFO [main] c.e.Service - ok" for i in range(20)])
+            _append(path, ["2025-11-25 12:01:00,000 ERROR [main] c.e.Client - request 2 failed: timeout"])
+            raise RuntimeError("model unavailable")
+        return "report"
+
+    monkeypatch.setattr(tail, "run_analysis", fake_analysis)
+    _append(path, ["2025-11-25 12:00:00,000 ERROR [main] c.e.Client - request 1 failed: timeout"])
+
+    reports = []
+    assert follow(session, reports.append, poll_interval=0.01, max_reports=1) == 1
+    session.close()
+
+    assert reports == ["report"]
+    assert len(calls) == 2
+    assert calls[1].error_samples == ["2025-11-25 12:01:00,000 ERROR [main] c.e.Client - request 2 failed: timeout"]
+    assert "report dropped" in capsys.readouterr().err
+
+
+def test_structured_log_is_followed_as_records(tmp_path):
+    path = tmp_path / "app.json.log"
+    _append(path, ['{"time": "2025-11-25T10:00:00Z", "level": 30, "msg": "started", "error": null}'] * 5)
+    session = TailSession(str(path), debounce=0, max_wait=0, min_interval=0, clock=FakeClock())
+    assert session.segmenter.parser is not None
+
+    _append(path, ['{"time": "2025-11-25T10:01:00Z", "level": 50, "msg": "request timed out", "error": null}'])
+    session.poll()
+    assert session.due()
+    seg_result = session.take()
+    assert seg_result.error_lines_total == 1
+    assert seg_result.severity_counts == {"INFO": 5, "ERROR": 1}
+    session.close()